@@ -1,8 +1,22 @@
-from flask import Flask, request, render_template, jsonify
+from flask import Flask, Response, g, request, render_template, jsonify, stream_with_context
 from flask_cors import CORS
 from joblib import load
 import os
+import hmac
+import json
 import logging
+import threading
+import time
+import numpy as np
+from prediction_cache import PredictionCache
+from campaign_index import CampaignIndex
+from micro_batcher import MicroBatcher
+from feature_extraction import EXTRACTOR_VERSION, SMSFeatureExtractor
+from forest_engine import CompiledForest, DecisionTable, probe_inputs
+from model_reload import ModelFileWatcher, ModelVersion, file_version
+from model_artifact import load_artifact
+from request_log import RequestLog, parse_sample_rates
+import metrics
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -14,29 +28,234 @@ CORS(app)  # Enable CORS for API endpoints
 # Global variables for model and extractor
 model = None
 extractor = None
+# Array-backed copy of the model used for scoring, see load_compiled_forest
+forest = None
+# Active model version; model and forest above always belong to it
+serving = None
+
+# Model file, reloaded in the background when it changes (checked every
+# MODEL_RELOAD_INTERVAL seconds, 0 disables) or on POST /api/reload_model.
+# A .json path is the manifest of a pickle-free artifact (model_artifact.py),
+# loaded without scikit-learn
+MODEL_PATH = os.environ.get('MODEL_PATH', os.path.join(os.path.dirname(__file__), 'spam_model.joblib'))
+MODEL_RELOAD_INTERVAL = float(os.environ.get('MODEL_RELOAD_INTERVAL', 0))
+MODEL_RELOAD_TOKEN = os.environ.get('MODEL_RELOAD_TOKEN', '')
+
+# Scored by every new model before it is swapped in
+WARMUP_MESSAGES = [
+    "Congratulations! You have won a free prize, call 9876543210 now",
+    "Hi, are we still meeting at 5pm tomorrow?",
+    "আপনার অ্যাকাউন্টে ৫০০ টাকা বোনাস যোগ হয়েছে, এখনই ভিজিট করুন bit.ly/offer",
+    "URGENT: your account is suspended, verify at http://example.com/login",
+    "ok",
+]
+
+_reload_lock = threading.Lock()
+reload_status = {'state': 'idle'}
+
+# Set by init_serving_process: only processes serving requests report a
+# model version, not a gunicorn master that preloads the model
+_serving_process = False
+
+# Regions of the forest's split thresholds whose probabilities are memoized
+# (0 scores every message with the compiled forest)
+DECISION_TABLE_SIZE = int(os.environ.get('DECISION_TABLE_SIZE', 100000))
+
+# Results of recently scored messages, cleared whenever the model changes
+prediction_cache = PredictionCache(
+    max_entries=int(os.environ.get('PREDICTION_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('PREDICTION_CACHE_TTL', 3600))
+)
+
+# Verdicts of recent confident messages, reused for near-duplicate copies of
+# the same campaign (disabled unless CAMPAIGN_INDEX_SIZE is set)
+campaign_index = CampaignIndex(
+    max_entries=int(os.environ.get('CAMPAIGN_INDEX_SIZE', 0)),
+    ttl=float(os.environ.get('CAMPAIGN_INDEX_TTL', 900)),
+    max_distance=int(os.environ.get('CAMPAIGN_INDEX_MAX_DISTANCE', 3)),
+    min_confidence=float(os.environ.get('CAMPAIGN_INDEX_MIN_CONFIDENCE', 0.9))
+)
+
+# Limits of /api/predict_batch
+BATCH_MAX_MESSAGES = int(os.environ.get('BATCH_MAX_MESSAGES', 1000))
+BATCH_MAX_BYTES = int(os.environ.get('BATCH_MAX_BYTES', 1024 * 1024))
+
+# Internal batch size and longest accepted line of /api/predict_stream
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 64))
+STREAM_MAX_LINE_BYTES = int(os.environ.get('STREAM_MAX_LINE_BYTES', 64 * 1024))
+
+# Window and size of the micro-batches formed from concurrent single-message
+# requests (disabled unless MICRO_BATCH_WAIT_MS is set)
+MICRO_BATCH_WAIT_MS = float(os.environ.get('MICRO_BATCH_WAIT_MS', 0))
+MICRO_BATCH_MAX_SIZE = int(os.environ.get('MICRO_BATCH_MAX_SIZE', 32))
+
+# Needed in the X-Timing-Token header to reset the histograms of
+# /api/feature_timings (resetting is disabled when unset)
+FEATURE_TIMING_TOKEN = os.environ.get('FEATURE_TIMING_TOKEN', '')
+
+# Structured per-request log, written to stdout by a background thread.
+# REQUEST_LOG_SAMPLE_RATE of the requests are logged (default 1%),
+# REQUEST_LOG_SAMPLE_RATES overrides the rate of single routes, e.g.
+# "/api/predict=0.01,/predict_simple=0.1"; message text is logged as a hash
+# keyed with REQUEST_LOG_HASH_KEY (REQUEST_LOG_MESSAGE=hash, random key per
+# run if unset), as its first REQUEST_LOG_MESSAGE_CHARS characters
+# (truncate) or not at all (omit)
+request_log = RequestLog(
+    sample_rates={'/health': 0.0, '/metrics': 0.0,
+                  **parse_sample_rates(os.environ.get('REQUEST_LOG_SAMPLE_RATES', ''))},
+    default_rate=float(os.environ.get('REQUEST_LOG_SAMPLE_RATE', 0.01)),
+    message_mode=os.environ.get('REQUEST_LOG_MESSAGE', 'hash'),
+    message_chars=int(os.environ.get('REQUEST_LOG_MESSAGE_CHARS', 32)),
+    hash_key=os.environ.get('REQUEST_LOG_HASH_KEY', ''),
+    queue_size=int(os.environ.get('REQUEST_LOG_QUEUE_SIZE', 10000))
+)
 
 def load_model_and_extractor():
     """Load model and feature extractor once during startup"""
-    global model, extractor
+    global extractor
     try:
-        # Load the spam detection model
-        model_path = os.path.join(os.path.dirname(__file__), 'spam_model.joblib')
-        if os.path.exists(model_path):
-            model = load(model_path)
-            logger.info("Model loaded successfully")
-        else:
-            logger.error(f"Model file not found at {model_path}")
-            raise FileNotFoundError(f"Model file not found at {model_path}")
-        
         # Import and initialize feature extractor
-        from feature_extraction import SMSFeatureExtractor
         extractor = SMSFeatureExtractor()
         logger.info("Feature extractor initialized successfully")
         
+        # Opt-in per-feature latency histograms, see /api/feature_timings
+        if os.environ.get('FEATURE_TIMING', '').lower() in ('1', 'true', 'yes'):
+            extractor.enable_timing()
+            logger.info("Per-feature timing enabled")
+        
+        # Load the spam detection model
+        if not os.path.exists(MODEL_PATH):
+            logger.error(f"Model file not found at {MODEL_PATH}")
+            raise FileNotFoundError(f"Model file not found at {MODEL_PATH}")
+        activate_model(load_model_version(MODEL_PATH))
+        logger.info("Model loaded successfully")
+        
     except Exception as e:
         logger.error(f"Error loading model or extractor: {str(e)}")
         raise e
 
+def load_model_version(path):
+    """
+    Load, validate, compile and warm up a model file
+    Raises ValueError if the model does not fit the feature extractor or
+    predicts other classes than the active model.
+    """
+    version = file_version(path)
+    if path.endswith('.json'):
+        loaded_model = load_artifact(path, extractor.feature_columns, EXTRACTOR_VERSION)
+    else:
+        loaded_model = load(path)
+    
+    if not hasattr(loaded_model, 'predict_proba') or not hasattr(loaded_model, 'classes_'):
+        raise ValueError(f"{type(loaded_model).__name__} is not a fitted probabilistic classifier")
+    
+    n_features = getattr(loaded_model, 'n_features_in_', None)
+    if n_features != len(extractor.feature_columns):
+        raise ValueError(f"Model expects {n_features} features, the extractor produces {len(extractor.feature_columns)}")
+    
+    feature_names = getattr(loaded_model, 'feature_names_in_', None)
+    if feature_names is not None and list(feature_names) != extractor.feature_columns:
+        raise ValueError(f"Model features {list(feature_names)} do not match the extractor's columns")
+    
+    current = serving
+    if current is not None and list(current.model.classes_) != list(loaded_model.classes_):
+        raise ValueError(f"Model classes {list(loaded_model.classes_)} differ from the active {list(current.model.classes_)}")
+    
+    candidate = ModelVersion(loaded_model, load_compiled_forest(loaded_model), version, path)
+    
+    # Warm up the new scorer and make sure it produces probabilities
+    probabilities = candidate.scorer.predict_proba(extractor.extract_batch(WARMUP_MESSAGES))
+    if probabilities.shape != (len(WARMUP_MESSAGES), len(loaded_model.classes_)) or not np.isfinite(probabilities).all():
+        raise ValueError("Model produced invalid probabilities on the warm-up messages")
+    
+    return candidate
+
+def activate_model(candidate):
+    """Make a loaded model version the one new requests are scored with"""
+    global serving, model, forest
+    previous = serving
+    serving = candidate
+    model = candidate.model
+    forest = candidate.forest
+    if _serving_process:
+        metrics.set_model_version(candidate.version, previous.version if previous is not None else None)
+    logger.info(f"Serving model version {candidate.version}")
+
+def reload_model():
+    """
+    Load MODEL_PATH again in a background thread and swap it in once ready
+    Requests keep using the active model meanwhile, and the ones already
+    running finish with it. Returns False if a reload is already running.
+    Under gunicorn every worker reloads on its own, so the new model is a
+    private copy per worker, no longer shared copy-on-write with the others.
+    """
+    if not _reload_lock.acquire(blocking=False):
+        return False
+    
+    def run():
+        global reload_status
+        started = time.time()
+        try:
+            reload_status = {'state': 'loading', 'started_at': started}
+            if serving is not None and file_version(MODEL_PATH) == serving.version:
+                reload_status = {'state': 'unchanged', 'version': serving.version}
+                return
+            candidate = load_model_version(MODEL_PATH)
+            activate_model(candidate)
+            reload_status = {
+                'state': 'reloaded',
+                'version': candidate.version,
+                'seconds': round(time.time() - started, 3)
+            }
+        except Exception as e:
+            logger.error(f"Model reload failed, keeping version {serving.version if serving else None}: {str(e)}")
+            reload_status = {'state': 'failed', 'error': str(e)}
+        finally:
+            _reload_lock.release()
+    
+    threading.Thread(target=run, name='model-reload', daemon=True).start()
+    return True
+
+def _after_fork():
+    """A reload running in the parent does not exist in a forked child"""
+    global _reload_lock, _serving_process
+    _reload_lock = threading.Lock()
+    _serving_process = False
+
+os.register_at_fork(after_in_child=_after_fork)
+
+def load_compiled_forest(loaded_model):
+    """
+    Compile the model into array-backed trees for scoring
+    Returns None (score with the model itself) when disabled with
+    COMPILED_FOREST=0, when the model is not a forest, or when the compiled
+    trees do not reproduce the model's probabilities exactly on probe inputs
+    covering every split threshold. Unless DECISION_TABLE_SIZE is 0 the
+    compiled forest is wrapped in a DecisionTable memoizing its results.
+    """
+    if os.environ.get('COMPILED_FOREST', '1').lower() not in ('1', 'true', 'yes'):
+        return None
+    
+    if isinstance(loaded_model, CompiledForest):
+        # Loaded from an artifact, checked against the forest when exported
+        compiled = loaded_model
+    else:
+        try:
+            compiled = CompiledForest.from_sklearn(loaded_model)
+        except ValueError as e:
+            logger.warning(f"Compiled forest not used: {e}")
+            return None
+        
+        mismatches = compiled.verify(loaded_model, probe_inputs(compiled))
+        if mismatches:
+            logger.warning(f"Compiled forest not used: {mismatches} probe rows differ from the model")
+            return None
+    
+    logger.info(f"Compiled forest ready ({compiled.n_estimators} trees, {len(compiled.feature)} nodes)")
+    if DECISION_TABLE_SIZE > 0:
+        return DecisionTable(compiled, max_entries=DECISION_TABLE_SIZE)
+    return compiled
+
 def normalize_prediction(prediction):
     """
     Normalize prediction to standard format regardless of model output type
@@ -56,6 +275,233 @@ def normalize_prediction(prediction):
         # Default to ham for safety
         return 'ham', 0
 
+def classify(message):
+    """
+    Predict one message
+    Returns: (raw_prediction, probabilities, short_circuit), see classify_batch
+    With micro-batching enabled the message is scored together with those of
+    concurrent requests.
+    """
+    if micro_batcher is not None:
+        return micro_batcher.submit(message)
+    return classify_batch([message])[0]
+
+def classify_batch(messages):
+    """
+    Predict many messages with a single model call
+    Returns: list of (raw_prediction, probabilities, short_circuit) in input
+    order. probabilities is None when the model cannot provide them.
+    Repeated messages are answered from the prediction cache; short_circuit
+    is True when the verdict was reused from a near-duplicate in the
+    campaign index instead of running the model. All remaining messages are
+    extracted into one feature matrix and scored together, by the compiled
+    forest when available.
+    """
+    current = serving
+    current_model = current.model
+    scorer = current.scorer
+    metrics.observe_messages(messages)
+    results = [None] * len(messages)
+    pending = []
+    fingerprints = {}
+    
+    for i, message in enumerate(messages):
+        cached = prediction_cache.get(message, current_model)
+        if cached is not None:
+            results[i] = cached + (False,)
+            continue
+        
+        fingerprint = campaign_index.fingerprint(message) if campaign_index.enabled else None
+        neighbour = campaign_index.lookup(fingerprint, current_model)
+        if neighbour is not None:
+            results[i] = neighbour + (True,)
+            continue
+        
+        fingerprints[i] = fingerprint
+        pending.append(i)
+    
+    if not pending:
+        return results
+    
+    with metrics.stage('extraction'):
+        features = extractor.extract_batch([messages[i] for i in pending])
+    try:
+        with metrics.stage('inference'):
+            probabilities = scorer.predict_proba(features)
+            # Same rule as the forest's own predict
+            raw_predictions = current_model.classes_.take(probabilities.argmax(axis=1))
+    except Exception as e:
+        logger.info(f"Probability calculation failed: {e}")
+        probabilities = None
+        raw_predictions = current_model.predict(features)
+    
+    for row, i in enumerate(pending):
+        row_probabilities = probabilities[row].copy() if probabilities is not None else None
+        result = (raw_predictions[row], row_probabilities)
+        prediction_cache.put(messages[i], current_model, result)
+        if fingerprints[i] is not None and row_probabilities is not None:
+            campaign_index.add(fingerprints[i], current_model, result, max(row_probabilities))
+        results[i] = result + (False,)
+    
+    return results
+
+def class_probabilities(probabilities):
+    """Map normalized class names to probabilities, None if not a two-class model"""
+    if probabilities is None or len(probabilities) != 2:
+        return None
+    
+    # Assuming index 0 = ham, index 1 = spam (common convention)
+    if hasattr(model, 'classes_') and len(model.classes_) == 2:
+        class_probs = {}
+        for i, class_label in enumerate(model.classes_):
+            normalized_class, _ = normalize_prediction(class_label)
+            class_probs[normalized_class] = float(probabilities[i])
+        return class_probs
+    
+    return {'ham': float(probabilities[0]), 'spam': float(probabilities[1])}
+
+def health_status():
+    """Body of the health check"""
+    return {
+        'status': 'healthy',
+        'message': 'SMS Spam Detection API is running',
+        'model_loaded': model is not None,
+        'extractor_loaded': extractor is not None,
+        'model_version': serving.version if serving is not None else None
+    }
+
+def prediction_response(message):
+    """Classify one message and build the /api/predict response body"""
+    raw_prediction, probabilities, short_circuit = classify(message)
+    
+    # Normalize prediction
+    result, prediction_code = normalize_prediction(raw_prediction)
+    
+    # Get prediction probability if available
+    confidence = max(probabilities) if probabilities is not None else None
+    class_probs = class_probabilities(probabilities)
+    
+    response_data = {
+        'message': message,
+        'prediction': result,
+        'prediction_code': prediction_code,
+        'confidence': float(confidence) if confidence else None,
+        'raw_prediction': str(raw_prediction),  # For debugging
+        'short_circuit': short_circuit,  # Verdict reused from a near-duplicate
+        'status': 'success'
+    }
+    
+    # Add class probabilities if available
+    if class_probs:
+        response_data['probabilities'] = class_probs
+    
+    return response_data
+
+def verdict(raw_prediction, probabilities, short_circuit):
+    """Per-message fields of the batch and stream responses"""
+    result, prediction_code = normalize_prediction(raw_prediction)
+    item = {
+        'prediction': result,
+        'prediction_code': prediction_code,
+        'confidence': float(max(probabilities)) if probabilities is not None else None,
+        'short_circuit': short_circuit
+    }
+    class_probs = class_probabilities(probabilities)
+    if class_probs:
+        item['probabilities'] = class_probs
+    return item
+
+def read_lines(stream, max_line_bytes):
+    """
+    Yield (line_number, line) from a binary stream without reading it whole
+    Lines longer than max_line_bytes are skipped and yielded as None.
+    """
+    line_number = 0
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            return
+        line_number += 1
+        if len(line) > max_line_bytes and not line.endswith(b'\n'):
+            while line and not line.endswith(b'\n'):
+                line = stream.readline(max_line_bytes + 1)
+            line = None
+        yield line_number, line
+
+def stream_entry(line_number, line):
+    """Parse one NDJSON line into a stream entry with a message or an error"""
+    entry = {'line': line_number}
+    if line is None:
+        entry['error'] = f'Line exceeds {STREAM_MAX_LINE_BYTES} bytes'
+        return entry
+    
+    try:
+        with metrics.stage('parse'):
+            data = json.loads(line)
+    except ValueError:
+        entry['error'] = 'Invalid JSON'
+        return entry
+    
+    if not isinstance(data, dict):
+        entry['error'] = 'Line must be a JSON object'
+        return entry
+    if 'id' in data:
+        entry['id'] = data['id']
+    
+    message = data.get('message', data.get('text'))
+    if not isinstance(message, str):
+        entry['error'] = 'Missing message'
+    elif not message.strip():
+        entry['error'] = 'Message cannot be empty'
+    else:
+        entry['message'] = message.strip()
+    return entry
+
+def score_stream_entries(entries):
+    """Classify the valid entries of a stream batch and render them as NDJSON"""
+    valid = [entry for entry in entries if 'message' in entry]
+    predictions = classify_batch([entry.pop('message') for entry in valid])
+    for entry, prediction in zip(valid, predictions):
+        entry.update(verdict(*prediction))
+    for entry in entries:
+        if 'error' in entry:
+            entry['prediction'] = None
+    with metrics.stage('serialization'):
+        return ''.join(json.dumps(entry) + '\n' for entry in entries)
+
+def model_details():
+    """Body of /api/model_info for the loaded model"""
+    info = {
+        'model_type': str(type(model).__name__),
+        'model_loaded': True,
+        'compiled_inference': forest is not None,
+        'model_version': serving.describe() if serving is not None else None,
+        'reload': reload_status
+    }
+    
+    # Try to get model classes if available
+    if hasattr(model, 'classes_'):
+        info['classes'] = [str(c) for c in model.classes_]
+    
+    # Try to get feature names if available
+    if hasattr(model, 'feature_names_in_'):
+        info['feature_count'] = len(model.feature_names_in_)
+    
+    # Provenance of a pickle-free artifact
+    if hasattr(model, 'manifest'):
+        info['artifact'] = {
+            key: model.manifest[key]
+            for key in ('model_type', 'created_at', 'sha256', 'extractor_version')
+        }
+    
+    return info
+
+micro_batcher = MicroBatcher(
+    classify_batch,
+    max_batch_size=MICRO_BATCH_MAX_SIZE,
+    max_wait=MICRO_BATCH_WAIT_MS / 1000
+) if MICRO_BATCH_WAIT_MS > 0 else None
+
 # Load model and extractor when the app starts
 try:
     load_model_and_extractor()
@@ -64,6 +510,51 @@ except Exception as e:
     # In production, you might want to exit here
     # sys.exit(1)
 
+model_watcher = ModelFileWatcher(MODEL_PATH, MODEL_RELOAD_INTERVAL, reload_model)
+
+def init_serving_process():
+    """
+    Set up a process that serves requests: report its model version in the
+    metrics and start the model file watcher
+    Not called at import: a gunicorn master preloading the app serves
+    nothing, a model it reloaded would be shared with no worker, and its
+    model version would stay in /metrics (the master is never marked dead).
+    gunicorn.conf.py calls this in every worker, as do asgi.py and
+    sidecar.py; the request log starts its thread on first use.
+    """
+    global _serving_process
+    _serving_process = True
+    if serving is not None:
+        metrics.set_model_version(serving.version)
+    model_watcher.start()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request and its latency (for streams: until the headers), and log a sample"""
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        elapsed = time.perf_counter() - started
+        metrics.record_request(
+            route, request.method, response.status_code,
+            elapsed, request.content_length, g.get('error_type')
+        )
+        request_log.log(
+            route, method=request.method, status=response.status_code,
+            duration_ms=round(elapsed * 1000, 3), error=g.get('error_type'), **g.get('log_fields', {})
+        )
+    return response
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus metrics of every worker process"""
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
 @app.route('/')
 def home():
     """Home page route"""
@@ -76,12 +567,7 @@ def home():
 @app.route('/health')
 def health_check():
     """Health check endpoint for monitoring"""
-    return jsonify({
-        'status': 'healthy',
-        'message': 'SMS Spam Detection API is running',
-        'model_loaded': model is not None,
-        'extractor_loaded': extractor is not None
-    })
+    return jsonify(health_status())
 
 @app.route('/predict', methods=['POST'])
 def predict():
@@ -97,19 +583,16 @@ def predict():
                                  prediction_text="Error: Please enter a message")
         
         # Extract features and make prediction
-        features = extractor.extract_features(message)
-        raw_prediction = model.predict(features)[0]
+        raw_prediction, probabilities, _ = classify(message)
         
         # Normalize prediction
         result, prediction_code = normalize_prediction(raw_prediction)
         
         # Get confidence score if available
-        try:
-            probabilities = model.predict_proba(features)[0]
+        if probabilities is not None:
             confidence = max(probabilities) * 100
             confidence_text = f" (Confidence: {confidence:.1f}%)"
-        except Exception as e:
-            logger.info(f"Confidence not available: {e}")
+        else:
             confidence_text = ""
         
         # Convert to display format
@@ -138,17 +621,11 @@ def predict_simple_web():
                                  prediction_text="Error: Please enter a message")
         
         # Extract features and make prediction
-        features = extractor.extract_features(message)
-        raw_prediction = model.predict(features)[0]
-        
-        # Log for debugging
-        logger.info(f"Web form - Raw prediction: {raw_prediction}, Message: {message[:50]}...")
+        raw_prediction, _, _ = classify(message)
         
         # Normalize prediction
         result, prediction_code = normalize_prediction(raw_prediction)
-        
-        # Log normalized result
-        logger.info(f"Web form - Normalized result: {result}, code: {prediction_code}")
+        g.log_fields = {'message': message, 'raw_prediction': raw_prediction, 'prediction': result}
         
         # Convert to display format
         display_result = "Spam" if result == "spam" else "Not Spam"
@@ -176,7 +653,8 @@ def api_predict():
             }), 500
         
         # Get JSON data
-        data = request.get_json()
+        with metrics.stage('parse'):
+            data = request.get_json()
         if not data or 'message' not in data:
             return jsonify({
                 'error': 'Missing message in request body',
@@ -191,58 +669,20 @@ def api_predict():
             }), 400
         
         # Extract features and make prediction
-        features = extractor.extract_features(message)
-        raw_prediction = model.predict(features)[0]
-        
-        # Log the raw prediction for debugging
-        logger.info(f"Raw prediction from model: {raw_prediction} (type: {type(raw_prediction)})")
-        
-        # Normalize prediction
-        result, prediction_code = normalize_prediction(raw_prediction)
-        
-        # Get prediction probability if available
-        try:
-            probabilities = model.predict_proba(features)[0]
-            confidence = max(probabilities)
-            
-            # Try to get individual class probabilities
-            if len(probabilities) == 2:
-                # Assuming index 0 = ham, index 1 = spam (common convention)
-                if hasattr(model, 'classes_'):
-                    classes = model.classes_
-                    if len(classes) == 2:
-                        class_probs = {}
-                        for i, class_label in enumerate(classes):
-                            normalized_class, _ = normalize_prediction(class_label)
-                            class_probs[normalized_class] = float(probabilities[i])
-                    else:
-                        class_probs = {'ham': float(probabilities[0]), 'spam': float(probabilities[1])}
-                else:
-                    class_probs = {'ham': float(probabilities[0]), 'spam': float(probabilities[1])}
-            else:
-                class_probs = None
-                
-        except Exception as e:
-            logger.info(f"Probability calculation failed: {e}")
-            confidence = None
-            class_probs = None
-        
-        response_data = {
+        response_data = prediction_response(message)
+        g.log_fields = {
             'message': message,
-            'prediction': result,
-            'prediction_code': prediction_code,
-            'confidence': float(confidence) if confidence else None,
-            'raw_prediction': str(raw_prediction),  # For debugging
-            'status': 'success'
+            'raw_prediction': response_data['raw_prediction'],
+            'prediction': response_data['prediction'],
+            'confidence': response_data['confidence'],
+            'short_circuit': response_data['short_circuit']
         }
         
-        # Add class probabilities if available
-        if class_probs:
-            response_data['probabilities'] = class_probs
-        
-        return jsonify(response_data)
+        with metrics.stage('serialization'):
+            return jsonify(response_data)
     
     except Exception as e:
+        g.error_type = type(e).__name__
         logger.error(f"Error in API prediction: {str(e)}")
         return jsonify({
             'error': f'Prediction failed: {str(e)}',
@@ -259,7 +699,8 @@ def api_predict_simple():
             return jsonify({'error': 'Model not loaded'}), 500
         
         # Get JSON data
-        data = request.get_json()
+        with metrics.stage('parse'):
+            data = request.get_json()
         if not data or 'message' not in data:
             return jsonify({'error': 'Missing message'}), 400
         
@@ -268,19 +709,131 @@ def api_predict_simple():
             return jsonify({'error': 'Empty message'}), 400
         
         # Extract features and make prediction
-        features = extractor.extract_features(message)
-        raw_prediction = model.predict(features)[0]
+        raw_prediction, _, short_circuit = classify(message)
         
         # Normalize prediction
         result, _ = normalize_prediction(raw_prediction)
+        g.log_fields = {'message': message, 'prediction': result, 'short_circuit': short_circuit}
         
         # Return only the prediction
-        return jsonify({'prediction': result})
+        with metrics.stage('serialization'):
+            return jsonify({'prediction': result, 'short_circuit': short_circuit})
     
     except Exception as e:
+        g.error_type = type(e).__name__
         logger.error(f"Error in simple prediction: {str(e)}")
         return jsonify({'error': 'Prediction failed'}), 500
 
+@app.route('/api/predict_batch', methods=['POST'])
+def api_predict_batch():
+    """API endpoint scoring many messages with one model call"""
+    try:
+        # Check if model and extractor are loaded
+        if model is None or extractor is None:
+            return jsonify({'error': 'Model or feature extractor not loaded', 'results': None}), 500
+        
+        # Enforce the byte limit before reading the whole body
+        if request.content_length is not None and request.content_length > BATCH_MAX_BYTES:
+            return jsonify({'error': f'Request body exceeds {BATCH_MAX_BYTES} bytes', 'results': None}), 413
+        body = request.stream.read(BATCH_MAX_BYTES + 1)
+        if len(body) > BATCH_MAX_BYTES:
+            return jsonify({'error': f'Request body exceeds {BATCH_MAX_BYTES} bytes', 'results': None}), 413
+        
+        try:
+            with metrics.stage('parse'):
+                data = json.loads(body)
+        except ValueError:
+            return jsonify({'error': 'Invalid JSON body', 'results': None}), 400
+        
+        messages = data.get('messages', data.get('texts')) if isinstance(data, dict) else None
+        if not isinstance(messages, list):
+            return jsonify({'error': 'Missing messages list in request body', 'results': None}), 400
+        if len(messages) > BATCH_MAX_MESSAGES:
+            return jsonify({
+                'error': f'Batch exceeds {BATCH_MAX_MESSAGES} messages',
+                'results': None
+            }), 413
+        
+        # Validate every item, only valid ones go to the model
+        results = [None] * len(messages)
+        valid = []
+        for i, message in enumerate(messages):
+            if not isinstance(message, str):
+                results[i] = {'index': i, 'error': 'Message must be a string', 'prediction': None}
+            elif not message.strip():
+                results[i] = {'index': i, 'error': 'Message cannot be empty', 'prediction': None}
+            else:
+                valid.append((i, message.strip()))
+        
+        predictions = classify_batch([message for _, message in valid])
+        for (i, message), prediction in zip(valid, predictions):
+            results[i] = {'index': i, 'message': message, **verdict(*prediction)}
+        
+        with metrics.stage('serialization'):
+            return jsonify({
+                'results': results,
+                'total_processed': len(valid),
+                'total_errors': len(messages) - len(valid),
+                'status': 'success'
+            })
+    
+    except Exception as e:
+        g.error_type = type(e).__name__
+        logger.error(f"Error in batch prediction: {str(e)}")
+        return jsonify({
+            'error': f'Batch prediction failed: {str(e)}',
+            'results': None,
+            'status': 'error'
+        }), 500
+
+@app.route('/api/predict_stream', methods=['POST'])
+def api_predict_stream():
+    """
+    Score a newline-delimited JSON body while it is being uploaded
+    Every line is an object with a 'message' (or 'text') and an optional
+    'id'. Verdicts are streamed back as NDJSON in input order, one line per
+    input line, every STREAM_BATCH_SIZE lines, followed by a summary line.
+    Only one batch is held in memory, whatever the size of the body.
+    """
+    if model is None or extractor is None:
+        return jsonify({'error': 'Model or feature extractor not loaded', 'prediction': None}), 500
+    
+    stream = request.stream
+    
+    def generate():
+        processed = 0
+        errors = 0
+        batch = []
+        try:
+            for line_number, line in read_lines(stream, STREAM_MAX_LINE_BYTES):
+                if line is not None and not line.strip():
+                    continue
+                entry = stream_entry(line_number, line)
+                if 'error' in entry:
+                    errors += 1
+                else:
+                    processed += 1
+                batch.append(entry)
+                if len(batch) >= STREAM_BATCH_SIZE:
+                    yield score_stream_entries(batch)
+                    batch = []
+            if batch:
+                yield score_stream_entries(batch)
+        except Exception as e:
+            # The 200 status is already sent, count the failure here
+            metrics.record_error('/api/predict_stream', type(e).__name__)
+            logger.error(f"Error in stream prediction: {str(e)}")
+            yield json.dumps({'error': f'Stream prediction failed: {str(e)}', 'status': 'error'}) + '\n'
+            return
+        
+        yield json.dumps({
+            'total_processed': processed,
+            'total_errors': errors,
+            'status': 'success'
+        }) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/debug_predict', methods=['POST'])
 def debug_predict():
     """Debug prediction route to see raw model output"""
@@ -332,18 +885,7 @@ def model_info():
         if model is None:
             return jsonify({'error': 'Model not loaded'}), 500
         
-        info = {
-            'model_type': str(type(model).__name__),
-            'model_loaded': True
-        }
-        
-        # Try to get model classes if available
-        if hasattr(model, 'classes_'):
-            info['classes'] = [str(c) for c in model.classes_]
-        
-        # Try to get feature names if available
-        if hasattr(model, 'feature_names_in_'):
-            info['feature_count'] = len(model.feature_names_in_)
+        info = model_details()
         
         return jsonify(info)
         
@@ -351,6 +893,76 @@ def model_info():
         logger.error(f"Error getting model info: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def header_matches(header, token):
+    """Whether a request header holds the token, compared in constant time"""
+    value = request.headers.get(header, '').encode('utf-8', 'surrogateescape')
+    return hmac.compare_digest(value, token.encode('utf-8'))
+
+@app.route('/api/reload_model', methods=['POST'])
+def api_reload_model():
+    """Reload the model file in the background (needs MODEL_RELOAD_TOKEN)"""
+    if not MODEL_RELOAD_TOKEN:
+        return jsonify({'error': 'Model reload not enabled'}), 404
+    if not header_matches('X-Reload-Token', MODEL_RELOAD_TOKEN):
+        return jsonify({'error': 'Invalid reload token'}), 403
+    if extractor is None:
+        return jsonify({'error': 'Feature extractor not loaded'}), 500
+    
+    if not reload_model():
+        return jsonify({'status': 'already reloading', 'reload': reload_status}), 409
+    return jsonify({
+        'status': 'reloading',
+        'model_version': serving.version if serving is not None else None
+    }), 202
+
+@app.route('/api/cache_stats', methods=['GET'])
+def cache_stats():
+    """Hit, miss and eviction counters of the prediction cache"""
+    return jsonify(prediction_cache.stats())
+
+@app.route('/api/campaign_stats', methods=['GET'])
+def campaign_stats():
+    """Hit and size counters of the near-duplicate campaign index"""
+    return jsonify(campaign_index.stats())
+
+@app.route('/api/decision_table_stats', methods=['GET'])
+def decision_table_stats():
+    """Size and hit counters of the memoized decision table"""
+    if not isinstance(forest, DecisionTable):
+        return jsonify({'error': 'Decision table not enabled'}), 404
+    return jsonify(forest.stats())
+
+@app.route('/api/microbatch_stats', methods=['GET'])
+def microbatch_stats():
+    """Batch size and queueing delay histograms of the micro-batcher"""
+    if micro_batcher is None:
+        return jsonify({'error': 'Micro-batching not enabled'}), 404
+    return jsonify(micro_batcher.stats())
+
+@app.route('/api/request_log_stats', methods=['GET'])
+def request_log_stats():
+    """Logged, sampled-out and dropped counters of the request log"""
+    return jsonify(request_log.stats())
+
+@app.route('/api/feature_timings', methods=['GET', 'DELETE'])
+def feature_timings():
+    """
+    Per-extractor latency histograms (enabled with FEATURE_TIMING=1)
+    DELETE resets them and needs FEATURE_TIMING_TOKEN.
+    """
+    if extractor is None or extractor.timings is None:
+        return jsonify({'error': 'Feature timing not enabled'}), 404
+    
+    if request.method == 'DELETE':
+        if not FEATURE_TIMING_TOKEN:
+            return jsonify({'error': 'Feature timing reset not enabled'}), 404
+        if not header_matches('X-Timing-Token', FEATURE_TIMING_TOKEN):
+            return jsonify({'error': 'Invalid timing token'}), 403
+        extractor.timings.reset()
+        return jsonify({'status': 'reset'})
+    
+    return jsonify(extractor.timings.snapshot())
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
@@ -366,4 +978,5 @@ if __name__ == "__main__":
     debug_mode = os.environ.get("FLASK_ENV") == "development"
     
     logger.info(f"Starting Flask app on port {port}")
+    init_serving_process()
     app.run(debug=debug_mode, host='0.0.0.0', port=port)
\ No newline at end of file
@@ -0,0 +1,259 @@
+# asgi.py
+"""
+Asyncio serving entry point for the JSON API
+
+Serves the same /health, /api/predict, /api/predict_simple,
+/api/model_info and /metrics routes as app.py, as a plain ASGI application:
+
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+
+Under gunicorn, keep -c gunicorn.conf.py: it binds $PORT and sets up
+PROMETHEUS_MULTIPROC_DIR, without which /metrics only reports the worker
+that answers the scrape.
+
+Connections, body reads and JSON parsing stay on the event loop, so slow
+clients only cost an idle coroutine. Feature extraction and inference run
+in a thread pool of ASGI_EXECUTOR_WORKERS threads; at most
+ASGI_MAX_PENDING of them are queued or running at once, further requests
+wait on the loop. With MICRO_BATCH_WAIT_MS set, the executor threads feed
+the micro-batcher and concurrent messages share one model call.
+"""
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import app as flask_app
+import metrics
+
+logger = flask_app.logger
+
+ASGI_EXECUTOR_WORKERS = int(os.environ.get('ASGI_EXECUTOR_WORKERS', min(32, (os.cpu_count() or 1) + 4)))
+ASGI_MAX_PENDING = int(os.environ.get('ASGI_MAX_PENDING', ASGI_EXECUTOR_WORKERS * 4))
+ASGI_MAX_BODY_BYTES = int(os.environ.get('ASGI_MAX_BODY_BYTES', 64 * 1024))
+
+executor = ThreadPoolExecutor(max_workers=ASGI_EXECUTOR_WORKERS, thread_name_prefix='asgi-cpu')
+_pending = None
+
+
+class RequestError(Exception):
+    """Client error answered with a JSON body and status code"""
+
+    def __init__(self, status, body):
+        super().__init__(body.get('error'))
+        self.status = status
+        self.body = body
+
+
+async def run_cpu(function, *args):
+    """Run CPU-bound work in the bounded executor"""
+    global _pending
+    if _pending is None:
+        _pending = asyncio.Semaphore(ASGI_MAX_PENDING)
+    async with _pending:
+        return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+
+
+async def read_json(receive, error_body):
+    """Read the request body (up to ASGI_MAX_BODY_BYTES) and parse it as JSON"""
+    chunks = []
+    size = 0
+    more_body = True
+    while more_body:
+        event = await receive()
+        if event['type'] == 'http.disconnect':
+            raise ConnectionError('Client disconnected')
+        chunk = event.get('body', b'')
+        size += len(chunk)
+        if size > ASGI_MAX_BODY_BYTES:
+            raise RequestError(413, dict(error_body, error=f'Request body exceeds {ASGI_MAX_BODY_BYTES} bytes'))
+        chunks.append(chunk)
+        more_body = event.get('more_body', False)
+
+    try:
+        with metrics.stage('parse'):
+            return json.loads(b''.join(chunks))
+    except ValueError:
+        raise RequestError(400, dict(error_body, error='Invalid JSON body'))
+
+
+def read_message(data, missing, empty):
+    """Stripped message of a parsed body, or RequestError"""
+    if not isinstance(data, dict) or 'message' not in data:
+        raise RequestError(400, missing)
+    message = data['message'].strip()
+    if not message:
+        raise RequestError(400, empty)
+    return message
+
+
+def models_loaded():
+    return flask_app.model is not None and flask_app.extractor is not None
+
+
+async def health(receive):
+    """Health check endpoint for monitoring"""
+    return 200, flask_app.health_status()
+
+
+async def api_predict(receive):
+    """API endpoint for predictions"""
+    try:
+        if not models_loaded():
+            return 500, {'error': 'Model or feature extractor not loaded', 'prediction': None}
+
+        data = await read_json(receive, {'prediction': None})
+        message = read_message(
+            data,
+            missing={'error': 'Missing message in request body', 'prediction': None},
+            empty={'error': 'Message cannot be empty', 'prediction': None}
+        )
+        return 200, await run_cpu(flask_app.prediction_response, message)
+
+    except (RequestError, ConnectionError):
+        raise
+    except Exception as e:
+        logger.error(f"Error in API prediction: {str(e)}")
+        metrics.record_error('/api/predict', type(e).__name__)
+        return 500, {'error': f'Prediction failed: {str(e)}', 'prediction': None, 'status': 'error'}
+
+
+async def api_predict_simple(receive):
+    """Simple API endpoint that returns only the prediction"""
+    try:
+        if not models_loaded():
+            return 500, {'error': 'Model not loaded'}
+
+        data = await read_json(receive, {})
+        message = read_message(data, missing={'error': 'Missing message'}, empty={'error': 'Empty message'})
+        raw_prediction, _, short_circuit = await run_cpu(flask_app.classify, message)
+        result, _ = flask_app.normalize_prediction(raw_prediction)
+        return 200, {'prediction': result, 'short_circuit': short_circuit}
+
+    except (RequestError, ConnectionError):
+        raise
+    except Exception as e:
+        logger.error(f"Error in simple prediction: {str(e)}")
+        metrics.record_error('/api/predict_simple', type(e).__name__)
+        return 500, {'error': 'Prediction failed'}
+
+
+async def model_info(receive):
+    """Get information about the loaded model"""
+    if flask_app.model is None:
+        return 500, {'error': 'Model not loaded'}
+    return 200, flask_app.model_details()
+
+
+ROUTES = {
+    '/health': (('GET',), health),
+    '/api/predict': (('POST',), api_predict),
+    '/api/predict_simple': (('POST',), api_predict_simple),
+    '/api/model_info': (('GET',), model_info),
+}
+
+CORS_HEADERS = [(b'access-control-allow-origin', b'*')]
+
+
+async def send_json(send, status, body, headers=()):
+    with metrics.stage('serialization'):
+        payload = json.dumps(body, sort_keys=True).encode('utf-8')
+    await send_body(send, status, payload, b'application/json', headers)
+
+
+async def send_body(send, status, payload, content_type, headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', content_type),
+            (b'content-length', str(len(payload)).encode('ascii')),
+            *CORS_HEADERS,
+            *headers
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+def without_body(send):
+    """send of a HEAD request: the headers of the GET response, content-length included, and no body"""
+    async def send_headers(event):
+        if event['type'] == 'http.response.body':
+            event = dict(event, body=b'')
+        await send(event)
+    return send_headers
+
+
+async def lifespan(receive, send):
+    while True:
+        event = await receive()
+        if event['type'] == 'lifespan.startup':
+            flask_app.init_serving_process()
+            await send({'type': 'lifespan.startup.complete'})
+        elif event['type'] == 'lifespan.shutdown':
+            executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI application"""
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    started = time.perf_counter()
+    if scope['method'] == 'HEAD':
+        send = without_body(send)
+    status = await respond(scope, receive, send)
+    if status is not None:
+        route = scope['path'] if scope['path'] in ROUTES or scope['path'] == '/metrics' else 'unmatched'
+        elapsed = time.perf_counter() - started
+        size = dict(scope['headers']).get(b'content-length')
+        metrics.record_request(route, scope['method'], status, elapsed, int(size) if size else None)
+        flask_app.request_log.log(route, method=scope['method'], status=status,
+                                  duration_ms=round(elapsed * 1000, 3))
+
+
+async def respond(scope, receive, send):
+    """Route one request, returns the response status (None if the client left)"""
+    if scope['path'] == '/metrics':
+        body, content_type = metrics.render()
+        await send_body(send, 200, body, content_type.encode('ascii'))
+        return 200
+
+    route = ROUTES.get(scope['path'])
+    if route is None:
+        await send_json(send, 404, {'error': 'Endpoint not found'})
+        return 404
+
+    methods, handler = route
+    if scope['method'] == 'OPTIONS':
+        # CORS preflight, as answered by flask_cors
+        allow = ', '.join(methods + ('OPTIONS',)).encode('ascii')
+        await send_json(send, 200, {}, headers=[
+            (b'access-control-allow-methods', allow),
+            (b'access-control-allow-headers', b'*'),
+            (b'allow', allow)
+        ])
+        return 200
+    if scope['method'] not in methods and not (scope['method'] == 'HEAD' and 'GET' in methods):
+        await send_json(send, 405, {'error': 'Method not allowed'}, headers=[
+            (b'allow', ', '.join(methods).encode('ascii'))
+        ])
+        return 405
+
+    try:
+        status, body = await handler(receive)
+    except RequestError as e:
+        status, body = e.status, e.body
+    except ConnectionError:
+        return None
+    except Exception as e:
+        logger.error(f"Unhandled error on {scope['path']}: {str(e)}")
+        status, body = 500, {'error': 'Internal server error'}
+    await send_json(send, status, body)
+    return status
@@ -0,0 +1,318 @@
+# benchmark.py
+"""
+Micro- and macro-benchmarks of feature extraction, inference and the API
+
+Suites:
+    extractor   every SMSFeatureExtractor method, extract_features and
+                extract_batch, per message of the synthetic corpus, plus
+                extract_features per language and for long messages
+    inference   scikit-learn, the compiled forest and the decision table,
+                per row for single rows and batches of 256
+    api         /api/predict, /api/predict_simple and /api/predict_batch
+                through the Flask test client (caches disabled)
+
+Every benchmark is timed over the same deterministic corpus
+(synthetic_corpus.py), and the fastest of --repeat runs counts. The runs of
+all benchmarks of a suite are interleaved round-robin, together with a
+calibration case (a fixed pure-Python and regex workload), so a slow patch
+of the machine hits every case alike instead of a few. Results are written
+as JSON and compared with the baseline as multiples of the calibration time,
+so a baseline recorded on another machine still applies roughly. A
+benchmark more than --tolerance slower than the baseline, or missing from
+the results, fails the run.
+
+    python benchmark.py                       # compare with benchmark_baseline.json
+    python benchmark.py --update-baseline     # record a new baseline
+    python benchmark.py --suites extractor --tolerance 0.5
+"""
+import argparse
+import gc
+import hashlib
+import json
+import os
+import platform
+import re
+import sys
+import time
+import warnings
+import numpy as np
+from synthetic_corpus import generate_corpus
+
+SUITES = ('extractor', 'inference', 'api')
+
+EXTRACTOR_METHODS = [
+    'extract_phone_numbers', 'extract_special_chars', 'extract_all_caps_words', 'extract_urls',
+    'extract_mixed_language', 'extract_currency', 'extract_date', 'extract_time', 'extract_id_codes',
+    'extract_emojis', 'has_repeated_words', 'has_consecutive_special_chars', 'detect_subscriber_codes',
+    'calculate_avg_word_length', 'count_chars_without_spaces', 'scan_characters', 'feature_values',
+    'extract_features'
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the benchmark suites and compare them with a baseline")
+    parser.add_argument('--suites', nargs='+', choices=SUITES, default=list(SUITES))
+    parser.add_argument('--messages', type=int, default=2000, help="size of the synthetic corpus")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the synthetic corpus")
+    parser.add_argument('--repeat', type=int, default=10, help="runs per benchmark, the fastest counts")
+    parser.add_argument('--model', default='spam_model.joblib', help="trained model for the inference suite")
+    parser.add_argument('--output', default='benchmark_results.json', help="where to write the results")
+    parser.add_argument('--baseline', default='benchmark_baseline.json', help="results to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help="allowed slowdown against the baseline (0.3 = 30%%)")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="write the results to --baseline instead of comparing")
+    return parser.parse_args()
+
+
+def calibration_case():
+    """A fixed workload, the unit results are compared in"""
+    pattern = re.compile(r'\b\w+\b')
+    text = "The quick brown fox jumps over the lazy dog 0123456789 " * 20
+
+    def workload():
+        total = 0
+        for i in range(1000):
+            total += len(pattern.findall(text)) + sum(ord(c) for c in text[:64]) + i
+        return total
+
+    return 'calibration', workload, 1
+
+
+def measure(cases, repeat):
+    """
+    Seconds per operation of every (name, function, operations) case
+    Each round calls every function once; the fastest round counts.
+    """
+    best = {name: float('inf') for name, _, _ in cases}
+    for _ in range(repeat):
+        for name, function, _ in cases:
+            # Like timeit: collections would land on whichever case is running
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                function()
+                best[name] = min(best[name], time.perf_counter() - start)
+            finally:
+                gc.enable()
+    return {name: best[name] / operations for name, _, operations in cases}
+
+
+def extractor_cases(corpus):
+    from feature_extraction import SMSFeatureExtractor
+
+    extractor = SMSFeatureExtractor()
+    texts = [record['text'] for record in corpus]
+
+    def per_message(method, messages):
+        return lambda: [method(text) for text in messages]
+
+    cases = [(f'extractor.{name}', per_message(getattr(extractor, name), texts), len(texts))
+             for name in EXTRACTOR_METHODS]
+    cases.append(('extractor.extract_batch', lambda: extractor.extract_batch(texts), len(texts)))
+
+    slices = {f'language={language}': [r['text'] for r in corpus if r['language'] == language]
+              for language in ('en', 'bn', 'as', 'mixed')}
+    slices['long'] = [r['text'] for r in corpus if 'long' in r['tags']]
+    for label, slice_texts in slices.items():
+        if slice_texts:
+            cases.append((f'extractor.extract_features[{label}]',
+                          per_message(extractor.extract_features, slice_texts), len(slice_texts)))
+    return cases
+
+
+def inference_cases(corpus, model_path):
+    from joblib import load
+    from feature_extraction import SMSFeatureExtractor
+    from forest_engine import CompiledForest, DecisionTable
+
+    model = load(model_path)
+    features = SMSFeatureExtractor().extract_batch([record['text'] for record in corpus])
+    rows = [features[i:i + 1] for i in range(200)]
+    batch = features[:256]
+    compiled = CompiledForest.from_sklearn(model)
+    table = DecisionTable(compiled)
+    table.predict_proba(features)
+
+    def single(scorer):
+        return lambda: [scorer.predict_proba(row) for row in rows]
+
+    def batched(scorer):
+        return lambda: scorer.predict_proba(batch)
+
+    cases = []
+    for label, scorer in (('sklearn', model), ('compiled_forest', compiled), ('decision_table', table)):
+        cases.append((f'inference.{label}.single', single(scorer), len(rows)))
+        cases.append((f'inference.{label}.batch256', batched(scorer), len(batch)))
+    return cases
+
+
+def api_cases(corpus):
+    # Every request has to run extraction and inference
+    os.environ['PREDICTION_CACHE_SIZE'] = '0'
+    os.environ['CAMPAIGN_INDEX_SIZE'] = '0'
+    os.environ['DECISION_TABLE_SIZE'] = '0'
+    os.environ['MICRO_BATCH_WAIT_MS'] = '0'
+    os.environ['MODEL_RELOAD_INTERVAL'] = '0'
+    os.environ['REQUEST_LOG_SAMPLE_RATE'] = '0'
+    os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    import app as flask_app
+
+    client = flask_app.app.test_client()
+    texts = [record['text'] for record in corpus][:100]
+
+    def post(path, body):
+        response = client.post(path, json=body)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} answered {response.status_code}: {response.get_data(as_text=True)}")
+
+    def post_each(path):
+        return lambda: [post(path, {'message': text}) for text in texts]
+
+    return [
+        ('api./api/predict', post_each('/api/predict'), len(texts)),
+        ('api./api/predict_simple', post_each('/api/predict_simple'), len(texts)),
+        ('api./api/predict_batch[100]', lambda: post('/api/predict_batch', {'messages': texts}), 1),
+    ]
+
+
+def corpus_fingerprint(corpus):
+    digest = hashlib.sha256()
+    for record in corpus:
+        digest.update(record['text'].encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:16]
+
+
+def time_cases(cases, repeat):
+    """Results entries of the cases, and the calibration time they are relative to"""
+    with warnings.catch_warnings():
+        # The model is fitted with feature names and scored with plain arrays, like in app.py
+        warnings.simplefilter('ignore', UserWarning)
+        timings = measure([calibration_case()] + cases, repeat)
+    calibration = timings.pop('calibration')
+    entries = {name: {'us': round(seconds * 1e6, 3), 'relative': seconds / calibration}
+               for name, seconds in timings.items()}
+    return entries, calibration
+
+
+def run(args):
+    """Results of every suite, and the cases they were measured with"""
+    corpus = generate_corpus(args.messages, seed=args.seed)
+    calibration = {}
+    results = {}
+    cases = {}
+    for suite in args.suites:
+        started = time.perf_counter()
+        if suite == 'extractor':
+            suite_cases = extractor_cases(corpus)
+        elif suite == 'inference':
+            suite_cases = inference_cases(corpus, args.model)
+        else:
+            suite_cases = api_cases(corpus)
+
+        entries, calibration[suite] = time_cases(suite_cases, args.repeat)
+        results.update(entries)
+        cases.update((case[0], case) for case in suite_cases)
+        print(f"{suite}: {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    return {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'messages': args.messages,
+            'seed': args.seed,
+            'corpus': corpus_fingerprint(corpus),
+            'repeat': args.repeat,
+            'suites': list(args.suites),
+            'calibration_seconds': calibration
+        },
+        'results': results
+    }, cases
+
+
+def confirm(results, cases, names, repeat):
+    """
+    Measure suspected regressions once more, in a round of their own
+    A single slow patch of the machine then cannot fail the run; the faster
+    of both measurements of every case is kept.
+    """
+    entries, _ = time_cases([cases[name] for name in names], 2 * repeat)
+    for name, entry in entries.items():
+        if entry['relative'] < results['results'][name]['relative']:
+            results['results'][name] = entry
+
+
+def compare(results, baseline, tolerance, names=None):
+    """Print results against the baseline (only ``names`` if given), return the regressions"""
+    if results['meta']['corpus'] != baseline['meta']['corpus']:
+        raise ValueError(
+            f"Baseline was recorded on corpus {baseline['meta']['corpus']} "
+            f"({baseline['meta']['messages']} messages, seed {baseline['meta']['seed']}), "
+            f"this run used {results['meta']['corpus']}"
+        )
+
+    regressions = []
+    print(f"{'benchmark':<52} {'us':>10} {'baseline':>10} {'change':>8}")
+    for name, entry in sorted(baseline['results'].items()):
+        suite = name.split('.', 1)[0]
+        if suite not in results['meta']['suites'] or (names is not None and name not in names):
+            continue
+        current = results['results'].get(name)
+        if current is None:
+            print(f"{name:<52} {'missing':>10} {entry['us']:>10.2f}   FAILED")
+            regressions.append(name)
+            continue
+        change = current['relative'] / entry['relative'] - 1
+        flag = ''
+        if change > tolerance:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:<52} {current['us']:>10.2f} {entry['us']:>10.2f} {change:>+7.0%}{flag}")
+
+    for name in sorted(set(results['results']) - set(baseline['results'])):
+        if names is not None:
+            break
+        print(f"{name:<52} {results['results'][name]['us']:>10.2f} {'new':>10}")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    results, cases = run(args)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        sys.exit(f"No baseline at {args.baseline}, record one with --update-baseline")
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.tolerance)
+    suspects = [name for name in regressions if name in cases]
+    if suspects:
+        print(f"\nMeasuring {len(suspects)} suspected regression(s) again", file=sys.stderr)
+        confirm(results, cases, suspects, args.repeat)
+        regressions = [name for name in regressions if name not in suspects] + \
+            compare(results, baseline, args.tolerance, names=suspects)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    if regressions:
+        print(f"\nFAILED: {len(regressions)} benchmark(s) more than {args.tolerance:.0%} slower than "
+              f"{args.baseline}: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+    print(f"\nOK: no benchmark more than {args.tolerance:.0%} slower than {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# campaign_index.py
+import hashlib
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict
+import numpy as np
+
+# Parts of a templated message that change between copies of a campaign
+URL_RE = re.compile(r'(?:https?://|www\.)?((?:[a-zA-Z0-9-]+\.)+[a-zA-Z]{2,})(?:/\S*)?')
+NUMBER_RE = re.compile(r'\d+(?:[.,:/-]\d+)*')
+TOKEN_RE = re.compile(r'\w+|[^\w\s]')
+
+
+def campaign_tokens(message):
+    """Tokens of a message with URL paths and numbers abstracted away"""
+    text = URL_RE.sub(lambda match: match.group(1), message.lower())
+    text = NUMBER_RE.sub('0', text)
+    return TOKEN_RE.findall(text)
+
+
+def simhash(tokens, shingle_size=3):
+    """64-bit SimHash over the word shingles of a token list"""
+    size = min(shingle_size, len(tokens))
+    shingles = [' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+    digests = b''.join(
+        hashlib.blake2b(shingle.encode('utf-8', 'surrogatepass'), digest_size=8).digest()
+        for shingle in shingles
+    )
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8)).reshape(len(shingles), 64)
+    majority = bits.sum(axis=0) * 2 > len(shingles)
+    return int.from_bytes(np.packbits(majority).tobytes(), 'big')
+
+
+class CampaignIndex:
+    """
+    Near-duplicate index of recently and confidently scored messages
+
+    Messages are fingerprinted with a SimHash of their word shingles after
+    URL paths and numbers are abstracted, so copies of one templated
+    campaign that only differ in phone number, amount or short-URL slug
+    land within a few bits of each other. A lookup returns the verdict of
+    an indexed message whose fingerprint is at most ``max_distance`` bits
+    away. The fingerprint is split into ``max_distance + 1`` blocks; any
+    such neighbour shares at least one block exactly, so only the entries
+    filed under the message's own blocks are compared.
+
+    Only verdicts with a top probability of at least ``min_confidence`` are
+    indexed. The index holds at most ``max_entries`` fingerprints (least
+    recently used first out), forgets them after ``ttl`` seconds, and
+    clears itself when used with a different model object.
+    """
+
+    def __init__(self, max_entries=50000, ttl=900, max_distance=3,
+                 min_confidence=0.9, min_tokens=5):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.min_confidence = min_confidence
+        self.min_tokens = min_tokens
+
+        blocks = max_distance + 1
+        bounds = [64 * i // blocks for i in range(blocks + 1)]
+        self._blocks = [(start, (1 << (end - start)) - 1) for start, end in zip(bounds, bounds[1:])]
+        self._tables = [{} for _ in self._blocks]
+        self._entries = OrderedDict()
+        self._model_ref = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def fingerprint(self, message):
+        """SimHash of a message, or None if it is too short to index"""
+        tokens = campaign_tokens(message)
+        if len(tokens) < self.min_tokens:
+            return None
+        return simhash(tokens)
+
+    def lookup(self, fingerprint, model):
+        """Verdict of a near-duplicate scored by this model, or None"""
+        if not self.enabled or fingerprint is None:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            self._check_model(model)
+            best = None
+            for candidate in self._candidates(fingerprint):
+                expires, value = self._entries[candidate]
+                if expires is not None and expires < now:
+                    continue
+                distance = bin(candidate ^ fingerprint).count('1')
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, candidate, value)
+
+            if best is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best[1])
+            self.hits += 1
+            return best[2]
+
+    def add(self, fingerprint, model, value, confidence):
+        """Index the verdict of a message if it was confident enough"""
+        if not self.enabled or fingerprint is None or confidence is None:
+            return
+        if confidence < self.min_confidence:
+            return
+
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._check_model(model)
+            if fingerprint not in self._entries:
+                for (shift, mask), table in zip(self._blocks, self._tables):
+                    table.setdefault((fingerprint >> shift) & mask, set()).add(fingerprint)
+            self._entries[fingerprint] = (expires, value)
+            self._entries.move_to_end(fingerprint)
+
+            self._drop_expired()
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'max_distance': self.max_distance,
+                'min_confidence': self.min_confidence,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+    def _candidates(self, fingerprint):
+        """Indexed fingerprints sharing at least one block with fingerprint"""
+        candidates = set()
+        for (shift, mask), table in zip(self._blocks, self._tables):
+            candidates.update(table.get((fingerprint >> shift) & mask, ()))
+        return candidates
+
+    def _remove(self, fingerprint):
+        del self._entries[fingerprint]
+        for (shift, mask), table in zip(self._blocks, self._tables):
+            key = (fingerprint >> shift) & mask
+            bucket = table[key]
+            bucket.discard(fingerprint)
+            if not bucket:
+                del table[key]
+
+    def _drop_expired(self):
+        """Remove expired entries from the least recently used end"""
+        now = time.monotonic()
+        while self._entries:
+            fingerprint = next(iter(self._entries))
+            expires, _ = self._entries[fingerprint]
+            if expires is None or expires >= now:
+                break
+            self._remove(fingerprint)
+
+    def _check_model(self, model):
+        """Drop every entry if they were scored by another model (lock held)"""
+        if self._model_ref is not None and self._model_ref() is model:
+            return
+        if self._entries:
+            self._entries.clear()
+            for table in self._tables:
+                table.clear()
+            self.invalidations += 1
+        self._model_ref = weakref.ref(model) if model is not None else None
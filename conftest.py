@@ -0,0 +1,52 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from feature_extraction import SMSFeatureExtractor
+from synthetic_corpus import generate_corpus
+
+
+@pytest.fixture(scope='session')
+def extractor():
+    return SMSFeatureExtractor()
+
+
+@pytest.fixture(scope='session')
+def corpus():
+    return generate_corpus(1500, seed=11)
+
+
+@pytest.fixture(scope='session')
+def corpus_features(extractor, corpus):
+    return extractor.extract_batch([record['text'] for record in corpus])
+
+
+@pytest.fixture(scope='session')
+def corpus_labels(corpus):
+    return np.array([record['kind'] for record in corpus])
+
+
+def fit_forest(extractor, features, labels, **params):
+    """Forest fitted like train_model.py does: on a DataFrame, so with feature names"""
+    X = pd.DataFrame(features, columns=extractor.feature_columns)
+    model = RandomForestClassifier(random_state=0, **{'n_estimators': 25, **params})
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        return model.fit(X, labels)
+
+
+@pytest.fixture(scope='session')
+def trained_model(extractor, corpus_features, corpus_labels):
+    """Forest with 'ham'/'spam' labels trained on the synthetic corpus"""
+    return fit_forest(extractor, corpus_features, corpus_labels)
+
+
+@pytest.fixture(autouse=True)
+def _ignore_feature_name_warnings():
+    # The models are fitted with feature names and scored with plain arrays, like in app.py
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        yield
@@ -0,0 +1,162 @@
+# feature_cache.py
+"""
+On-disk cache of extracted feature matrices for retraining
+
+The (n, 17) float32 matrix of a dataset is stored as <prefix>.<key>.npy,
+named after its contents (texts and extractor), next to a <prefix>.json
+manifest naming that file and holding the number of rows it covers, the
+SHA-256 of those rows' texts and the extractor fingerprint
+(EXTRACTOR_VERSION and feature columns). A later run:
+
+    same texts                  memory-maps the .npy read-only, no copy and
+                                no extraction
+    rows appended at the end    extracts only the new rows and writes the
+                                merged matrix
+    anything else changed, or   extracts everything and replaces the entry
+    another extractor version
+
+A rebuild writes a new .npy next to the old one and commits it by
+replacing the manifest; the old .npy is deleted only after that. A crash
+at any point leaves the old manifest with the array it describes, never
+with another dataset's features.
+"""
+import hashlib
+import json
+import os
+import re
+import numpy as np
+from feature_extraction import EXTRACTOR_VERSION
+
+CACHE_FORMAT_VERSION = 2
+
+
+def extractor_fingerprint(feature_columns, extractor_version=EXTRACTOR_VERSION):
+    """Short hash of everything that changes the extracted values"""
+    spec = json.dumps({'version': extractor_version, 'columns': list(feature_columns), 'dtype': 'float32'})
+    return hashlib.sha256(spec.encode('utf-8')).hexdigest()[:16]
+
+
+def _text_hashes(texts, prefix_rows):
+    """SHA-256 of the first prefix_rows texts and of all texts, in one pass"""
+    digest = hashlib.sha256()
+    prefix = digest.hexdigest() if prefix_rows == 0 else None
+    for row, text in enumerate(texts, start=1):
+        # feature_values scores non-strings (e.g. NaN) as str(value)
+        digest.update((text if isinstance(text, str) else str(text)).encode('utf-8', 'surrogatepass'))
+        digest.update(b'\0')
+        if row == prefix_rows:
+            prefix = digest.hexdigest()
+    return prefix, digest.hexdigest()
+
+
+class FeatureCache:
+    """
+    Feature matrices of one dataset, cached under ``prefix``
+
+    ``extract`` turns a list of texts into their float32 feature matrix,
+    e.g. a bound SMSFeatureExtractor.extract_batch_parallel.
+    """
+
+    def __init__(self, prefix, feature_columns, extract, extractor_version=EXTRACTOR_VERSION):
+        self.prefix = prefix
+        self.manifest_path = f"{prefix}.json"
+        # The array file of the last features() call
+        self.array_path = None
+        self.feature_columns = list(feature_columns)
+        self.fingerprint = extractor_fingerprint(feature_columns, extractor_version)
+        self.extractor_version = extractor_version
+        self.extract = extract
+
+    def _array_path(self, sha256):
+        """Content-addressed array file of these texts and this extractor"""
+        key = hashlib.sha256(f"{self.fingerprint}:{sha256}".encode('ascii')).hexdigest()[:16]
+        return f"{self.prefix}.{key}.npy"
+
+    def _manifest(self):
+        """The stored manifest if it was written by this extractor and its array exists, else None"""
+        if not os.path.exists(self.manifest_path):
+            return None
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != CACHE_FORMAT_VERSION or manifest.get('fingerprint') != self.fingerprint:
+            return None
+        manifest['array_path'] = os.path.join(os.path.dirname(self.manifest_path), manifest['array'])
+        if not os.path.exists(manifest['array_path']):
+            return None
+        return manifest
+
+    def features(self, texts):
+        """
+        Feature matrix of texts, and what happened: 'hit', 'appended' or 'miss'
+        The matrix is a read-only memory map of the cache file.
+        """
+        texts = list(texts)
+        manifest = self._manifest()
+        cached_rows = manifest['rows'] if manifest is not None and manifest['rows'] <= len(texts) else 0
+        prefix_hash, full_hash = _text_hashes(texts, cached_rows)
+
+        if manifest is not None and cached_rows == manifest['rows'] and prefix_hash == manifest['sha256']:
+            cached = np.load(manifest['array_path'], mmap_mode='r')
+            if cached.shape == (cached_rows, len(self.feature_columns)):
+                if cached_rows == len(texts):
+                    self.array_path = manifest['array_path']
+                    return cached, 'hit'
+                new_rows = self.extract(texts[cached_rows:])
+                self.array_path = self._write(texts, full_hash, cached, new_rows)
+                return np.load(self.array_path, mmap_mode='r'), 'appended'
+
+        self.array_path = self._write(texts, full_hash, None, self.extract(texts))
+        return np.load(self.array_path, mmap_mode='r'), 'miss'
+
+    def _write(self, texts, sha256, head, tail):
+        """
+        Store head (cached rows, may be None) followed by tail in a new array
+        file, commit it by replacing the manifest and return its path
+        """
+        n_head = 0 if head is None else len(head)
+        array_path = self._array_path(sha256)
+        directory = os.path.dirname(os.path.abspath(array_path))
+        os.makedirs(directory, exist_ok=True)
+
+        temporary = f"{array_path}.tmp"
+        out = np.lib.format.open_memmap(temporary, mode='w+', dtype=np.float32,
+                                        shape=(n_head + len(tail), len(self.feature_columns)))
+        if head is not None:
+            out[:n_head] = head
+        out[n_head:] = tail
+        out.flush()
+        del out
+        os.replace(temporary, array_path)
+
+        manifest = {
+            'format_version': CACHE_FORMAT_VERSION,
+            'fingerprint': self.fingerprint,
+            'extractor_version': self.extractor_version,
+            'feature_columns': self.feature_columns,
+            'rows': len(texts),
+            'sha256': sha256,
+            'array': os.path.basename(array_path)
+        }
+        temporary = f"{self.manifest_path}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temporary, self.manifest_path)
+        self._remove_stale_arrays(array_path)
+        return array_path
+
+    def _remove_stale_arrays(self, keep):
+        """Delete the arrays of replaced entries and of interrupted writes"""
+        directory = os.path.dirname(os.path.abspath(self.prefix))
+        name = os.path.basename(self.prefix)
+        # <prefix>.npy is the array of format version 1
+        stale = re.compile(re.escape(name) + r'(\.[0-9a-f]{16})?\.npy(\.tmp)?')
+        for entry in os.listdir(directory):
+            if stale.fullmatch(entry) and entry != os.path.basename(keep):
+                os.remove(os.path.join(directory, entry))
+
+
+def dataset_cache_prefix(directory, data_path):
+    """Cache prefix of a dataset file: one entry per dataset name"""
+    name = os.path.splitext(os.path.basename(data_path))[0]
+    return os.path.join(directory, name)
+
@@ -1,10 +1,529 @@
 # feature_extraction.py
+import os
 import re
+import time
 import unicodedata
 import string
-from collections import Counter
+import threading
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import cached_property
 import numpy as np
 
+# Bump whenever the definition of a feature changes: model artifacts and
+# cached feature matrices record it and are rejected when it differs
+EXTRACTOR_VERSION = '1'
+
+
+def _any_of(patterns, flags=0):
+    """Compile a list of patterns into a single alternation"""
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), flags)
+
+
+def _trie_pattern(words):
+    """Regular expression for a set of literals, factored along their common prefixes"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if '' in node:
+            # Greedy optional group, so the longest keyword wins
+            return '(?:' + '|'.join(branches) + ')?'
+        if len(branches) == 1:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')'
+    
+    return emit(trie)
+
+
+# ---------------------------------------------------------------------------
+# Pattern registry
+#
+# Every regular expression used by SMSFeatureExtractor is compiled once, at
+# import time. Binary features that only need to know whether *any* of their
+# patterns occur are merged into one alternation, so each of them costs a
+# single scan of the message.
+# ---------------------------------------------------------------------------
+
+_BN_DIGIT = r'[১২৩৪৫৬৭৮৯০]'
+_BN_MONTHS = (r'জান(?:ু|ূ)য়ার(?:ী|ি)|ফেব্র(?:ু|ূ)য়ার(?:ী|ি)|মার্চ|এপ্রিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|'
+              r'আগস্ট|সেপ্টেম্বর|অক্টোবর|নভেম্বর|ডিসেম্বর')
+_AS_MONTHS = (r'জান(?:ু|ূ)ৱার(?:ী|ি)|ফেব্র(?:ু|ূ)ৱার(?:ী|ি)|মাৰ্চ|এপ্ৰিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|'
+              r'আগষ্ট|ছেপ্টেম্বৰ|অক্টোবৰ|নৱেম্বৰ|ডিচেম্বৰ')
+_BN_AS_MONTHS = _BN_MONTHS + '|' + _AS_MONTHS
+_EN_MONTHS_SHORT = r'Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec'
+_EN_MONTHS_LONG = r'January|February|March|April|May|June|July|August|September|October|November|December'
+_RELATIVE_DAYS = r'আজি|আজ|কালি|কাল|গতকালি|গতকাল|পরশু|পৰহি'
+_WEEKDAYS = (r'সোমবাৰ|মঙ্গলবাৰ|বুধবাৰ|বৃহস্পতিবাৰ|শুক্ৰবাৰ|শনিবাৰ|ৰবিবাৰ|'
+             r'সোমবার|মঙ্গলবার|বুধবার|বৃহস্পতিবার|শুক্রবার|শনিবার|রবিবার')
+_DATE_SUFFIX = r'(?:তারিখ(?:ে|ের|)|তাৰিখ(?:ে|ৰ|ত))'
+
+# Phone numbers. Every pattern below is long enough that a match always holds
+# at least five digits, and ``\d`` already covers Bengali digits, so a plain
+# search on the original text is sufficient. The former mixed-script patterns
+# are subsumed by these and are not repeated.
+PHONE_PATTERNS = [
+    r'\+?\d{2}\s*\d{10}',
+    r'\d{10,11}',
+    r'\+?\d{1,4}[-\s]?\d{2,4}[-\s]?\d{2,4}[-\s]?\d{2,4}',
+    r'\b\d{5,9}\b',
+    r'\b\d{2,5}[-\s]\d{3,5}\b',
+    r'\(\d{2,4}\)[-\s]?\d{3,6}\b',
+    r'\b0\d{2,4}[-\s]?\d{3,6}\b',
+    r'\d{3,4}\s+\d{2}\s+\d{5}',
+    r'\(\d{3,4}\)\s*\d{6,8}'
+]
+
+# URLs removed before looking at punctuation
+URL_PATTERN = re.compile(r'https?://[^\s]+|www\.[^\s]+|[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}[^\s]*')
+# URLs removed before looking at the script mix
+SCHEME_URL_PATTERN = re.compile(r'https?://\S+|www\.\S+')
+
+SHORT_URL_PATTERNS = [
+    r'bit\.ly/\S+',
+    r'goo\.gl/\S+',
+    r'tinyurl\.com/\S+',
+    r't\.co/\S+'
+]
+
+# A regular URL match never extends past the host, so it can never itself
+# contain one of the short URL paths above.
+REGULAR_URL_PATTERNS = [
+    r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+',
+    r'www\.(?:[-\w.]|(?:%[\da-fA-F]{2}))+'
+]
+
+# Matched case-insensitively
+CURRENCY_WORD_PATTERNS = [
+    r'Rs\.?', r'INR',
+    r'dollar', r'euro', r'rupee'
+]
+
+CURRENCY_SYMBOLS = [
+    '₹', 'रुपया',
+    '$', '€', '£', '¥'
+]
+
+CURRENCY_TERMS = [
+    'টাকা', 'টকা', 'পয়সা', 'পোইসা', 'তাকা',
+    'পইচা', 'পাই', 'ধন',
+    'taka', 'toka', 'poisa', 'paisa', 'টকীয়া'
+]
+
+# Python's re has no POSIX classes: the legacy "[[:punct:]]" is the set of
+# "[", ":", "p", "u", "n", "c", "t" followed by a literal "]". Written out
+# to keep that behavior without the "possible nested set" FutureWarning
+_LEGACY_PUNCT = r'[\[:punct]\]'
+
+DATE_PATTERNS = [
+    r'\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}',
+    rf'\d{{1,2}}-(?:{_EN_MONTHS_SHORT})-\d{{2}}',
+    rf'\d{{1,2}}(?:st|nd|rd|th)?\s+(?:{_EN_MONTHS_SHORT})\.?',
+    rf'\d{{1,2}}\s+(?:{_BN_MONTHS})(?:\w{{0,3}})?(?:,)?\s+\d{{2,4}}',
+    rf'\d{{1,2}}\s+(?:{_AS_MONTHS})(?:\w{{0,3}})?(?:,)?\s+\d{{2,4}}',
+    rf'(?:{_BN_MONTHS})(?:\w{{0,3}})?\s+\d{{1,2}}(?:,)?\s+\d{{2,4}}',
+    rf'(?:{_AS_MONTHS})(?:\w{{0,3}})?\s+\d{{1,2}}(?:,)?\s+\d{{2,4}}',
+    rf'\d{{1,2}}\s+(?:{_EN_MONTHS_LONG})\s+\d{{2,4}}',
+    rf'\d{{1,2}}\s+(?:{_EN_MONTHS_SHORT})\s+\d{{2,4}}',
+    rf'(?:{_EN_MONTHS_LONG})\s+\d{{1,2}}(?:,)?\s+\d{{2,4}}',
+    rf'(?:{_EN_MONTHS_SHORT})\s+\d{{1,2}}(?:,)?\s+\d{{2,4}}',
+    r'\d{4}\s*সাল',
+    r'\d{4}\s*(?:year|বছর|বৰ্ষ)',
+    rf'{_BN_DIGIT}{{1,2}}\s+(?:{_BN_AS_MONTHS})(?:,)?\s+{_BN_DIGIT}{{2,4}}',
+    rf'{_BN_DIGIT}{{1,2}}\s+(?:{_BN_AS_MONTHS})(?:ৰ)?\s+আগত',
+    rf'\d{{1,2}}(?:st|nd|rd|th)?\s+(?:{_EN_MONTHS_SHORT})\.?\s+তাৰিখে',
+    rf'\d{{1,2}}\s+(?:{_BN_AS_MONTHS})(?:,)?\s+\d{{2,4}}\s+{_DATE_SUFFIX}',
+    rf'{_BN_DIGIT}{{1,2}}\s+(?:{_BN_AS_MONTHS})(?:,)?\s+{_BN_DIGIT}{{2,4}}\s+{_DATE_SUFFIX}',
+    r'(?:আজি|আজ|কালি|কাল|গতকালি|গতকাল|পরশু|পৰহি|যোৱা)\s+[১২৩৪৫৬৭৮৯০]{1,2}(?:ই|ৰ|র)?\s+(?:জান(?:ু|ূ)য়ার(?:ী|ি)|ফেব্র(?:ু|ূ)য়ার(?:ী|ি)|মার্চ|এপ্রিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগস্ট|সেপ্টেম্বর|অক্টোবর|نভেম্বর|ডিসেম্বর|জান(?:ু|ূ)ৱার(?:ী|ি)|ফেব্র(?:ু|ূ)ৱার(?:ী|ি)|মাৰ্চ|এপ্ৰিল|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগষ্ট|ছেপ্টেম্বৰ|অক্টোবৰ|নৱেম্বৰ|ডিচেম্বৰ)',
+    rf'{_BN_DIGIT}{{1,2}}\s+(?:{_BN_AS_MONTHS})(?:,)?\s+{_BN_DIGIT}{{2,4}}\s+দিন(?:ত|ে)?',
+    r'(?:জান(?:ু|ূ)য়ার(?:ী|ি)|ফেব্র(?:ু|ূ)য়ার(?:ী|ি)|মার্চ|এপ্রিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগস্ট|সেপ্টেম্বর|অক্টোবর|নভেম্বর|ডিসেম্বর|জান(?:ু|ূ)ৱার(?:ী|ি)|ফেব্র(?:ু|ূ)ৱار(?:ী|ি)|মাৰ্চ|এপ্ৰিল|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগষ্ট|ছেপ্টেম্বৰ|অক্টোবৰ|নৱেম্বৰ|ডিচেম্বৰ)\s+মা(?:স|হ)',
+    rf'(?:{_RELATIVE_DAYS})\s+(?:{_BN_AS_MONTHS})(?:,)?\s+{_BN_DIGIT}{{1,4}}',
+    rf'{_BN_DIGIT}{{1,2}}\s+(?:{_BN_AS_MONTHS})(?:ত|{_LEGACY_PUNCT})?',
+    rf'{_BN_DIGIT}{{1,2}}\s+(?:{_BN_AS_MONTHS}).*?{_BN_DIGIT}{{4}}',
+    rf'{_BN_DIGIT}{{1,2}}\s+(?:{_BN_AS_MONTHS}).*?দিৱস.*?{_BN_DIGIT}{{4}}',
+    rf'{_BN_DIGIT}{{1,2}}\s+(?:{_BN_AS_MONTHS})\s+(?:".*?"|\'.*?\').*?{_BN_DIGIT}{{4}}',
+]
+
+DATE_CONTEXT_PATTERNS = [
+    rf'(?:{_RELATIVE_DAYS}|যোৱা)\s+{_BN_DIGIT}{{1,2}}\s+(?:দিন|দিনত)',
+    rf'(?:গত|বিগত|যোৱা|আহিবলগীয়া)\s+(?:সপ্তাহ|সপ্তাহত|{_WEEKDAYS})',
+    rf'(?:{_WEEKDAYS})\s+{_BN_DIGIT}{{1,2}}\s+(?:{_BN_AS_MONTHS})',
+    r'উৎসৱমুখৰ\s+ছুটিৰ\s+দিনটো',
+    rf'অফাৰ\s+শেষ\s+হ\'ব\s+{_BN_DIGIT}{{1,2}}\s+(?:{_BN_AS_MONTHS})(?:ত|{_LEGACY_PUNCT})?',
+    r'(?:আগত|পূৰ্বে)\s+এমাহৰ\s+বাবে',
+    rf'{_BN_DIGIT}{{1,2}}\s+(?:{_BN_AS_MONTHS})(?:ৰ)?\s+(?:আগত|পূৰ্বে)',
+]
+
+# Literals of which every date pattern needs at least one: month names (the
+# stems cover the spelling variants), year and weekday words and the fixed
+# phrases. They are searched in the lowercased message; "ſ" is the one
+# character IGNORECASE folds onto a month letter that lower() does not.
+DATE_HINT_WORDS = [
+    'জান', 'ফেব্র', 'মার্চ', 'এপ্রিল', 'মে', 'জু', 'জূ', 'আগস্ট', 'সেপ্টেম্বর', 'অক্টোবর', 'ভেম্বর', 'ডিসেম্বর',
+    'মাৰ্চ', 'এপ্ৰিল', 'আগষ্ট', 'ছেপ্টেম্বৰ', 'অক্টোবৰ', 'নৱেম্বৰ', 'ডিচেম্বৰ',
+    'jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'ſep', 'oct', 'nov', 'dec',
+    'সাল', 'year', 'বছর', 'বৰ্ষ', 'সপ্তাহ',
+    'সোমবাৰ', 'মঙ্গলবাৰ', 'বুধবাৰ', 'বৃহস্পতিবাৰ', 'শুক্ৰবাৰ', 'শনিবাৰ', 'ৰবিবাৰ',
+    'সোমবার', 'মঙ্গলবার', 'বুধবার', 'বৃহস্পতিবার', 'শুক্রবার', 'শনিবার', 'রবিবার',
+    'উৎসৱমুখৰ', 'অফাৰ', 'এমাহৰ'
+]
+
+# Cheap necessary condition for DATE_RE, so the merged date expression only
+# runs on messages that could hold a date
+DATE_HINT_PATTERNS = [
+    r'\d[/.-]\d{1,2}[/.-]\d',
+    rf'{_BN_DIGIT}\s+দিন',
+    _trie_pattern(DATE_HINT_WORDS)
+]
+
+TIME_PATTERNS = [
+    r'\b([0-9]|0[0-9]|1[0-2])(?::([0-5][0-9]))?(?::([0-5][0-9]))?\s*([AaPp][Mm])\b',
+    r'\b([0-9]|0[0-9]|1[0-2])(?:\.|\s)([0-5][0-9])(?:\s*|\.)([AaPp]\.?[Mm]\.?)\b',
+    r'\b([01]?[0-9]|2[0-3]):([0-5][0-9])(?::([0-5][0-9]))?\b',
+    r'\b(noon|midnight|midday)\b',
+    r'\b([0-9]|0[0-9]|1[0-2])\s+o\'?clock\b',
+    r'\b(half|quarter)\s+(past|to)\s+([0-9]|0[0-9]|1[0-2])\b',
+    r'\bat\s+([0-9]|0[0-9]|1[0-2])(?:\s+|\:)([0-5][0-9])?\s*([AaPp][Mm])?\b'
+]
+
+BN_AS_TIME_PATTERNS = [
+    r'[০-৯]{1,2}(?:[:\.।]|\s*ঃ|\s+)[০-৯]{1,2}(?:[:\.।]|\s*ঃ|\s+)?[০-৯]{0,2}',
+    r'[০-৯]{1,2}\s*(?:টা|বাজে|ঘণ্টা|घंटा)'
+]
+
+BN_AS_TIME_WORDS = [
+    'সকাল', 'ভোর', 'রাত', 'বিকাল', 'সন্ধ্যা', 'দুপুর',
+    'ৰাতি', 'পুৱা', 'গধূলি', 'আবেলি', 'নিশা', 'দুপৰীয়া',
+    'টা', 'বাজে', 'ঘণ্টা', 'মিনিট', 'সেকেন্ড',
+    'বজি', 'বাজি', 'ছেকেণ্ড'
+]
+
+TIME_PHRASE_PATTERNS = [
+    r'(?:এখন|বর্তমান|এতিয়া)\s+[০-৯]{1,2}\s*(?:টা|বাজে|ঘণ্টা|বজি)',
+    r'(?:সকাল|ভোর|রাত|বিকাল|সন্ধ্যা|দুপুর|ৰাতি|পুৱা|গধূলি|আবেলি|নিশা|দুপৰীয়া)\s+[০-৯]{1,2}',
+    r'[০-৯]{1,2}\s*(?:টা|বাজে|ঘণ্টা)\s*(?:ও|আৰু|এবং)?\s*[০-৯]{1,2}\s*(?:মিনিট|মিনিট)',
+    r'(?:ভোরে|ভোৰত|সকালে|সকালত|রাতে|ৰাতিত)\s+[০-৯]{1,2}',
+    r'[০-৯]{1,2}(?:[:\.।]|\s*ঃ|\s+)[০-৯]{1,2}\s*(?:এএম|পিএম|am|pm|a\.m\.|p\.m\.)'
+]
+
+ID_CODE_PATTERNS = [
+    # A run of ten digits always sits inside some \w+ word, which is all the
+    # original \b\w*\d{10,}\w*\b required, without its quadratic backtracking.
+    r'\d{10}',
+    r'\b[A-Za-z]+\d+\.\d+\.\d+\b'
+]
+
+SUBSCRIBER_CODE_PATTERNS = [
+    # Parenthesised group containing a 4-5 digit code, '*' or '#'
+    r'\([^\)]*?(?:\d{4}|[*#])[^\)]*\)',
+    r'\b\d{4,5}\b',
+    r'\*\d+(?:\*\d+)*\#',
+    r'\#\d',
+    r'\b[A-Za-z]+\s+\d+\b'
+]
+
+PHONE_RE = _any_of(PHONE_PATTERNS)
+SHORT_URL_RE = _any_of(SHORT_URL_PATTERNS)
+REGULAR_URL_RE = _any_of(REGULAR_URL_PATTERNS)
+ALL_CAPS_WORD_RE = re.compile(r'(?<![A-Za-z])[A-Z]{2,}(?![A-Za-z])')
+CURRENCY_WORD_RE = _any_of(CURRENCY_WORD_PATTERNS, re.IGNORECASE)
+DATE_RE = _any_of(DATE_PATTERNS + DATE_CONTEXT_PATTERNS, re.IGNORECASE)
+DATE_HINT_RE = _any_of(DATE_HINT_PATTERNS)
+TIME_RE = _any_of(
+    TIME_PATTERNS
+    + BN_AS_TIME_PATTERNS
+    + TIME_PHRASE_PATTERNS,
+    re.IGNORECASE
+)
+ID_CODE_RE = _any_of(ID_CODE_PATTERNS)
+NON_WORD_RE = re.compile(r'[^\w\s\u0980-\u09FF\u0985-\u09FB]')
+CONSECUTIVE_SPECIAL_RE = re.compile(r'([\?\!\@\#\$\%\&\*\(\)\-\_\=\+\[\]\{\}\;\:\,\.\<\>\/\\\|])\1+')
+SUBSCRIBER_CODE_RE = _any_of(SUBSCRIBER_CODE_PATTERNS)
+
+SPECIAL_CHARS = frozenset(string.punctuation) - {'₹', '?', ',', '.'}
+
+# ---------------------------------------------------------------------------
+# Character classes
+#
+# Character-class features are answered from a table mapping each relevant
+# code point to a bit mask, so a message is classified by looking up each of
+# its distinct characters once instead of testing every character per feature.
+# ---------------------------------------------------------------------------
+
+SPECIAL = 1
+LATIN = 2
+UPPER = 4
+BENGALI = 8
+EMOJI = 16
+
+EMOJI_RANGES = [
+    (0x1F600, 0x1F64F),
+    (0x1F300, 0x1F5FF),
+    (0x1F680, 0x1F6FF),
+    (0x1F700, 0x1F77F),
+    (0x1F780, 0x1F7FF),
+    (0x1F800, 0x1F8FF),
+    (0x1F900, 0x1F9FF),
+    (0x1FA00, 0x1FA6F),
+    (0x1FA70, 0x1FAFF),
+    (0x02702, 0x027B0),
+    (0x024C2, 0x0257F),
+    (0x02600, 0x026FF),
+    (0x02700, 0x027BF),
+    (0x0FE0F, 0x0FE0F),
+    (0x1F1E0, 0x1F1FF)
+]
+
+# Every character named BENGALI lives in the Bengali block (which also
+# covers Assamese), so the block is the only range that needs a name lookup.
+BENGALI_BLOCK = (0x0980, 0x09FF)
+
+
+def _build_char_classes():
+    """Map every code point that belongs to some character class to its mask"""
+    classes = {}
+    
+    def mark(char, flag):
+        classes[char] = classes.get(char, 0) | flag
+    
+    for char in SPECIAL_CHARS:
+        mark(char, SPECIAL)
+    for char in string.ascii_letters:
+        mark(char, LATIN)
+    for char in string.ascii_uppercase:
+        mark(char, UPPER)
+    for code in range(BENGALI_BLOCK[0], BENGALI_BLOCK[1] + 1):
+        name = unicodedata.name(chr(code), '')
+        if 'BENGALI' in name or 'ASSAMESE' in name:
+            mark(chr(code), BENGALI)
+    for start, end in EMOJI_RANGES:
+        for code in range(start, end + 1):
+            mark(chr(code), EMOJI)
+    
+    return classes
+
+
+CHAR_CLASSES = _build_char_classes()
+
+
+def char_classes(text):
+    """Bit mask of the character classes present in text"""
+    mask = 0
+    for char in set(text):
+        mask |= CHAR_CLASSES.get(char, 0)
+    return mask
+
+
+# ---------------------------------------------------------------------------
+# Keyword vocabularies
+# ---------------------------------------------------------------------------
+
+class KeywordMatcher:
+    """
+    Multi-literal matcher over the keyword lists of every feature
+    
+    All keywords are folded into one prefix trie and compiled into a single
+    expression, so one left-to-right scan serves every vocabulary feature and
+    its cost follows the depth of the trie rather than the number of
+    keywords. As with Aho-Corasick, every occurrence is reported, including
+    keywords that overlap or start at the same position: scanning resumes
+    one character after each hit, and the longest keyword found at a
+    position implies all of its keyword prefixes.
+    """
+    
+    def __init__(self, vocabularies):
+        self.features_of = {}
+        for feature, keywords in vocabularies.items():
+            for keyword in keywords:
+                self.features_of.setdefault(keyword, set()).add(feature)
+        
+        keywords = sorted(self.features_of)
+        self.prefixes = {
+            keyword: [prefix for prefix in keywords if keyword.startswith(prefix)]
+            for keyword in keywords
+        }
+        self.pattern = re.compile(_trie_pattern(keywords))
+    
+    def hits(self, text):
+        """Map each feature to the (start, end) spans of its keywords found in text"""
+        found = {}
+        search = self.pattern.search
+        match = search(text)
+        while match is not None:
+            start = match.start()
+            for keyword in self.prefixes[match.group()]:
+                for feature in self.features_of[keyword]:
+                    found.setdefault(feature, []).append((start, start + len(keyword)))
+            # Resume right after the start so overlapping keywords are found too
+            match = search(text, start + 1)
+        return found
+
+
+KEYWORDS = KeywordMatcher({
+    'currency': CURRENCY_SYMBOLS + CURRENCY_TERMS,
+    'time_word': BN_AS_TIME_WORDS
+})
+
+
+def _follows_bengali_digit(text, position):
+    """Whether a Bengali digit, then only whitespace, comes right before position"""
+    while position > 0 and text[position - 1].isspace():
+        position -= 1
+    return position > 0 and '০' <= text[position - 1] <= '৯'
+
+
+class MessageView:
+    """
+    Lazily computed, shared views of one message
+    
+    Every derived form of the text (URL-stripped, lowercased, tokenized,
+    character classes) is computed on first use and then reused, so
+    extracting all features normalizes the message at most once per form.
+    """
+    
+    def __init__(self, text):
+        self.text = text
+    
+    @classmethod
+    def of(cls, text):
+        """Return a view for a message, or None if it is not a string"""
+        if isinstance(text, cls):
+            return text
+        if isinstance(text, str):
+            return cls(text)
+        return None
+    
+    @cached_property
+    def classes(self):
+        """Character classes present in the message"""
+        return char_classes(self.text)
+    
+    @cached_property
+    def keyword_hits(self):
+        """Keyword spans of every vocabulary feature found in the message"""
+        return KEYWORDS.hits(self.text)
+    
+    @cached_property
+    def text_without_urls(self):
+        """Message with URLs and bare domains removed"""
+        return URL_PATTERN.sub('', self.text)
+    
+    @cached_property
+    def text_without_scheme_urls(self):
+        """Message with http(s):// and www. URLs removed"""
+        return SCHEME_URL_PATTERN.sub('', self.text)
+    
+    @cached_property
+    def lowered(self):
+        """Lowercased message"""
+        return self.text.lower()
+    
+    @cached_property
+    def tokens(self):
+        """Words of the message with punctuation removed"""
+        return NON_WORD_RE.sub('', self.text).split()
+    
+    @cached_property
+    def lowered_tokens(self):
+        """Words of the lowercased message with punctuation removed"""
+        return NON_WORD_RE.sub('', self.lowered).split()
+    
+    def classes_of(self, text):
+        """Character classes of a derived text, reusing the full scan when unchanged"""
+        return self.classes if text is self.text else char_classes(text)
+
+
+class FeatureTimings:
+    """
+    Per-extractor latency histograms
+    
+    Wall time of every extractor call is counted into fixed, log-spaced
+    microsecond buckets, split by message length bucket and by script
+    (messages containing Bengali/Assamese characters vs. the rest). Only
+    integer counters are updated per call, so recording stays cheap; the
+    percentiles in the snapshot are upper bounds read off the buckets.
+    """
+    
+    BUCKET_BOUNDS_US = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+    LENGTH_BOUNDS = [40, 160, 480]
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.messages = 0
+    
+    @classmethod
+    def length_bucket(cls, text):
+        """Label of the length bucket a message falls in"""
+        lower = 0
+        for bound in cls.LENGTH_BOUNDS:
+            if len(text) <= bound:
+                return f'{lower}-{bound}'
+            lower = bound + 1
+        return f'{lower}+'
+    
+    def record(self, view, durations_ns):
+        """Record the extractor timings, in nanoseconds, of one message"""
+        key = (self.length_bucket(view.text), 'bengali' if view.classes & BENGALI else 'latin')
+        bounds = self.BUCKET_BOUNDS_US
+        
+        with self._lock:
+            self.messages += 1
+            for name, duration_ns in durations_ns:
+                stats = self._stats.get((name,) + key)
+                if stats is None:
+                    stats = self._stats[(name,) + key] = [0, 0, [0] * (len(bounds) + 1)]
+                stats[0] += 1
+                stats[1] += duration_ns
+                stats[2][bisect_left(bounds, duration_ns / 1000)] += 1
+    
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+            self.messages = 0
+    
+    def snapshot(self):
+        """JSON-serializable summary of all histograms"""
+        with self._lock:
+            items = [(key, count, total, list(histogram))
+                     for key, (count, total, histogram) in self._stats.items()]
+            messages = self.messages
+        
+        features = {}
+        for (name, length, script), count, total_ns, histogram in sorted(items):
+            features.setdefault(name, {})[f'{script}/{length}'] = {
+                'count': count,
+                'mean_us': round(total_ns / count / 1000, 2),
+                'p50_us': self._percentile(histogram, count, 0.50),
+                'p95_us': self._percentile(histogram, count, 0.95),
+                'p99_us': self._percentile(histogram, count, 0.99),
+                'histogram': histogram
+            }
+        
+        return {
+            'messages': messages,
+            'bucket_bounds_us': self.BUCKET_BOUNDS_US,
+            'features': features
+        }
+    
+    def _percentile(self, histogram, count, fraction):
+        """Upper bound of the bucket holding the given fraction of samples"""
+        rank = fraction * count
+        seen = 0
+        for index, bucket_count in enumerate(histogram):
+            seen += bucket_count
+            if seen >= rank:
+                return self.BUCKET_BOUNDS_US[index] if index < len(self.BUCKET_BOUNDS_US) else None
+        return None
+
+
 class SMSFeatureExtractor:
     def __init__(self):
         self.feature_columns = [
@@ -14,124 +533,51 @@ class SMSFeatureExtractor:
             'has_repeated_words', 'has_consecutive_special_chars',
             'has_subscriber_code', 'avg_word_length', 'word_length'
         ]
+        # Per-extractor latency histograms, only collected once enabled
+        self.timings = None
+    
+    def enable_timing(self):
+        """Start recording per-extractor latency histograms"""
+        if self.timings is None:
+            self.timings = FeatureTimings()
+        return self.timings
+    
+    def disable_timing(self):
+        """Stop recording latency histograms and drop the collected data"""
+        self.timings = None
     
     def extract_phone_numbers(self, text):
         """Enhanced phone number extraction with comprehensive patterns"""
-        if not isinstance(text, str):
+        view = MessageView.of(text)
+        if view is None:
             return 0
         
-        digit_map = {
-            '০': '0', '১': '1', '২': '2', '৩': '3', '৪': '4',
-            '৫': '5', '৬': '6', '৭': '7', '৮': '8', '৯': '9'
-        }
-        
-        converted_text = text
-        for bn_digit, ar_digit in digit_map.items():
-            converted_text = converted_text.replace(bn_digit, ar_digit)
-        
-        phone_patterns = [
-            r'\+?\d{2}\s*\d{10}',
-            r'\d{10,11}',
-            r'\+?\d{1,4}[-\s]?\d{2,4}[-\s]?\d{2,4}[-\s]?\d{2,4}',
-            r'\b\d{5,9}\b',
-            r'\b\d{2,5}[-\s]\d{3,5}\b',
-            r'\(\d{2,4}\)[-\s]?\d{3,6}\b',
-            r'\b0\d{2,4}[-\s]?\d{3,6}\b',
-            r'\d{3,4}\s+\d{2}\s+\d{5}',
-            r'\(\d{3,4}\)\s*\d{6,8}'
-        ]
-        
-        mixed_patterns = [
-            r'\+?[০-৯\d]{2}\s*[০-৯\d]{10}',
-            r'[০-৯\d]{3,5}[-\s]?[০-৯\d]{6,7}',
-            r'[০-৯\d]{10,11}',
-            r'\b[০-৯\d]{5,9}\b',
-            r'\b[০-৯\d]{2,5}[-\s][০-৯\d]{3,5}\b'
-        ]
-        
-        for pattern in phone_patterns:
-            match = re.search(pattern, text) or re.search(pattern, converted_text)
-            if match:
-                clean_match = re.sub(r'[-\s\(\)]', '', match.group())
-                if len(clean_match) >= 5:
-                    return 1
-        
-        for pattern in mixed_patterns:
-            match = re.search(pattern, text)
-            if match:
-                clean_match = match.group()
-                for bn_digit, ar_digit in digit_map.items():
-                    clean_match = clean_match.replace(bn_digit, ar_digit)
-                clean_match = re.sub(r'\D', '', clean_match)
-                if len(clean_match) >= 5:
-                    return 1
-        
-        return 0
+        return 1 if PHONE_RE.search(view.text) else 0
     
     def extract_special_chars(self, text):
         """Enhanced special character detection excluding URLs"""
-        if not isinstance(text, str):
+        view = MessageView.of(text)
+        if view is None:
             return 0
         
-        url_pattern = r'https?://[^\s]+|www\.[^\s]+|[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}[^\s]*'
-        text_without_urls = re.sub(url_pattern, '', text)
-        
-        special_chars = set(string.punctuation)
-        special_chars.discard('₹')
-        special_chars.discard('?')
-        special_chars.discard(',')
-        special_chars.discard('.')
-        
-        return 1 if any(char in special_chars for char in text_without_urls) else 0
+        return 1 if view.classes_of(view.text_without_urls) & SPECIAL else 0
     
     def extract_all_caps_words(self, text):
         """Enhanced all caps detection for Latin script only"""
-        if not isinstance(text, str):
+        view = MessageView.of(text)
+        if view is None:
             return 0
         
-        latin_words = re.findall(r'[A-Za-z]+', text)
-        return 1 if latin_words and any(word.isupper() and len(word) > 1 for word in latin_words) else 0
+        return 1 if view.classes & UPPER and ALL_CAPS_WORD_RE.search(view.text) else 0
     
     def extract_urls(self, text):
         """Enhanced URL detection with comprehensive patterns and detailed classification"""
-        if not isinstance(text, str):
+        view = MessageView.of(text)
+        if view is None:
             return {'has_url': 0, 'has_short_url': 0, 'has_regular_url': 0}
         
-        regular_url_patterns = [
-            r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+',
-            r'www\.(?:[-\w.]|(?:%[\da-fA-F]{2}))+'
-        ]
-        
-        short_url_patterns = [
-            r'bit\.ly/\S+', 
-            r'goo\.gl/\S+', 
-            r'tinyurl\.com/\S+',
-            r't\.co/\S+'
-        ]
-        
-        has_short_url = 0
-        has_regular_url = 0
-        
-        for pattern in short_url_patterns:
-            if re.search(pattern, text):
-                has_short_url = 1
-                break
-        
-        for pattern in regular_url_patterns:
-            if re.search(pattern, text):
-                match = re.search(pattern, text)
-                matched_text = match.group(0)
-                
-                is_short_url = 0
-                for short_pattern in short_url_patterns:
-                    if re.search(short_pattern, matched_text):
-                        is_short_url = 1
-                        break
-                
-                if not is_short_url:
-                    has_regular_url = 1
-                break
-        
+        has_short_url = 1 if SHORT_URL_RE.search(view.text) else 0
+        has_regular_url = 1 if REGULAR_URL_RE.search(view.text) else 0
         has_url = 1 if (has_short_url or has_regular_url) else 0
         
         return {
@@ -142,255 +588,104 @@ class SMSFeatureExtractor:
     
     def extract_mixed_language(self, text):
         """Enhanced mixed language detection (Bengali/Assamese + Latin)"""
-        if not isinstance(text, str):
+        view = MessageView.of(text)
+        if view is None:
             return 0
         
-        url_pattern = r'https?://\S+|www\.\S+'
-        text_without_urls = re.sub(url_pattern, '', text)
-        
-        has_bengali_assamese = 0
-        has_latin = bool(re.search(r'[A-Za-z]', text_without_urls))
+        classes = view.classes_of(view.text_without_scheme_urls)
         
-        for char in text_without_urls:
-            try:
-                char_name = unicodedata.name(char, '')
-                if 'BENGALI' in char_name or 'ASSAMESE' in char_name:
-                    has_bengali_assamese = 1
-                    break
-            except ValueError:
-                continue
+        has_bengali_assamese = classes & BENGALI
+        has_latin = classes & LATIN
         
         return 1 if has_bengali_assamese and has_latin else 0
     
     def extract_currency(self, text):
         """Enhanced currency detection with comprehensive patterns"""
-        if not isinstance(text, str):
+        view = MessageView.of(text)
+        if view is None:
             return 0
         
-        simple_patterns = [
-            r'₹', r'रुपया', 
-            r'Rs\.?', r'INR',
-            r'\$', r'€', r'£', r'¥',
-            r'dollar', r'euro', r'rupee'
-        ]
-        
-        for pattern in simple_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return 1
-        
-        currency_terms = [
-            'টাকা', 'টকা', 'পয়সা', 'পোইসা', 'তাকা',
-            'টকা', 'টাকা', 'পইচা', 'পাই', 'ধন',
-            'taka', 'toka', 'poisa', 'paisa', 'টকীয়া'
-        ]
-        
-        for term in currency_terms:
-            if term in text:
-                return 1
-        
-        for term in currency_terms:
-            pattern = term + r'\w*'
-            if re.search(pattern, text):
-                return 1
+        if 'currency' in view.keyword_hits:
+            return 1
         
-        return 0
+        return 1 if CURRENCY_WORD_RE.search(view.text) else 0
     
     def extract_date(self, text):
         """Check for date/time patterns"""
-        if not isinstance(text, str):
+        view = MessageView.of(text)
+        if view is None:
             return 0
         
-        date_patterns = [
-            r'\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}',
-            r'\d{1,2}-(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)-\d{2}',
-            r'\d{1,2}(?:st|nd|rd|th)?\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\.?',
-            r'\d{1,2}\s+(?:জান(?:ু|ূ)য়ার(?:ী|ি)|ফেব্র(?:ু|ূ)য়ার(?:ী|ি)|মার্চ|এপ্রিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগস্ট|সেপ্টেম্বর|অক্টোবর|নভেম্বর|ডিসেম্বর)(?:\w{0,3})?(?:,)?\s+\d{2,4}',
-            r'\d{1,2}\s+(?:জান(?:ু|ূ)ৱার(?:ী|ি)|ফেব্র(?:ু|ূ)ৱার(?:ী|ি)|মাৰ্চ|এপ্ৰিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগষ্ট|ছেপ্টেম্বৰ|অক্টোবৰ|নৱেম্বৰ|ডিচেম্বৰ)(?:\w{0,3})?(?:,)?\s+\d{2,4}',
-            r'(?:জান(?:ু|ূ)য়ার(?:ী|ি)|ফেব্র(?:ু|ূ)য়ার(?:ী|ি)|মার্চ|এপ্রিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগস্ট|সেপ্টেম্বর|অক্টোবর|নভেম্বর|ডিসেম্বর)(?:\w{0,3})?\s+\d{1,2}(?:,)?\s+\d{2,4}',
-            r'(?:জান(?:ু|ূ)ৱার(?:ী|ি)|ফেব্র(?:ু|ূ)ৱার(?:ী|ি)|মাৰ্চ|এপ্ৰিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগষ্ট|ছেপ্টেম্বৰ|অক্টোবৰ|নৱেম্বৰ|ডিচেম্বৰ)(?:\w{0,3})?\s+\d{1,2}(?:,)?\s+\d{2,4}',
-            r'\d{1,2}\s+(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{2,4}',
-            r'\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{2,4}',
-            r'(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2}(?:,)?\s+\d{2,4}',
-            r'(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2}(?:,)?\s+\d{2,4}',
-            r'\d{4}\s*সাল',
-            r'\d{4}\s*(?:year|বছর|বৰ্ষ)',
-            r'[১২৩৪৫৬৭৮৯০]{1,2}\s+(?:জান(?:ু|ূ)য়ার(?:ী|ি)|ফেব্র(?:ু|ূ)য়ার(?:ী|ি)|মার্চ|এপ্রিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগস্ট|সেপ্টেম্বর|অক্টোবর|নভেম্বর|ডিসেম্বর|জান(?:ু|ূ)ৱার(?:ী|ি)|ফেব্র(?:ু|ূ)ৱার(?:ী|ি)|মাৰ্চ|এপ্ৰিল|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগষ্ট|ছেপ্টেম্বৰ|অক্টোবৰ|নৱেম্বৰ|ডিচেম্বৰ)(?:,)?\s+[১২৩৪৫৬৭৮৯০]{2,4}',
-            r'[১২৩৪৫৬৭৮৯০]{1,2}\s+(?:জান(?:ু|ূ)য়ার(?:ী|ি)|ফেব্র(?:ু|ূ)য়ার(?:ী|ি)|মার্চ|এপ্রিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগস্ট|সেপ্টেম্বর|অক্টোবর|নভেম্বর|ডিসেম্বর|জান(?:ু|ূ)ৱার(?:ী|ি)|ফেব্র(?:ু|ূ)ৱার(?:ী|ি)|মাৰ্চ|এপ্ৰিল|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগষ্ট|ছেপ্টেম্বৰ|অক্টোবৰ|নৱেম্বৰ|ডিচেম্বৰ)(?:ৰ)?\s+আগত',
-            r'\d{1,2}(?:st|nd|rd|th)?\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\.?\s+তাৰিখে',
-            r'\d{1,2}\s+(?:জান(?:ু|ূ)য়ার(?:ী|ি)|ফেব্র(?:ু|ূ)য়ার(?:ী|ি)|মার্চ|এপ্রিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগস্ট|সেপ্টেম্বর|অক্টোবর|নভেম্বর|ডিসেম্বর|জান(?:ু|ূ)ৱার(?:ী|ি)|ফেব্র(?:ু|ূ)ৱার(?:ী|ি)|মাৰ্চ|এপ্ৰিল|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগষ্ট|ছেপ্টেম্বৰ|অক্টোবৰ|নৱেম্বৰ|ডিচেম্বৰ)(?:,)?\s+\d{2,4}\s+(?:তারিখ(?:ে|ের|)|তাৰিখ(?:ে|ৰ|ত))',
-            r'[১২৩৪৫৬৭৮৯০]{1,2}\s+(?:জান(?:ু|ূ)য়ার(?:ী|ি)|ফেব্র(?:ু|ূ)য়ার(?:ী|ি)|মার্চ|এপ্রিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগস্ট|সেপ্টেম্বর|অক্টোবর|নভেম্বর|ডিসেম্বর|জান(?:ু|ূ)ৱার(?:ী|ি)|ফেব্র(?:ু|ূ)ৱার(?:ী|ি)|মাৰ্চ|এপ্ৰিল|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগষ্ট|ছেপ্টেম্বৰ|অক্টোবৰ|নৱেম্বৰ|ডিচেম্বৰ)(?:,)?\s+[১২৩৪৫৬৭৮৯০]{2,4}\s+(?:তারিখ(?:ে|ের|)|তাৰিখ(?:ে|ৰ|ত))',
-            r'(?:আজি|আজ|কালি|কাল|গতকালি|গতকাল|পরশু|পৰহি|যোৱা)\s+[১২৩৪৫৬৭৮৯০]{1,2}(?:ই|ৰ|র)?\s+(?:জান(?:ু|ূ)য়ার(?:ী|ি)|ফেব্র(?:ু|ূ)য়ার(?:ী|ি)|মার্চ|এপ্রিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগস্ট|সেপ্টেম্বর|অক্টোবর|نভেম্বর|ডিসেম্বর|জান(?:ু|ূ)ৱার(?:ী|ি)|ফেব্র(?:ু|ূ)ৱার(?:ী|ি)|মাৰ্চ|এপ্ৰিল|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগষ্ট|ছেপ্টেম্বৰ|অক্টোবৰ|নৱেম্বৰ|ডিচেম্বৰ)',
-            r'[১২৩৪৫৬৭৮৯০]{1,2}\s+(?:জান(?:ু|ূ)য়ার(?:ী|ি)|ফেব্র(?:ু|ূ)য়ার(?:ী|ি)|মার্চ|এপ্রিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগস্ট|সেপ্টেম্বর|অক্টোবর|নভেম্বর|ডিসেম্বর|জান(?:ু|ূ)ৱার(?:ী|ি)|ফেব্র(?:ু|ূ)ৱার(?:ী|ি)|মাৰ্চ|এপ্ৰিল|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগষ্ট|ছেপ্টেম্বৰ|অক্টোবৰ|নৱেম্বৰ|ডিচেম্বৰ)(?:,)?\s+[১২৩৪৫৬৭৮৯০]{2,4}\s+দিন(?:ত|ে)?',
-            r'(?:জান(?:ু|ূ)য়ার(?:ী|ি)|ফেব্র(?:ু|ূ)য়ার(?:ী|ি)|মার্চ|এপ্রিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগস্ট|সেপ্টেম্বর|অক্টোবর|নভেম্বর|ডিসেম্বর|জান(?:ু|ূ)ৱার(?:ী|ি)|ফেব্র(?:ু|ূ)ৱار(?:ী|ি)|মাৰ্চ|এপ্ৰিল|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগষ্ট|ছেপ্টেম্বৰ|অক্টোবৰ|নৱেম্বৰ|ডিচেম্বৰ)\s+মা(?:স|হ)',
-            r'(?:আজি|আজ|কালি|কাল|গতকালি|গতকাল|পরশু|পৰহি)\s+(?:জান(?:ু|ূ)য়ার(?:ী|ি)|ফেব্র(?:ু|ূ)য়ার(?:ী|ি)|মার্চ|এপ্রিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগস্ট|সেপ্টেম্বর|অক্টোবর|নভেম্বর|ডিসেম্বর|জান(?:ু|ূ)ৱার(?:ী|ি)|ফেব্র(?:ু|ূ)ৱার(?:ী|ি)|মাৰ্চ|এপ্ৰিল|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগষ্ট|ছেপ্টেম্বৰ|অক্টোবৰ|নৱেম্বৰ|ডিচেম্বৰ)(?:,)?\s+[১২৩৪৫৬৭৮৯০]{1,4}',
-            r'[১২৩৪৫৬৭৮৯০]{1,2}\s+(?:জান(?:ু|ূ)য়ার(?:ী|ি)|ফেব্র(?:ু|ূ)য়ার(?:ী|ি)|মার্চ|এপ্রিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগস্ট|সেপ্টেম্বর|অক্টোবর|নভেম্বর|ডিসেম্বর|জান(?:ু|ূ)ৱার(?:ী|ি)|ফেব্র(?:ু|ূ)ৱার(?:ী|ি)|মাৰ্চ|এপ্ৰিল|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগষ্ট|ছেপ্টেম্বৰ|অক্টোবৰ|নৱেম্বৰ|ডিচেম্বৰ)(?:ত|[[:punct:]])?',
-            r'[১২৩৪৫৬৭৮৯০]{1,2}\s+(?:জান(?:ু|ূ)য়ার(?:ী|ি)|ফেব্র(?:ু|ূ)য়ার(?:ী|ি)|মার্চ|এপ্রিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগস্ট|সেপ্টেম্বর|অক্টোবর|নভেম্বর|ডিসেম্বর|জান(?:ু|ূ)ৱার(?:ী|ি)|ফেব্র(?:ু|ূ)ৱার(?:ী|ি)|মাৰ্চ|এপ্ৰিল|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগষ্ট|ছেপ্টেম্বৰ|অক্টোবৰ|নৱেম্বৰ|ডিচেম্বৰ).*?[১২৩৪৫৬৭৮৯০]{4}',
-            r'[১২৩৪৫৬৭৮৯০]{1,2}\s+(?:জান(?:ু|ূ)য়ার(?:ী|ি)|ফেব্র(?:ু|ূ)য়ার(?:ী|ি)|মার্চ|এপ্রিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগস্ট|সেপ্টেম্বর|অক্টোবর|নভেম্বর|ডিসেম্বর|জান(?:ু|ূ)ৱার(?:ী|ি)|ফেব্র(?:ু|ূ)ৱার(?:ী|ি)|মাৰ্চ|এপ্ৰিল|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগষ্ট|ছেপ্টেম্বৰ|অক্টোবৰ|নৱেম্বৰ|ডিচেম্বৰ).*?দিৱস.*?[১২৩৪৫৬৭৮৯০]{4}',
-            r'[১২৩৪৫৬৭৮৯০]{1,2}\s+(?:জান(?:ু|ূ)য়ার(?:ী|ি)|ফেব্র(?:ু|ূ)য়ার(?:ী|ি)|মার্চ|এপ্রিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগস্ট|সেপ্টেম্বর|অক্টোবর|নভেম্বর|ডিসেম্বর|জান(?:ু|ূ)ৱার(?:ী|ি)|ফেব্র(?:ু|ূ)ৱার(?:ী|ি)|মাৰ্চ|এপ্ৰিল|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগষ্ট|ছেপ্টেম্বৰ|অক্টোবৰ|নৱেম্বৰ|ডিচেম্বৰ)\s+(?:".*?"|\'.*?\').*?[১২৩৪৫৬৭৮৯০]{4}',
-        ]
-        context_patterns = [
-            r'(?:আজি|আজ|কালি|কাল|গতকালি|গতকাল|পরশু|পৰহি|যোৱা)\s+[১২৩৪৫৬৭৮৯০]{1,2}\s+(?:দিন|দিনত)',
-            r'(?:গত|বিগত|যোৱা|আহিবলগীয়া)\s+(?:সপ্তাহ|সপ্তাহত|সোমবাৰ|মঙ্গলবাৰ|বুধবাৰ|বৃহস্পতিবাৰ|শুক্ৰবাৰ|শনিবাৰ|ৰবিবাৰ|সোমবার|মঙ্গলবার|বুধবার|বৃহস্পতিবার|শুক্রবার|শনিবার|রবিবার)',
-            r'(?:সোমবাৰ|মঙ্গলবাৰ|বুধবাৰ|বৃহস্পতিবাৰ|শুক্ৰবাৰ|শনিবাৰ|ৰবিবাৰ|সোমবার|মঙ্গলবার|বুধবার|বৃহস্পতিবার|শুক্রবার|শনিবার|রবিবার)\s+[১২৩৪৫৬৭৮৯০]{1,2}\s+(?:জান(?:ু|ূ)য়ার(?:ী|ি)|ফেব্র(?:ু|ূ)য়ার(?:ী|ি)|মার্চ|এপ্রিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগস্ট|সেপ্টেম্বর|অক্টোবর|নভেম্বর|ডিসেম্বর|জান(?:ু|ূ)ৱার(?:ী|ি)|ফেব্র(?:ু|ূ)ৱার(?:ী|ি)|মাৰ্চ|এপ্ৰিল|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগষ্ট|ছেপ্টেম্বৰ|অক্টোবৰ|নৱেম্বৰ|ডিচেম্বৰ)',
-            r'উৎসৱমুখৰ\s+ছুটিৰ\s+দিনটো',
-            r'অফাৰ\s+শেষ\s+হ\'ব\s+[১২৩৪৫৬৭৮৯০]{1,2}\s+(?:জান(?:ু|ূ)য়ার(?:ী|ি)|ফেব্র(?:ু|ূ)য়ার(?:ী|ি)|মার্চ|এপ্রিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগস্ট|সেপ্টেম্বর|অক্টোবর|নভেম্বর|ডিসেম্বর|জান(?:ু|ূ)ৱার(?:ী|ি)|ফেব্র(?:ু|ূ)ৱার(?:ী|ি)|মাৰ্চ|এপ্ৰিল|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগষ্ট|ছেপ্টেম্বৰ|অক্টোবৰ|নৱেম্বৰ|ডিচেম্বৰ)(?:ত|[[:punct:]])?',
-            r'(?:আগত|পূৰ্বে)\s+এমাহৰ\s+বাবে', 
-            r'[১২৩৪৫৬৭৮৯০]{1,2}\s+(?:জান(?:ু|ূ)য়ার(?:ী|ি)|ফেব্র(?:ু|ূ)য়ার(?:ী|ি)|মার্চ|এপ্রিল|মে|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগস্ট|সেপ্টেম্বর|অক্টোবর|নভেম্বর|ডিসেম্বর|জান(?:ু|ূ)ৱার(?:ী|ি)|ফেব্র(?:ু|ূ)ৱার(?:ী|ি)|মাৰ্চ|এপ্ৰিল|জ(?:ু|ূ)ন|জ(?:ু|ূ)লাই|আগষ্ট|ছেপ্টেম্বৰ|অক্টোবৰ|নৱেম্বৰ|ডিচেম্বৰ)(?:ৰ)?\s+(?:আগত|পূৰ্বে)',
-        ]       
-        all_patterns = date_patterns + context_patterns
-        
-        for pattern in all_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return 1
+        if not DATE_HINT_RE.search(view.lowered):
+            return 0
         
-        return 0
+        return 1 if DATE_RE.search(view.text) else 0
     
     def extract_time(self, text):
         """Enhanced time detection with multiple patterns"""
-        if not isinstance(text, str):
+        view = MessageView.of(text)
+        if view is None:
             return 0
         
-        english_patterns = [
-            r'\b([0-9]|0[0-9]|1[0-2])(?::([0-5][0-9]))?(?::([0-5][0-9]))?\s*([AaPp][Mm])\b',
-            r'\b([0-9]|0[0-9]|1[0-2])(?:\.|\s)([0-5][0-9])(?:\s*|\.)([AaPp]\.?[Mm]\.?)\b',
-            r'\b([01]?[0-9]|2[0-3]):([0-5][0-9])(?::([0-5][0-9]))?\b',
-            r'\b(noon|midnight|midday)\b',
-            r'\b([0-9]|0[0-9]|1[0-2])\s+o\'?clock\b',
-            r'\b(half|quarter)\s+(past|to)\s+([0-9]|0[0-9]|1[0-2])\b',
-            r'\bat\s+([0-9]|0[0-9]|1[0-2])(?:\s+|\:)([0-5][0-9])?\s*([AaPp][Mm])?\b'
-        ]
-        
-        bn_as_numeric_patterns = [
-            r'[০-৯]{1,2}(?:[:\.।]|\s*ঃ|\s+)[০-৯]{1,2}(?:[:\.।]|\s*ঃ|\s+)?[০-৯]{0,2}',
-            r'[০-৯]{1,2}\s*(?:টা|বাজে|ঘণ্টা|घंटा)'
-        ]
-        
-        bn_as_time_words = [
-            'সকাল', 'ভোর', 'রাত', 'বিকাল', 'সন্ধ্যা', 'দুপুর',
-            'ৰাতি', 'পুৱা', 'গধূলি', 'আবেলি', 'নিশা', 'দুপৰীয়া',
-            'টা', 'বাজে', 'ঘণ্টা', 'মিনিট', 'সেকেন্ড',
-            'বজি', 'বাজি', 'ঘণ্টা', 'মিনিট', 'ছেকেণ্ড'
-        ]
-        
-        time_phrases = [
-            r'(?:এখন|বর্তমান|এতিয়া)\s+[০-৯]{1,2}\s*(?:টা|বাজে|ঘণ্টা|বজি)',
-            r'(?:সকাল|ভোর|রাত|বিকাল|সন্ধ্যা|দুপুর|ৰাতি|পুৱা|গধূলি|আবেলি|নিশা|দুপৰীয়া)\s+[০-৯]{1,2}',
-            r'[০-৯]{1,2}\s*(?:টা|বাজে|ঘণ্টা)\s*(?:ও|আৰু|এবং)?\s*[০-৯]{1,2}\s*(?:মিনিট|মিনিট)',
-            r'(?:ভোরে|ভোৰত|সকালে|সকালত|রাতে|ৰাতিত)\s+[০-৯]{1,2}',
-            r'[০-৯]{1,2}(?:[:\.।]|\s*ঃ|\s+)[০-৯]{1,2}\s*(?:এএম|পিএম|am|pm|a\.m\.|p\.m\.)'
-        ]
-        
-        for pattern in english_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return 1
-        
-        for pattern in bn_as_numeric_patterns:
-            if re.search(pattern, text):
-                return 1
-        
-        if any(re.search(r'[০-৯]{1,2}\s*' + word, text) for word in bn_as_time_words):
+        if TIME_RE.search(view.text):
             return 1
         
-        for pattern in time_phrases:
-            if re.search(pattern, text, re.IGNORECASE):
+        # A Bengali/Assamese time word counts when it follows a Bengali number
+        for start, _ in view.keyword_hits.get('time_word', ()):
+            if _follows_bengali_digit(view.text, start):
                 return 1
         
         return 0
         
     def extract_id_codes(self, text):
         """Enhanced ID code detection with multiple patterns"""
-        if not isinstance(text, str):
+        view = MessageView.of(text)
+        if view is None:
             return 0
         
-        id_pattern1 = r'\b\w*\d{10,}\w*\b'
-        id_pattern2 = r'\b[A-Za-z]+\d+\.\d+\.\d+\b'
-        
-        if re.search(id_pattern1, text) or re.search(id_pattern2, text):
-            return 1
-        
-        return 0
+        return 1 if ID_CODE_RE.search(view.text) else 0
     
     def extract_emojis(self, text):
         """Enhanced emoji detection with comprehensive Unicode ranges"""
-        if not isinstance(text, str):
+        view = MessageView.of(text)
+        if view is None:
             return 0
         
-        emoji_pattern = re.compile(
-            "["
-            "\U0001F600-\U0001F64F"
-            "\U0001F300-\U0001F5FF"
-            "\U0001F680-\U0001F6FF"
-            "\U0001F700-\U0001F77F"
-            "\U0001F780-\U0001F7FF"
-            "\U0001F800-\U0001F8FF"
-            "\U0001F900-\U0001F9FF"
-            "\U0001FA00-\U0001FA6F"
-            "\U0001FA70-\U0001FAFF"
-            "\U00002702-\U000027B0"
-            "\U000024C2-\U0000257F"
-            "\U00002600-\U000026FF"
-            "\U00002700-\U000027BF"
-            "\U0000FE0F"
-            "\U0001F1E0-\U0001F1FF"
-            "]+",
-            flags=re.UNICODE
-        )
-        
-        return 1 if emoji_pattern.search(text) else 0
+        return 1 if view.classes & EMOJI else 0
     
     def has_repeated_words(self, text):
         """Check for repeated words"""
-        if not isinstance(text, str):
+        view = MessageView.of(text)
+        if view is None:
             return 0
         
-        text = re.sub(r'[^\w\s\u0980-\u09FF\u0985-\u09FB]', '', text.lower())
-        words = text.split()
-        word_counts = Counter(words)
+        words = view.lowered_tokens
         
-        return 1 if any(count > 1 for count in word_counts.values()) else 0
+        return 1 if len(set(words)) < len(words) else 0
     
     def has_consecutive_special_chars(self, text):
         """Check for consecutive special characters"""
-        if not isinstance(text, str):
+        view = MessageView.of(text)
+        if view is None:
             return 0
         
-        url_pattern = r'https?://[^\s]+|www\.[^\s]+|[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}[^\s]*'
-        text_without_urls = re.sub(url_pattern, '', text)
-        
-        special_chars_pattern = r'([\?\!\@\#\$\%\&\*\(\)\-\_\=\+\[\]\{\}\;\:\,\.\<\>\/\\\|])\1+'
-        
-        return 1 if re.search(special_chars_pattern, text_without_urls) else 0
+        return 1 if CONSECUTIVE_SPECIAL_RE.search(view.text_without_urls) else 0
     
     def detect_subscriber_codes(self, text):
         """Check for subscriber codes"""
-        if not isinstance(text, str):
+        view = MessageView.of(text)
+        if view is None:
             return 0
         
-        parentheses_pattern = r'\(([^\)]*)\)'
-        parentheses_matches = re.findall(parentheses_pattern, text)
-        
-        for match in parentheses_matches:
-            if re.search(r'\d{4,5}', match) or re.search(r'[*#]', match):
-                return 1
-        
-        if re.search(r'\b\d{4,5}\b', text):
-            return 1
-        if re.search(r'\*\d+(?:\*\d+)*\#', text):
-            return 1
-        if re.search(r'\#\d+(?:\*\d+)*\#?', text):
-            return 1
-        if re.search(r'\b[A-Za-z]+\s+\d+\b', text):
-            return 1
-        
-        return 0
+        return 1 if SUBSCRIBER_CODE_RE.search(view.text) else 0
     
     def calculate_avg_word_length(self, text):
         """Calculate average word length"""
-        if not isinstance(text, str) or len(text.strip()) == 0:
+        view = MessageView.of(text)
+        if view is None:
             return 0.0
         
-        text = re.sub(r'[^\w\s\u0980-\u09FF\u0985-\u09FB]', '', text)
-        words = [word for word in text.split() if len(word) > 0]
+        words = view.tokens
         
         if not words:
             return 0.0
@@ -400,41 +695,181 @@ class SMSFeatureExtractor:
 
     def count_chars_without_spaces(self, text):
         """Count characters excluding spaces"""
-        if not isinstance(text, str):
+        view = MessageView.of(text)
+        if view is None:
             return 0
         
-        return sum(1 for char in text if char != ' ')
+        return len(view.text) - view.text.count(' ')
 
-    def extract_features(self, text):
-        """Extract all features and return as numpy array"""
+    def scan_characters(self, text):
+        """
+        Character-class features from one scan over the message
+        
+        All of them share the view's classification of the message's
+        distinct characters; the URL-stripped variants only need their own
+        scan when a URL was actually removed.
+        """
+        view = MessageView.of(text)
+        if view is None:
+            return {'has_special_chars': 0, 'has_all_caps_words': 0, 'is_mixed_language': 0,
+                    'has_emoji': 0, 'word_length': 0}
+        
+        return {
+            'has_special_chars': self.extract_special_chars(view),
+            'has_all_caps_words': self.extract_all_caps_words(view),
+            'is_mixed_language': self.extract_mixed_language(view),
+            'has_emoji': self.extract_emojis(view),
+            'word_length': self.count_chars_without_spaces(view)
+        }
+
+    def feature_values(self, text):
+        """Extract all features as a plain list in feature_columns order"""
         if not isinstance(text, str):
             text = str(text)
         
-        # Extract URL features first since other features exclude URLs
-        url_features = self.extract_urls(text)
+        # Every extractor reads from the same lazily normalized view
+        view = MessageView(text)
+        if self.timings is not None:
+            return self._timed_feature_values(view)
+        
+        url_features = self.extract_urls(view)
+        char_features = self.scan_characters(view)
         
         # Extract all features
+        return [
+            self.extract_phone_numbers(view),
+            char_features['has_special_chars'],
+            char_features['has_all_caps_words'],
+            url_features['has_url'],
+            url_features['has_short_url'],
+            url_features['has_regular_url'],
+            char_features['is_mixed_language'],
+            self.extract_currency(view),
+            self.extract_date(view),
+            self.extract_time(view),
+            self.extract_id_codes(view),
+            char_features['has_emoji'],
+            self.has_repeated_words(view),
+            self.has_consecutive_special_chars(view),
+            self.detect_subscriber_codes(view),
+            self.calculate_avg_word_length(view),
+            char_features['word_length']
+        ]
+
+    def _timed_feature_values(self, view):
+        """feature_values variant that times every extractor call"""
+        durations = []
+        
+        def timed(extractor):
+            start = time.perf_counter_ns()
+            result = extractor(view)
+            durations.append((extractor.__name__, time.perf_counter_ns() - start))
+            return result
+        
+        url_features = timed(self.extract_urls)
         features = [
-            self.extract_phone_numbers(text),
-            self.extract_special_chars(text),
-            self.extract_all_caps_words(text),
+            timed(self.extract_phone_numbers),
+            timed(self.extract_special_chars),
+            timed(self.extract_all_caps_words),
             url_features['has_url'],
             url_features['has_short_url'],
             url_features['has_regular_url'],
-            self.extract_mixed_language(text),
-            self.extract_currency(text),
-            self.extract_date(text),
-            self.extract_time(text),
-            self.extract_id_codes(text),
-            self.extract_emojis(text),
-            self.has_repeated_words(text),
-            self.has_consecutive_special_chars(text),
-            self.detect_subscriber_codes(text),
-            self.calculate_avg_word_length(text),
-            self.count_chars_without_spaces(text)
+            timed(self.extract_mixed_language),
+            timed(self.extract_currency),
+            timed(self.extract_date),
+            timed(self.extract_time),
+            timed(self.extract_id_codes),
+            timed(self.extract_emojis),
+            timed(self.has_repeated_words),
+            timed(self.has_consecutive_special_chars),
+            timed(self.detect_subscriber_codes),
+            timed(self.calculate_avg_word_length),
+            timed(self.count_chars_without_spaces)
         ]
         
-        return np.array(features).reshape(1, -1)
+        self.timings.record(view, durations)
+        return features
+
+    def extract_features(self, text):
+        """Extract all features and return as numpy array"""
+        return np.array(self.feature_values(text)).reshape(1, -1)
+
+    def extract_batch(self, texts, out=None):
+        """
+        Extract features for many messages into one float32 matrix
+        
+        Accepts any iterable of messages (list, pandas Series, generator).
+        Rows are written in place into a single preallocated (n, 17) array
+        whose columns follow feature_columns. An existing array of the right
+        shape can be passed as ``out`` to reuse its memory.
+        """
+        if not hasattr(texts, '__len__'):
+            texts = list(texts)
+        
+        n_features = len(self.feature_columns)
+        if out is None:
+            out = np.empty((len(texts), n_features), dtype=np.float32)
+        elif out.shape != (len(texts), n_features):
+            raise ValueError(f"Output array has shape {out.shape}, expected {(len(texts), n_features)}")
+        
+        for row, text in enumerate(texts):
+            out[row] = self.feature_values(text)
+        
+        return out
+
+    def extract_batch_parallel(self, texts, n_jobs=-1, chunk_size=2000, verbose=False):
+        """
+        Extract features for many messages on a process pool
+        
+        Messages are split into chunks of ``chunk_size`` rows that are
+        dispatched to ``n_jobs`` worker processes (-1 or None uses every
+        core). Each chunk is written back to its own row range, so the result
+        is identical to extract_batch regardless of completion order. With
+        ``verbose`` a progress line with the throughput in rows per second is
+        printed as chunks complete.
+        """
+        texts = list(texts)
+        n_rows = len(texts)
+        
+        if n_jobs is None or n_jobs < 1:
+            n_jobs = os.cpu_count() or 1
+        n_jobs = min(n_jobs, max(1, -(-n_rows // chunk_size)))
+        
+        start_time = time.perf_counter()
+        if n_jobs == 1:
+            out = self.extract_batch(texts)
+            if verbose:
+                _report_progress(n_rows, n_rows, start_time)
+            return out
+        
+        out = np.empty((n_rows, len(self.feature_columns)), dtype=np.float32)
+        done = 0
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = {
+                executor.submit(_extract_chunk, texts[start:start + chunk_size]): start
+                for start in range(0, n_rows, chunk_size)
+            }
+            for future in as_completed(futures):
+                chunk = future.result()
+                start = futures[future]
+                out[start:start + len(chunk)] = chunk
+                done += len(chunk)
+                if verbose:
+                    _report_progress(done, n_rows, start_time)
+        
+        return out
+
+
+def _extract_chunk(texts):
+    """Process pool worker for SMSFeatureExtractor.extract_batch_parallel"""
+    return SMSFeatureExtractor().extract_batch(texts)
+
+
+def _report_progress(done, total, start_time):
+    """Print extraction progress and throughput"""
+    elapsed = time.perf_counter() - start_time
+    rate = done / elapsed if elapsed > 0 else float('inf')
+    print(f"Extracted features for {done}/{total} rows ({rate:,.0f} rows/s)")
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,269 @@
+# forest_engine.py
+import threading
+import numpy as np
+
+TREE_LEAF = -1
+
+
+def _as_features(X, n_features):
+    """
+    X as a float32 matrix, checked like sklearn's forests check their input
+    Raises ValueError for another number of columns, NaN or values that are
+    infinite as float32, which sklearn refuses as well.
+    """
+    X = np.asarray(X, dtype=np.float32)
+    if X.ndim != 2:
+        raise ValueError(f"Expected a 2D feature matrix, got shape {X.shape}")
+    if X.shape[1] != n_features:
+        raise ValueError(f"X has {X.shape[1]} features, but the forest expects {n_features}")
+    if not np.isfinite(X).all():
+        raise ValueError("Input contains NaN or infinity (or a value too large for float32)")
+    return X
+
+
+class CompiledForest:
+    """
+    Array-backed inference for a fitted RandomForestClassifier
+
+    The nodes of every tree are flattened into contiguous arrays (split
+    feature, threshold, left and right child) plus one row of normalized
+    class probabilities per node. All trees are walked together, one level
+    per step: leaves point to themselves, so after ``max_depth`` steps each
+    sample sits on its leaf in every tree. Probabilities are computed once
+    and the label is derived from them, which skips sklearn's per-call input
+    validation, joblib dispatch and feature-name checks.
+
+    Results are bit-identical to ``predict_proba``/``predict``: inputs are
+    cast to float32 like sklearn's trees do, leaf probabilities are
+    normalized the same way and tree outputs are summed sequentially in
+    estimator order before dividing by the number of trees. Inputs sklearn
+    refuses (NaN, infinity, another number of columns) raise ValueError
+    here too, instead of silently walking to some leaf.
+    """
+
+    def __init__(self, feature, threshold, left, right, leaf_proba, roots, max_depth, classes, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.leaf_proba = leaf_proba
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes_ = classes
+        self.n_features_in_ = n_features
+        self.is_leaf = left == np.arange(len(left))
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Flatten the trees of a fitted single-output forest classifier"""
+        if getattr(model, 'n_outputs_', None) != 1 or not hasattr(model, 'estimators_'):
+            raise ValueError(f"Cannot compile {type(model).__name__}: expected a fitted single-output forest classifier")
+
+        n_classes = len(model.classes_)
+        features, thresholds, lefts, rights, probas, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == TREE_LEAF
+
+            # Leaves loop onto themselves: feature 0 <= +inf always goes "left"
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            proba = tree.value[:, 0, :n_classes].astype(np.float64)
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            probas.append(proba / normalizer)
+
+            roots.append(offset)
+            offset += tree.node_count
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            leaf_proba=np.concatenate(probas),
+            roots=np.array(roots, dtype=np.intp),
+            max_depth=max(estimator.tree_.max_depth for estimator in model.estimators_),
+            classes=model.classes_,
+            n_features=model.n_features_in_
+        )
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """Leaf node (flat index) reached by every sample in every tree"""
+        X = _as_features(X, self.n_features_in_)
+
+        # One (sample, tree) walker per entry; walkers drop out at their leaf
+        n_trees = len(self.roots)
+        nodes = np.tile(self.roots, X.shape[0])
+        rows = np.repeat(np.arange(X.shape[0]), n_trees)
+        values = X.ravel()
+        active = np.arange(len(nodes))
+        for _ in range(self.max_depth):
+            current = nodes[active]
+            go_left = values[rows[active] * X.shape[1] + self.feature[current]] <= self.threshold[current]
+            current = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = current
+            active = active[~self.is_leaf[current]]
+            if not len(active):
+                break
+        return nodes.reshape(X.shape[0], n_trees)
+
+    def predict_proba(self, X):
+        """Class probabilities, identical to the forest's predict_proba"""
+        leaves = self.apply(X)
+        # cumsum adds the trees one after another, like sklearn's accumulator
+        proba = self.leaf_proba[leaves].cumsum(axis=1)[:, -1]
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X):
+        """Class labels, identical to the forest's predict"""
+        return self.classes_.take(self.predict_proba(X).argmax(axis=1))
+
+    def verify(self, model, X):
+        """Number of rows of X whose probabilities differ from the model's"""
+        return count_mismatches(self, model, X)
+
+
+class DecisionTable:
+    """
+    Memoized forest probabilities per input region
+
+    A split only asks on which side of its threshold a value lies, so two
+    rows whose values fall between the same consecutive thresholds of every
+    column reach the same leaves and get identical probabilities. Each
+    column is binned by the sorted thresholds the forest uses on it (a value
+    equal to a threshold shares the bin of the values just below, as it goes
+    left) and the bin vector is the key of a table filled lazily from the
+    compiled forest. With 15 binary flags and two continuous columns the
+    number of regions real messages hit is small, so almost every row is a
+    single dictionary lookup. At most ``max_entries`` regions are kept; rows
+    of further regions are still scored, just not stored.
+    """
+
+    def __init__(self, forest, max_entries=100000):
+        self.forest = forest
+        self.max_entries = max_entries
+        split = np.isfinite(forest.threshold)
+        self.thresholds = [
+            np.unique(forest.threshold[split & (forest.feature == column)])
+            for column in range(forest.n_features_in_)
+        ]
+        # Flag-like columns split on one threshold are binned with one comparison
+        self._single = np.array([len(t) == 1 for t in self.thresholds])
+        self._single_thresholds = np.array([t[0] for t in self.thresholds if len(t) == 1])
+        self._searched = [(column, t) for column, t in enumerate(self.thresholds) if len(t) > 1]
+        self._table = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def classes_(self):
+        return self.forest.classes_
+
+    @property
+    def n_features_in_(self):
+        return self.forest.n_features_in_
+
+    def bin(self, X):
+        """Index of the threshold interval of every value of X"""
+        X = np.asarray(X, dtype=np.float32)
+        bins = np.zeros(X.shape, dtype=np.uint32)
+        # Compared like the trees do: float32 input against float64 thresholds
+        bins[:, self._single] = X[:, self._single] > self._single_thresholds
+        for column, thresholds in self._searched:
+            bins[:, column] = np.searchsorted(thresholds, X[:, column].astype(np.float64), side='left')
+        return bins
+
+    def predict_proba(self, X):
+        """Class probabilities, identical to the forest's predict_proba"""
+        # Checked before binning: a NaN row would otherwise share a region
+        # with valid rows and be answered from the table
+        X = _as_features(X, self.n_features_in_)
+        keys = [row.tobytes() for row in self.bin(X)]
+        proba = np.empty((len(keys), len(self.classes_)), dtype=np.float64)
+        missing = []
+        for i, key in enumerate(keys):
+            row = self._table.get(key)
+            if row is None:
+                missing.append(i)
+            else:
+                proba[i] = row
+
+        if missing:
+            proba[missing] = self.forest.predict_proba(X[missing])
+            with self._lock:
+                for i in missing:
+                    if len(self._table) >= self.max_entries:
+                        break
+                    self._table[keys[i]] = proba[i].copy()
+
+        with self._lock:
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+        return proba
+
+    def predict(self, X):
+        """Class labels, identical to the forest's predict"""
+        return self.classes_.take(self.predict_proba(X).argmax(axis=1))
+
+    def verify(self, model, X):
+        """Number of rows of X whose probabilities differ from the model's"""
+        return count_mismatches(self, model, X)
+
+    def clear(self):
+        with self._lock:
+            self._table.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._table),
+                'max_entries': self.max_entries,
+                'thresholds': [len(thresholds) for thresholds in self.thresholds],
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None
+            }
+
+
+def count_mismatches(scorer, model, X):
+    """Number of rows of X whose probabilities from scorer differ from the model's"""
+    X = np.asarray(X, dtype=np.float32)
+    expected = model.predict_proba(X)
+    return int((scorer.predict_proba(X) != expected).any(axis=1).sum())
+
+
+def probe_inputs(compiled, n_samples=2000, seed=0):
+    """
+    Feature rows that exercise the forest's splits
+
+    Each column takes values on both sides of the thresholds the forest uses
+    for it (and exactly on them), mixed at random across rows.
+    """
+    rng = np.random.default_rng(seed)
+    X = np.zeros((n_samples, compiled.n_features_in_), dtype=np.float32)
+    split = np.isfinite(compiled.threshold)
+    for column in range(compiled.n_features_in_):
+        thresholds = np.unique(compiled.threshold[split & (compiled.feature == column)])
+        if not len(thresholds):
+            continue
+        candidates = np.concatenate([
+            thresholds, np.nextafter(thresholds.astype(np.float32), np.float32(np.inf)),
+            [thresholds.min() - 1, thresholds.max() + 1]
+        ])
+        X[:, column] = rng.choice(candidates, size=n_samples)
+    return X
+
@@ -0,0 +1,75 @@
+# gunicorn.conf.py
+"""
+Gunicorn settings: one copy of the model shared by every worker
+
+With preload_app the master imports app.py, which loads and compiles the
+model, before forking. Workers inherit those pages copy-on-write, so the
+model's NumPy arrays stay shared instead of being unpickled once per
+worker. gc.freeze() moves everything loaded so far out of the garbage
+collector's reach; otherwise the first collection in each worker writes to
+every object header and un-shares most of those pages.
+
+The master only loads the model: the model file watcher starts in each
+worker after the fork (post_worker_init) and the request log's thread with
+a worker's first logged request. Sharing covers the model loaded at start.
+A model reloaded at runtime (MODEL_RELOAD_INTERVAL, /api/reload_model) is
+loaded by each worker separately, so every worker then holds a private
+copy, as without preload. Restart gunicorn to share a new model again
+(with preload_app, HUP does not reload the app).
+
+Environment:
+    PORT              port to bind (default 8000)
+    WEB_CONCURRENCY   worker processes (default 2; the work is CPU-bound, so up to
+                      one per CPU if memory allows, see memory_report.py)
+    GUNICORN_THREADS  threads per worker (default 1; >1 uses gthread workers,
+                      which lets MICRO_BATCH_WAIT_MS batch concurrent requests;
+                      sync workers turn micro-batching off with a warning)
+    GUNICORN_PRELOAD  0 to load the model in every worker instead
+    PROMETHEUS_MULTIPROC_DIR
+                      where workers write their metrics for /metrics to merge
+                      (default: a fresh temporary directory)
+
+Compare per-worker memory of both modes with memory_report.py.
+"""
+import gc
+import glob
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1').lower() in ('1', 'true', 'yes')
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+
+# Must be set before the app imports prometheus_client
+if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='sms-metrics-')
+
+
+def on_starting(server):
+    # Samples of a previous run would be merged into this one
+    for path in glob.glob(os.path.join(os.environ['PROMETHEUS_MULTIPROC_DIR'], '*.db')):
+        os.remove(path)
+
+
+def when_ready(server):
+    if preload_app:
+        gc.freeze()
+        server.log.info(f"Model preloaded in master, {gc.get_freeze_count()} objects frozen for copy-on-write sharing")
+
+
+def child_exit(server, worker):
+    from metrics import mark_process_dead
+    mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    import app as flask_app
+    flask_app.init_serving_process()
+    # A sync worker serves one request at a time: every batch would hold one
+    # message and only add a thread hop and MICRO_BATCH_WAIT_MS of waiting
+    if flask_app.micro_batcher is not None and worker.__class__.__name__ == 'SyncWorker':
+        worker.log.warning("MICRO_BATCH_WAIT_MS ignored: sync workers never see concurrent requests, "
+                           "set GUNICORN_THREADS > 1 to micro-batch")
+        flask_app.micro_batcher = None
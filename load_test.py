@@ -0,0 +1,330 @@
+# load_test.py
+"""
+Replay traffic against the API and report throughput and tail latency
+
+Requests come from a JSONL traffic file (one record per request with a
+"message"/"text" field or a "messages" list, optionally a "path") or from
+the synthetic corpus (synthetic_corpus.py), and are replayed in a loop for
+--duration seconds after --warmup seconds whose requests are not counted.
+
+Two modes:
+    closed loop (default)  --concurrency clients, each sending its next
+                           request as soon as the previous one is answered
+    open loop (--rate R)   R requests per second on a fixed schedule, sent
+                           by up to --concurrency clients; latency counts
+                           from the scheduled time, so a server falling
+                           behind shows up as latency instead of as a lower
+                           sending rate, and requests still waiting for a
+                           client after --timeout count as errors
+
+Without --url a local gunicorn is started for every combination of
+--workers, --worker-class and --threads, so runs are comparable:
+
+    python load_test.py --workers 1 2 4 --worker-class sync gthread --threads 4
+    python load_test.py --worker-class uvicorn --rate 200 --duration 30
+    python load_test.py --url http://127.0.0.1:8000 --traffic traffic.jsonl
+
+The client runs in this process; on a small machine give the server the
+cores it needs, or run the client elsewhere with --url.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+import numpy as np
+from memory_report import children, wait_until_up
+from synthetic_corpus import generate_messages
+
+WORKER_CLASSES = {
+    'sync': ('sync', 'app:app'),
+    'gthread': ('gthread', 'app:app'),
+    'uvicorn': ('uvicorn.workers.UvicornWorker', 'asgi:app'),
+}
+PERCENTILES = (50, 90, 95, 99, 99.9)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay traffic against the API and report tail latency")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--traffic', help="JSONL file of requests to replay")
+    source.add_argument('--synthetic', type=int, default=2000,
+                        help="messages of the synthetic corpus to replay (default, 2000)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the synthetic corpus")
+    parser.add_argument('--path', default='/api/predict', help="endpoint for records without a path")
+    parser.add_argument('--url', help="server to test; starts a local gunicorn when omitted")
+    parser.add_argument('--workers', type=int, nargs='+', default=[2], help="gunicorn worker counts to compare")
+    parser.add_argument('--worker-class', nargs='+', choices=list(WORKER_CLASSES), default=['sync'],
+                        help="gunicorn worker classes to compare")
+    parser.add_argument('--threads', type=int, default=4, help="threads per gthread worker")
+    parser.add_argument('--port', type=int, default=8012, help="port of the local server")
+    parser.add_argument('--server-env', action='append', default=[], metavar='KEY=VALUE',
+                        help="environment of the local server, e.g. PREDICTION_CACHE_SIZE=0")
+    parser.add_argument('--concurrency', type=int, default=8, help="concurrent clients")
+    parser.add_argument('--rate', type=float, default=None, help="open loop: requests per second")
+    parser.add_argument('--duration', type=float, default=20, help="measured seconds")
+    parser.add_argument('--warmup', type=float, default=5, help="seconds before measuring starts")
+    parser.add_argument('--timeout', type=float, default=30, help="per-request timeout in seconds")
+    parser.add_argument('--output', help="write every run as JSON to this file")
+    return parser.parse_args()
+
+
+def load_traffic(args):
+    """List of (path, JSON body bytes) to replay"""
+    if args.traffic is None:
+        return [(args.path, json.dumps({'message': text}).encode('utf-8'))
+                for text in generate_messages(args.synthetic, seed=args.seed)]
+
+    requests = []
+    with open(args.traffic, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            path = record.get('path', args.path)
+            if 'messages' in record:
+                body = {'messages': record['messages']}
+            else:
+                body = {'message': record.get('message', record.get('text'))}
+            requests.append((path, json.dumps(body).encode('utf-8')))
+    if not requests:
+        raise ValueError(f"No requests in {args.traffic}")
+    return requests
+
+
+class Client:
+    """One keep-alive connection, reopened after errors and server closes"""
+
+    def __init__(self, host, port, timeout):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.connection = None
+
+    def send(self, path, body):
+        """Response status, 0 for connection errors and timeouts"""
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            self.connection.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+            response = self.connection.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            return 0
+
+
+class LoadRun:
+    """
+    One replay against a running server
+    Every request is recorded as (scheduled start, latency, status); the
+    report only uses requests scheduled after the warm-up.
+    """
+
+    def __init__(self, base_url, traffic, concurrency, rate, duration, warmup, timeout):
+        url = urlsplit(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.traffic = traffic
+        self.concurrency = concurrency
+        self.rate = rate
+        self.duration = duration
+        self.warmup = warmup
+        self.timeout = timeout
+        self.records = []
+        self._next = itertools.cycle(traffic).__next__
+        self._lock = threading.Lock()
+
+    def run(self):
+        self.started = time.perf_counter()
+        self.measure_from = self.started + self.warmup
+        self.stop_at = self.measure_from + self.duration
+        target = self._open_loop_client if self.rate else self._closed_loop_client
+        schedule = queue.Queue()
+        clients = [threading.Thread(target=target, args=(schedule,), daemon=True) for _ in range(self.concurrency)]
+        for client in clients:
+            client.start()
+        if self.rate:
+            self._schedule(schedule)
+        for client in clients:
+            client.join()
+        return self.report()
+
+    def _record(self, scheduled, finished, status):
+        with self._lock:
+            self.records.append((scheduled, finished - scheduled, status))
+
+    def _closed_loop_client(self, schedule):
+        client = Client(self.host, self.port, self.timeout)
+        while True:
+            start = time.perf_counter()
+            if start >= self.stop_at:
+                return
+            with self._lock:
+                path, body = self._next()
+            status = client.send(path, body)
+            self._record(start, time.perf_counter(), status)
+
+    def _schedule(self, schedule):
+        """Put the scheduled start of every request on the queue, then one stop per client"""
+        interval = 1.0 / self.rate
+        for i in itertools.count():
+            scheduled = self.started + i * interval
+            if scheduled >= self.stop_at:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            schedule.put((scheduled, self._next()))
+        for _ in range(self.concurrency):
+            schedule.put(None)
+
+    def _open_loop_client(self, schedule):
+        client = Client(self.host, self.port, self.timeout)
+        while True:
+            item = schedule.get()
+            if item is None:
+                return
+            scheduled, (path, body) = item
+            if time.perf_counter() - scheduled > self.timeout:
+                # Waited for a free client longer than a request may take
+                self._record(scheduled, time.perf_counter(), 0)
+                continue
+            status = client.send(path, body)
+            self._record(scheduled, time.perf_counter(), status)
+
+    def report(self):
+        measured = [(latency, status) for scheduled, latency, status in self.records
+                    if self.measure_from <= scheduled < self.stop_at]
+        # Answers completed inside the window: a server behind its schedule
+        # finishes the window's requests later and does not get credit for it
+        completed = sum(1 for scheduled, latency, status in self.records
+                        if 0 < status < 400 and self.measure_from <= scheduled + latency < self.stop_at)
+        latencies = np.array([latency for latency, _ in measured]) * 1000
+        statuses = {}
+        for _, status in measured:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        errors = sum(count for status, count in statuses.items() if status == '0' or int(status) >= 400)
+        ok_latencies = np.array([latency for latency, status in measured if 0 < status < 400]) * 1000
+
+        result = {
+            'mode': 'open' if self.rate else 'closed',
+            'concurrency': self.concurrency,
+            'target_rate': self.rate,
+            'duration': self.duration,
+            'warmup': self.warmup,
+            'requests': len(measured),
+            'errors': errors,
+            'error_rate': errors / len(measured) if measured else None,
+            'statuses': statuses,
+            'throughput': completed / self.duration,
+            'latency_ms': {},
+        }
+        if len(ok_latencies):
+            result['latency_ms'] = {f'p{p:g}': round(float(np.percentile(ok_latencies, p)), 3) for p in PERCENTILES}
+            result['latency_ms']['mean'] = round(float(ok_latencies.mean()), 3)
+            result['latency_ms']['max'] = round(float(ok_latencies.max()), 3)
+        elif len(latencies):
+            result['latency_ms']['max'] = round(float(latencies.max()), 3)
+        return result
+
+
+def start_server(worker_class, workers, threads, port, server_env):
+    """Start gunicorn and wait until all of its workers are up"""
+    gunicorn_class, application = WORKER_CLASSES[worker_class]
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(port),
+               GUNICORN_THREADS=str(threads if worker_class == 'gthread' else 1))
+    for item in server_env:
+        key, _, value = item.partition('=')
+        env[key] = value
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-k', gunicorn_class, application],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_up(f'http://127.0.0.1:{port}/health')
+        while len(children(server.pid)) < workers:
+            time.sleep(0.2)
+    except Exception:
+        stop_server(server)
+        raise
+    return server
+
+
+def stop_server(server):
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def print_report(label, result):
+    latency = result['latency_ms']
+    print(f"\n{label}")
+    print(f"  {result['requests']} requests in {result['duration']:g}s ({result['mode']} loop"
+          f"{', target %g/s' % result['target_rate'] if result['target_rate'] else ''}, "
+          f"concurrency {result['concurrency']})")
+    print(f"  throughput {result['throughput']:.1f} req/s, errors {result['errors']} "
+          f"({(result['error_rate'] or 0):.2%}), statuses {result['statuses']}")
+    if latency:
+        print("  latency ms  " + "  ".join(f"{name} {value:.2f}" for name, value in latency.items()))
+
+
+def main():
+    args = parse_args()
+    traffic = load_traffic(args)
+    runs = []
+
+    def replay(base_url):
+        return LoadRun(base_url, traffic, args.concurrency, args.rate, args.duration,
+                       args.warmup, args.timeout).run()
+
+    if args.url:
+        result = replay(args.url.rstrip('/'))
+        result['server'] = {'url': args.url}
+        print_report(args.url, result)
+        runs.append(result)
+    else:
+        for worker_class, workers in itertools.product(args.worker_class, args.workers):
+            threads = args.threads if worker_class == 'gthread' else 1
+            label = f"{workers} x {worker_class}" + (f" ({threads} threads)" if worker_class == 'gthread' else '')
+            server = start_server(worker_class, workers, threads, args.port, args.server_env)
+            try:
+                result = replay(f'http://127.0.0.1:{args.port}')
+            finally:
+                stop_server(server)
+            result['server'] = {'worker_class': worker_class, 'workers': workers, 'threads': threads,
+                                'env': args.server_env}
+            print_report(label, result)
+            runs.append(result)
+
+    if len(runs) > 1:
+        print(f"\n{'server':<28}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}")
+        for result in runs:
+            server = result['server']
+            label = f"{server['workers']} x {server['worker_class']}" + \
+                (f" ({server['threads']} threads)" if server['worker_class'] == 'gthread' else '')
+            latency = result['latency_ms']
+            print(f"{label:<28}{result['throughput']:>10.1f}{latency.get('p50', float('nan')):>10.2f}"
+                  f"{latency.get('p95', float('nan')):>10.2f}{latency.get('p99', float('nan')):>10.2f}"
+                  f"{result['error_rate'] or 0:>9.2%}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'traffic': args.traffic or f'synthetic:{args.synthetic}:{args.seed}', 'runs': runs},
+                      f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
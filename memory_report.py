@@ -0,0 +1,124 @@
+# memory_report.py
+"""
+Per-worker memory of gunicorn with and without model preloading
+
+Starts `gunicorn -c gunicorn.conf.py app:app` once per mode, sends a few
+predictions so every worker has scored messages, then reads
+/proc/<pid>/smaps_rollup of each worker (Linux only):
+
+    RSS      resident pages, shared ones counted in full by every process
+    PSS      shared pages divided among the processes sharing them
+    private  pages only this worker uses (what another worker would add)
+
+Usage: python memory_report.py [--workers 4] [--port 8011]
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+SAMPLE_MESSAGES = [
+    "Congratulations! You have won a free prize, call 9876543210 now",
+    "Hi, are we still meeting at 5pm tomorrow?",
+    "আপনার অ্যাকাউন্টে ৫০০ টাকা বোনাস যোগ হয়েছে, এখনই ভিজিট করুন bit.ly/offer",
+    "URGENT: your account is suspended, verify at http://example.com/login",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4, help='Worker processes per run')
+    parser.add_argument('--port', type=int, default=8011, help='Port for the temporary server')
+    parser.add_argument('--requests', type=int, default=200, help='Warm-up predictions per run')
+    return parser.parse_args()
+
+
+def smaps_rollup(pid):
+    """RSS, PSS and private memory of a process in MiB"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {
+        'rss': values.get('Rss', 0),
+        'pss': values.get('Pss', 0),
+        'private': values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+    }
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def wait_until_up(url, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                return json.loads(response.read())
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f"Server did not answer {url} within {timeout}s")
+
+
+def predict(base_url, message):
+    request = urllib.request.Request(
+        f'{base_url}/api/predict',
+        data=json.dumps({'message': message}).encode('utf-8'),
+        headers={'Content-Type': 'application/json'}
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        response.read()
+
+
+def measure(preload, args):
+    """Start gunicorn in one mode and return the memory of its workers"""
+    env = dict(os.environ, GUNICORN_PRELOAD='1' if preload else '0',
+               WEB_CONCURRENCY=str(args.workers), PORT=str(args.port))
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f'http://127.0.0.1:{args.port}'
+    try:
+        wait_until_up(f'{base_url}/health')
+        # Without preload, workers load the model one after another
+        while len(children(server.pid)) < args.workers:
+            time.sleep(0.5)
+        time.sleep(2)
+        for i in range(args.requests):
+            predict(base_url, f"{SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)]} #{i}")
+        return smaps_rollup(server.pid), [smaps_rollup(pid) for pid in children(server.pid)]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def report(label, master, workers):
+    print(f"\n{label}")
+    print(f"  {'process':<10}{'RSS MiB':>10}{'PSS MiB':>10}{'private MiB':>14}")
+    print(f"  {'master':<10}{master['rss']:>10.1f}{master['pss']:>10.1f}{master['private']:>14.1f}")
+    for i, worker in enumerate(workers):
+        print(f"  {f'worker {i}':<10}{worker['rss']:>10.1f}{worker['pss']:>10.1f}{worker['private']:>14.1f}")
+    total = master['pss'] + sum(worker['pss'] for worker in workers)
+    print(f"  total PSS {total:.1f} MiB")
+    return total
+
+
+def main():
+    args = parse_args()
+    without = report("Without preload (GUNICORN_PRELOAD=0)", *measure(False, args))
+    with_preload = report("With preload (default)", *measure(True, args))
+    print(f"\nPreloading saves {without - with_preload:.1f} MiB for {args.workers} workers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# metrics.py
+"""
+Prometheus metrics of the API
+
+Series:
+    sms_requests_total                per route, method and status
+    sms_request_duration_seconds      per route, until the response headers
+    sms_stage_duration_seconds        per stage: parse, extraction, inference, serialization
+    sms_request_size_bytes            request body size per route
+    sms_message_length_chars          length of every scored message
+    sms_errors_total                  error responses per route and type
+    sms_model_info                    model version served by each serving process
+
+Observing a sample is a lock and an add, cheap enough to leave on. Under
+gunicorn every worker writes its samples to memory-mapped files in
+PROMETHEUS_MULTIPROC_DIR (created by gunicorn.conf.py), and /metrics merges
+the files of all workers, so any worker answers with the totals. The
+sidecar serves the same series on SIDECAR_METRICS_PORT.
+"""
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess, start_http_server
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STAGE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+LENGTH_BUCKETS = (10, 20, 40, 80, 160, 320, 640, 1280, 2560)
+
+REQUESTS = Counter('sms_requests_total', 'HTTP requests', ['route', 'method', 'status'])
+REQUEST_LATENCY = Histogram('sms_request_duration_seconds', 'Request latency until the response headers',
+                            ['route'], buckets=LATENCY_BUCKETS)
+STAGE_LATENCY = Histogram('sms_stage_duration_seconds', 'Latency of one request stage',
+                          ['stage'], buckets=STAGE_BUCKETS)
+REQUEST_SIZE = Histogram('sms_request_size_bytes', 'Request body size', ['route'], buckets=SIZE_BUCKETS)
+MESSAGE_LENGTH = Histogram('sms_message_length_chars', 'Length of scored messages', buckets=LENGTH_BUCKETS)
+ERRORS = Counter('sms_errors_total', 'Error responses', ['route', 'type'])
+MODEL_INFO = Gauge('sms_model_info', 'Model version served by a process (1 = active)', ['version'],
+                   multiprocess_mode='liveall')
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as one request stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(name).observe(time.perf_counter() - start)
+
+
+def observe_stage(name, seconds):
+    STAGE_LATENCY.labels(name).observe(seconds)
+
+
+def observe_messages(messages):
+    for message in messages:
+        MESSAGE_LENGTH.observe(len(message))
+
+
+def record_request(route, method, status, seconds, size, error_type=None):
+    """Count one finished request, and an error if its status is 4xx/5xx"""
+    REQUESTS.labels(route, method, str(status)).inc()
+    REQUEST_LATENCY.labels(route).observe(seconds)
+    if size is not None:
+        REQUEST_SIZE.labels(route).observe(size)
+    if status >= 400:
+        record_error(route, error_type or f'http_{status}')
+
+
+def record_error(route, error_type):
+    ERRORS.labels(route, error_type).inc()
+
+
+def set_model_version(version, previous=None):
+    if previous is not None and previous != version:
+        MODEL_INFO.labels(previous).set(0)
+    MODEL_INFO.labels(version).set(1)
+
+
+def _registry():
+    """Samples of every worker process when they write to PROMETHEUS_MULTIPROC_DIR, else of this one"""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render():
+    """Body and content type of the /metrics response"""
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+
+def serve(port, addr='0.0.0.0'):
+    """Serve the metrics on their own HTTP port from a background thread"""
+    start_http_server(port, addr, registry=_registry())
+
+
+def mark_process_dead(pid):
+    """Drop the live gauges of an exited worker"""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        multiprocess.mark_process_dead(pid)
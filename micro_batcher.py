@@ -0,0 +1,138 @@
+# micro_batcher.py
+import logging
+import os
+import queue
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """Fixed-bucket histogram with a running count and sum"""
+
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def snapshot(self):
+        return {
+            'bounds': self.bounds,
+            'buckets': list(self.buckets),
+            'count': self.count,
+            'mean': round(self.total / self.count, 4) if self.count else None
+        }
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-message requests into batches
+
+    Callers block in submit() while a background thread gathers queued
+    messages: after the first one arrives it waits at most ``max_wait``
+    seconds, or until ``max_batch_size`` messages are queued, then scores
+    the whole batch with one call to ``score_batch`` and hands every caller
+    its own result (or the exception the batch raised). This only pays off
+    when requests run concurrently inside one process, e.g. threaded
+    workers; a sync worker always sees batches of one and only pays the
+    thread hop and the wait (gunicorn.conf.py turns it off there).
+
+    If the batching thread itself is stopped by a BaseException, the
+    callers of its batch get an error and a new thread takes over the
+    queue, so no caller is left waiting.
+    """
+
+    BATCH_SIZE_BOUNDS = [1, 2, 4, 8, 16, 32, 64, 128]
+    QUEUE_DELAY_BOUNDS_MS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100]
+
+    def __init__(self, score_batch, max_batch_size=32, max_wait=0.002):
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+        self.batch_sizes = Histogram(self.BATCH_SIZE_BOUNDS)
+        self.queue_delays_ms = Histogram(self.QUEUE_DELAY_BOUNDS_MS)
+
+    def submit(self, message):
+        """Score one message as part of the next batch and wait for its result"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((message, future, time.perf_counter()))
+        return future.result()
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'batch_size': self.batch_sizes.snapshot(),
+                'queue_delay_ms': self.queue_delays_ms.snapshot()
+            }
+
+    def _ensure_worker(self):
+        """Start the batching thread, again in a forked worker process"""
+        if self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker_pid != os.getpid():
+                self._queue = queue.Queue()
+                self._start_worker(self._queue)
+                self._worker_pid = os.getpid()
+
+    def _start_worker(self, pending):
+        self._worker = threading.Thread(target=self._run, args=(pending,), name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def _run(self, pending):
+        while True:
+            batch = [pending.get()]
+            try:
+                self._score(pending, batch)
+            except BaseException as e:
+                # Callers of this batch would otherwise wait forever
+                error = e if isinstance(e, Exception) else RuntimeError(f"Micro-batching stopped: {e!r}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                if isinstance(e, Exception):
+                    continue
+                logger.error(f"Micro-batching thread stopped by {e!r}, starting a new one")
+                self._start_worker(pending)
+                raise
+
+    def _score(self, pending, batch):
+        """Fill batch until it is full or max_wait has passed, score it and answer every caller"""
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        started = time.perf_counter()
+        with self._stats_lock:
+            self.batch_sizes.observe(len(batch))
+            for _, _, submitted in batch:
+                self.queue_delays_ms.observe((started - submitted) * 1000)
+
+        results = self.score_batch([message for message, _, _ in batch])
+        if len(results) != len(batch):
+            raise RuntimeError(f"Batch of {len(batch)} messages scored with {len(results)} results")
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
@@ -0,0 +1,165 @@
+# model_artifact.py
+"""
+Pickle-free model artifact: forest arrays (.npz) plus a JSON manifest
+
+The .npz holds the flattened trees of a CompiledForest in compact dtypes
+and is read with allow_pickle=False, so loading neither runs pickled code
+nor imports scikit-learn. The manifest records the feature columns, the
+extractor version and classes the forest was trained with, and the
+SHA-256 of the .npz. Classes are loaded with the dtype of the model's
+classes_, so a model trained on 0/1 labels predicts integers like the
+joblib model does; non-numeric labels are stored as strings.
+load_artifact refuses an artifact whose checksum, feature schema or
+extractor version does not match.
+
+Export an existing joblib model:
+
+    python model_artifact.py spam_model.joblib spam_model
+
+writes spam_model.npz, then spam_model.json (write order matters for a
+watcher reloading the manifest: the arrays are in place before it changes).
+"""
+import hashlib
+import json
+import os
+import time
+import numpy as np
+from forest_engine import CompiledForest
+
+ARTIFACT_FORMAT = 'sms-spam-forest'
+ARTIFACT_FORMAT_VERSION = 1
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _stored_classes(classes):
+    """Classes as saved in the .npz: numeric ones as they are, others as str"""
+    classes = np.asarray(classes)
+    if classes.dtype.kind in 'biuf':
+        return classes
+    return np.asarray([str(c) for c in classes])
+
+
+def export_artifact(model, prefix, feature_columns, extractor_version):
+    """
+    Write <prefix>.npz and <prefix>.json for a fitted forest classifier
+    Returns the manifest path. Raises ValueError if the model was fitted
+    with other feature names than feature_columns.
+    """
+    names = getattr(model, 'feature_names_in_', None)
+    if names is not None and list(names) != list(feature_columns):
+        raise ValueError(f"Model features {list(names)} do not match {list(feature_columns)}")
+
+    compiled = CompiledForest.from_sklearn(model)
+    classes = _stored_classes(compiled.classes_)
+    arrays_path = f"{prefix}.npz"
+    manifest_path = f"{prefix}.json"
+
+    # int32 node indices and features halve the file; thresholds and leaf
+    # probabilities stay float64 so results remain exact
+    with open(arrays_path, 'wb') as f:
+        np.savez(
+            f,
+            feature=compiled.feature.astype(np.int32),
+            threshold=compiled.threshold,
+            left=compiled.left.astype(np.int32),
+            right=compiled.right.astype(np.int32),
+            leaf_proba=compiled.leaf_proba,
+            roots=compiled.roots.astype(np.int32),
+            classes=classes
+        )
+
+    manifest = {
+        'format': ARTIFACT_FORMAT,
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'model_type': type(model).__name__,
+        'arrays': os.path.basename(arrays_path),
+        'sha256': _sha256(arrays_path),
+        'feature_columns': list(feature_columns),
+        'extractor_version': extractor_version,
+        'classes': classes.tolist(),
+        'classes_dtype': np.asarray(compiled.classes_).dtype.str,
+        'n_estimators': compiled.n_estimators,
+        'n_nodes': int(len(compiled.feature)),
+        'max_depth': int(compiled.max_depth)
+    }
+    temporary = f"{manifest_path}.tmp"
+    with open(temporary, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temporary, manifest_path)
+    return manifest_path
+
+
+def load_artifact(manifest_path, feature_columns, extractor_version):
+    """
+    Load the CompiledForest described by a manifest
+    Raises ValueError when the artifact is corrupt or was built for other
+    feature columns or another extractor version.
+    """
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    if manifest.get('format') != ARTIFACT_FORMAT or manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"{manifest_path} is not a {ARTIFACT_FORMAT} v{ARTIFACT_FORMAT_VERSION} manifest")
+    if manifest['feature_columns'] != list(feature_columns):
+        raise ValueError(
+            f"Artifact feature schema {manifest['feature_columns']} does not match the extractor's {list(feature_columns)}"
+        )
+    if manifest['extractor_version'] != extractor_version:
+        raise ValueError(
+            f"Artifact built with extractor version {manifest['extractor_version']}, running {extractor_version}"
+        )
+
+    arrays_path = os.path.join(os.path.dirname(os.path.abspath(manifest_path)), manifest['arrays'])
+    checksum = _sha256(arrays_path)
+    if checksum != manifest['sha256']:
+        raise ValueError(f"Checksum of {arrays_path} is {checksum}, manifest expects {manifest['sha256']}")
+
+    with np.load(arrays_path, allow_pickle=False) as arrays:
+        classes = arrays['classes']
+        if classes.tolist() != manifest['classes']:
+            raise ValueError(f"Artifact classes {classes.tolist()} differ from the manifest's {manifest['classes']}")
+        # Same dtype as the model's classes_ (object for labels from pandas)
+        dtype = np.dtype(manifest.get('classes_dtype', '|O'))
+        forest = CompiledForest(
+            feature=arrays['feature'].astype(np.intp),
+            threshold=arrays['threshold'],
+            left=arrays['left'].astype(np.intp),
+            right=arrays['right'].astype(np.intp),
+            leaf_proba=arrays['leaf_proba'],
+            roots=arrays['roots'].astype(np.intp),
+            max_depth=manifest['max_depth'],
+            classes=classes.astype(dtype),
+            n_features=len(manifest['feature_columns'])
+        )
+    forest.feature_names_in_ = np.asarray(manifest['feature_columns'], dtype=object)
+    forest.manifest = manifest
+    return forest
+
+
+if __name__ == "__main__":
+    import sys
+    from joblib import load
+    from feature_extraction import EXTRACTOR_VERSION, SMSFeatureExtractor
+    from forest_engine import probe_inputs
+
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python model_artifact.py MODEL.joblib PREFIX")
+
+    model = load(sys.argv[1])
+    columns = SMSFeatureExtractor().feature_columns
+    manifest_path = export_artifact(model, sys.argv[2], columns, EXTRACTOR_VERSION)
+
+    # Checked against the model like train_model.py does
+    forest = load_artifact(manifest_path, columns, EXTRACTOR_VERSION)
+    mismatches = forest.verify(model, probe_inputs(forest, n_samples=20000))
+    if mismatches:
+        sys.exit(f"Artifact differs from the model on {mismatches} of 20000 probe rows")
+    print(f"Wrote {manifest_path}")
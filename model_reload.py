@@ -0,0 +1,93 @@
+# model_reload.py
+import hashlib
+import os
+import threading
+import time
+
+
+def file_version(path):
+    """Short SHA-256 of a model file, used as its version"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+class ModelVersion:
+    """
+    One loaded model with everything scoring needs from it
+
+    Replaced as a whole on reload: a request that picked up a version keeps
+    scoring with it even if a newer one is activated meanwhile.
+    """
+
+    def __init__(self, model, forest, version, path):
+        self.model = model
+        self.forest = forest
+        self.version = version
+        self.path = path
+        self.loaded_at = time.time()
+
+    @property
+    def scorer(self):
+        """Compiled forest when available, the model itself otherwise"""
+        return self.forest if self.forest is not None else self.model
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'path': self.path,
+            'loaded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.loaded_at))
+        }
+
+
+class ModelFileWatcher:
+    """
+    Poll a model file and call on_change when it is replaced
+
+    The file's mtime, size and inode are checked every ``interval`` seconds
+    (0 disables watching), against their values when the watcher was
+    created, i.e. when the model was loaded. on_change returns False when it
+    could not start a reload, and the change is then reported again on the
+    next check. Nothing polls until start() is called, and a forked child
+    does not inherit a running watcher: only processes that serve requests
+    start one (app.init_serving_process), not a gunicorn master that
+    preloads the model.
+    """
+
+    def __init__(self, path, interval, on_change):
+        self.path = path
+        self.interval = interval
+        self.on_change = on_change
+        self._thread = None
+        self._last = self._stat()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def start(self):
+        if self.interval <= 0 or self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+        self._thread.start()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _after_fork(self):
+        # The parent's polling thread does not exist in the child
+        self._thread = None
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            current = self._stat()
+            if current is not None and current != self._last and self.on_change() is not False:
+                self._last = current
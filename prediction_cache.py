@@ -0,0 +1,109 @@
+# prediction_cache.py
+import hashlib
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache of prediction results for repeated messages
+
+    Entries are keyed by a 128-bit BLAKE2 digest of the message, so the
+    message text itself is never kept and every entry has the same small
+    size; the memory bound is therefore set as a maximum number of entries.
+    Entries older than ``ttl`` seconds are dropped on access (0 keeps them
+    until evicted). The cache remembers which model filled it and clears
+    itself as soon as it is used with a different model object.
+    """
+
+    def __init__(self, max_entries=10000, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._model_ref = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    @staticmethod
+    def key(message):
+        """Cache key of a message"""
+        return hashlib.blake2b(message.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+    def get(self, message, model):
+        """Cached result of a message for this model, or None"""
+        if not self.enabled:
+            return None
+
+        key = self.key(message)
+        with self._lock:
+            self._check_model(model)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires, value = entry
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, message, model, value):
+        """Store the result of a message computed by this model"""
+        if not self.enabled:
+            return
+
+        key = self.key(message)
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._check_model(model)
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters for sizing the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+    def _check_model(self, model):
+        """Drop every entry if they were computed by another model (lock held)"""
+        if self._model_ref is not None and self._model_ref() is model:
+            return
+        if self._entries:
+            self._entries.clear()
+            self.invalidations += 1
+        self._model_ref = weakref.ref(model) if model is not None else None
@@ -0,0 +1,201 @@
+# request_log.py
+"""
+Sampled, structured request log written off the request thread
+
+A request that is sampled costs a random draw, a LogRecord holding the raw
+field values and a non-blocking queue put. A background thread turns queued
+records into one JSON line each, so hashing or truncating the message and
+serializing happen there; a request that is not sampled builds nothing.
+When the queue is full the record is dropped and counted instead of making
+the request wait.
+
+Message text never reaches the log as is: it is hashed (the default),
+truncated to a prefix, or omitted. Hashes are keyed BLAKE2b, so they cannot
+be reversed by hashing candidate texts (OTP templates, short SMS) without
+the key. Without a configured key a random one is drawn when the log is
+created: hashes then match within one server run (preloaded gunicorn
+workers inherit the master's key) but not across restarts.
+"""
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+logger = logging.getLogger(__name__)
+
+
+def parse_sample_rates(spec):
+    """'/api/predict=0.01,/health=0' -> {'/api/predict': 0.01, '/health': 0.0}"""
+    rates = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        route, _, rate = item.rpartition('=')
+        rate = float(rate)
+        if not route or not 0 <= rate <= 1:
+            raise ValueError(f"Invalid sample rate {item!r}, expected ROUTE=RATE with RATE in [0, 1]")
+        rates[route.strip()] = rate
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record, message text hashed, truncated or omitted
+    hash_key (at most 64 bytes) keys the message hashes; a random key is
+    used when it is empty.
+    """
+
+    def __init__(self, message_mode='hash', message_chars=32, hash_key=''):
+        super().__init__()
+        if message_mode not in ('hash', 'truncate', 'omit'):
+            raise ValueError(f"Unknown message mode {message_mode!r}, expected hash, truncate or omit")
+        self.message_mode = message_mode
+        self.message_chars = message_chars
+        self.hash_key = (hash_key or '').encode('utf-8')
+        if len(self.hash_key) > hashlib.blake2b.MAX_KEY_SIZE:
+            raise ValueError(f"Hash key of {len(self.hash_key)} bytes, at most {hashlib.blake2b.MAX_KEY_SIZE} allowed")
+        self.random_key = not self.hash_key
+        if self.random_key:
+            self.hash_key = os.urandom(32)
+            if message_mode == 'hash':
+                logger.warning("No request log hash key configured, message hashes are keyed randomly "
+                               "and do not match across restarts (set REQUEST_LOG_HASH_KEY)")
+
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'event': record.getMessage(),
+            'pid': record.process
+        }
+        fields = dict(getattr(record, 'fields', {}))
+        message = fields.pop('message', None)
+        if isinstance(message, str):
+            entry['message_length'] = len(message)
+            if self.message_mode == 'hash':
+                entry['message_hash'] = hashlib.blake2b(
+                    message.encode('utf-8', 'surrogatepass'), digest_size=8, key=self.hash_key
+                ).hexdigest()
+            elif self.message_mode == 'truncate':
+                # Lone surrogates cannot be written to a UTF-8 stream
+                entry['message'] = message[:self.message_chars].encode('utf-8', 'replace').decode('utf-8')
+        entry.update(fields)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Queue records unformatted and drop them when the queue is full"""
+
+    def __init__(self, record_queue):
+        super().__init__(record_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # QueueHandler.prepare formats the record on the calling thread
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RequestLog:
+    """
+    Sampled JSON request log
+
+    ``sample_rates`` maps routes to the fraction of their requests that is
+    logged, ``default_rate`` applies to every other route. Records go to
+    ``stream`` from a listener thread, started by the first logged request
+    of a process: a gunicorn master that only imports the app runs none,
+    and every worker writes its own records.
+    """
+
+    def __init__(self, sample_rates=None, default_rate=0.01, message_mode='hash', message_chars=32,
+                 hash_key='', queue_size=10000, stream=None):
+        self.sample_rates = dict(sample_rates or {})
+        self.default_rate = default_rate
+        self.queue_size = queue_size
+        self.formatter = JsonFormatter(message_mode, message_chars, hash_key)
+        self.output = logging.StreamHandler(stream or sys.stdout)
+        self.output.setFormatter(self.formatter)
+        self.handler = _DeferredQueueHandler(queue.Queue(queue_size))
+        self.logged = 0
+        self.sampled_out = 0
+        # Counted by many request threads at once
+        self._counts_lock = threading.Lock()
+        self._listener = None
+        self._start_lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._after_fork)
+        atexit.register(self.close)
+
+    def _start(self):
+        with self._start_lock:
+            if self._listener is None:
+                listener = QueueListener(self.handler.queue, self.output)
+                listener.start()
+                self._listener = listener
+
+    def _after_fork(self):
+        # The parent's listener thread does not exist in the child
+        self.handler.queue = queue.Queue(self.queue_size)
+        self.logged = self.sampled_out = self.handler.dropped = 0
+        self._counts_lock = threading.Lock()
+        self._listener = None
+        self._start_lock = threading.Lock()
+
+    def sample_rate(self, route):
+        return self.sample_rates.get(route, self.default_rate)
+
+    def log(self, route, event='request', **fields):
+        """Log one request with probability sample_rate(route), fields are formatted later"""
+        rate = self.sample_rates.get(route, self.default_rate)
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            with self._counts_lock:
+                self.sampled_out += 1
+            return False
+        if self._listener is None:
+            self._start()
+        record = logging.LogRecord('request_log', logging.INFO, '', 0, event, None, None)
+        record.fields = {'route': route, 'sample_rate': rate, **fields}
+        # handle() holds the handler's lock, which also guards its dropped count
+        self.handler.handle(record)
+        with self._counts_lock:
+            self.logged += 1
+        return True
+
+    def close(self):
+        """Write out the queued records and stop the listener"""
+        listener, self._listener = self._listener, None
+        if listener is None or listener._thread is None:
+            return
+        try:
+            listener.stop()
+            self.output.flush()
+        except (queue.Full, ValueError):
+            # Full queue, or a stream already closed at interpreter exit
+            pass
+
+    def stats(self):
+        with self._counts_lock:
+            logged, sampled_out = self.logged, self.sampled_out
+        return {
+            'logged': logged,
+            'sampled_out': sampled_out,
+            'dropped': self.handler.dropped,
+            'queued': self.handler.queue.qsize(),
+            'queue_size': self.queue_size,
+            'default_rate': self.default_rate,
+            'sample_rates': self.sample_rates,
+            'message_mode': self.formatter.message_mode,
+            'random_hash_key': self.formatter.random_key
+        }
+
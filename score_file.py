@@ -0,0 +1,343 @@
+# score_file.py
+"""
+Score a JSONL or CSV archive of SMS messages offline
+
+Input is read as a stream and split into chunks that are scored on a pool
+of worker processes, each holding its own extractor and compiled forest.
+Results are appended to the output (JSONL, or CSV when it ends in .csv) in
+input order as chunks complete, and a checkpoint next to the output records
+how many input rows, input bytes and output bytes are durable. Running the
+same command again after an interruption truncates the output to the
+checkpoint and seeks the input to the next row, so rows already scored are
+not read again. An existing output without a checkpoint is only replaced
+with --restart. Blank input lines are skipped.
+
+The model is a joblib file or the .json manifest of a pickle-free artifact
+(model_artifact.py).
+
+    python score_file.py archive.jsonl scored.jsonl --text-field message --id-field id
+    python score_file.py archive.csv scored.csv --workers 8 --chunk-size 5000
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from joblib import load
+from feature_extraction import EXTRACTOR_VERSION, SMSFeatureExtractor
+from forest_engine import CompiledForest
+from model_artifact import load_artifact
+
+# Per-process scoring state, set by _init_worker
+_extractor = None
+_scorer = None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Score a JSONL or CSV file of SMS messages")
+    parser.add_argument('input', help="JSONL or CSV file with one message per record")
+    parser.add_argument('output', help="results file, JSONL (or CSV if it ends in .csv)")
+    parser.add_argument('--format', choices=['auto', 'jsonl', 'csv'], default='auto',
+                        help="input format (auto uses the file extension)")
+    parser.add_argument('--text-field', default='text',
+                        help="field holding the message ('message' is tried when it is missing)")
+    parser.add_argument('--id-field', default=None,
+                        help="field copied to every result to identify the message")
+    parser.add_argument('--model', default='spam_model.joblib',
+                        help="trained model file, or the .json manifest of a model artifact")
+    parser.add_argument('--workers', type=int, default=-1,
+                        help="scoring processes (-1 uses every core, 1 scores in this process)")
+    parser.add_argument('--chunk-size', type=int, default=2000, help="messages per scoring task")
+    parser.add_argument('--checkpoint', default=None,
+                        help="progress file (default: <output>.checkpoint)")
+    parser.add_argument('--restart', action='store_true',
+                        help="ignore an existing checkpoint and output, score from the first row")
+    return parser.parse_args()
+
+
+def read_records(path, fmt, text_field, id_field, offset=0, first_row=0):
+    """
+    Yield (row, id, text, end) for every record of the input after byte offset
+    text is None if missing, end is the byte offset after the record, where
+    a resumed run starts reading. Rows are numbered from first_row; blank
+    lines are skipped and get no number.
+    """
+    if fmt == 'auto':
+        fmt = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+    with open(path, 'rb') as f:
+        lines = iter(f.readline, b'')
+        if fmt == 'csv':
+            # csv.reader pulls exactly the lines of one record, so f.tell()
+            # is the record's end
+            reader = csv.reader(line.decode('utf-8') for line in lines)
+            header = next(reader, None)
+            if header is None:
+                return
+            f.seek(max(offset, f.tell()))
+            records = (dict(zip(header, values)) for values in reader if values)
+        else:
+            f.seek(offset)
+            records = (_parse_json_line(line) for line in lines if line.strip())
+
+        for row, record in enumerate(records, start=first_row):
+            if not isinstance(record, dict):
+                record = {}
+            text = record.get(text_field, record.get('message'))
+            yield row, record.get(id_field) if id_field else None, text if isinstance(text, str) else None, f.tell()
+
+
+def _parse_json_line(line):
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+def chunked(records, chunk_size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _init_worker(model_path):
+    """Load the extractor and the model once per scoring process"""
+    global _extractor, _scorer
+    _extractor = SMSFeatureExtractor()
+    if model_path.endswith('.json'):
+        _scorer = load_artifact(model_path, _extractor.feature_columns, EXTRACTOR_VERSION)
+        return
+    model = load(model_path)
+    try:
+        _scorer = CompiledForest.from_sklearn(model)
+    except ValueError:
+        _scorer = model
+
+
+def _model_classes():
+    """Classes of the scoring process's model, so the parent does not load it too"""
+    return _scorer.classes_
+
+
+def _score_chunk(texts):
+    """Scoring worker: labels and probabilities of a list of messages"""
+    if not texts:
+        return [], np.empty((0, len(_scorer.classes_))), 0.0, 0.0
+    start = time.perf_counter()
+    features = _extractor.extract_batch(texts)
+    extracted = time.perf_counter()
+    probabilities = _scorer.predict_proba(features)
+    labels = _scorer.classes_.take(np.argmax(probabilities, axis=1))
+    scored = time.perf_counter()
+    return labels, probabilities, extracted - start, scored - extracted
+
+
+class Checkpoint:
+    """Durable count of scored input rows, the input bytes they end at and the output bytes holding them"""
+
+    def __init__(self, path, input_path):
+        self.path = path
+        self.input_path = os.path.abspath(input_path)
+        self.rows = 0
+        self.input_offset = 0
+        self.output_bytes = 0
+
+    def load(self):
+        """Resume from the checkpoint file; False if there is none"""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path) as f:
+            state = json.load(f)
+        if state['input'] != self.input_path:
+            raise ValueError(f"Checkpoint {self.path} belongs to {state['input']}, not {self.input_path}")
+        if 'input_offset' not in state:
+            raise ValueError(f"Checkpoint {self.path} has no input offset, rerun with --restart")
+        self.rows = state['rows']
+        self.input_offset = state['input_offset']
+        self.output_bytes = state['output_bytes']
+        return True
+
+    def save(self, rows, input_offset, output_bytes):
+        self.rows = rows
+        self.input_offset = input_offset
+        self.output_bytes = output_bytes
+        temporary = f"{self.path}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump({'input': self.input_path, 'rows': rows, 'input_offset': input_offset,
+                       'output_bytes': output_bytes}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class ResultWriter:
+    """Append results as JSONL or CSV rows"""
+
+    def __init__(self, path, classes, with_id):
+        self.csv = path.lower().endswith('.csv')
+        self.classes = [str(c) for c in classes]
+        self.columns = ['row'] + (['id'] if with_id else []) + ['prediction', 'confidence'] + \
+            [f'probability_{c}' for c in self.classes] + ['error']
+        self.with_id = with_id
+        self.file = None
+        self.path = path
+
+    def open(self, truncate_to):
+        """Open for appending after the first truncate_to bytes"""
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if size < truncate_to:
+            raise ValueError(f"{self.path} has {size} bytes but the checkpoint expects {truncate_to}, "
+                             f"rerun with --restart")
+        self.file = open(self.path, 'a+b')
+        self.file.truncate(truncate_to)
+        self.file.seek(truncate_to)
+        if self.csv and truncate_to == 0:
+            self._write_csv_row(self.columns)
+
+    def write(self, records, labels, probabilities):
+        """Write the results of one chunk, records without text get an error"""
+        scored = iter(zip(labels, probabilities))
+        lines = []
+        for row, record_id, text, _ in records:
+            result = {'row': row}
+            if self.with_id:
+                result['id'] = record_id
+            if text is None:
+                result['error'] = 'Missing text'
+            else:
+                label, row_probabilities = next(scored)
+                result['prediction'] = str(label)
+                result['confidence'] = float(row_probabilities.max())
+                for name, probability in zip(self.classes, row_probabilities):
+                    result[f'probability_{name}'] = float(probability)
+            lines.append(result)
+
+        if self.csv:
+            for result in lines:
+                self._write_csv_row([result.get(column, '') for column in self.columns])
+        else:
+            self.file.write(''.join(json.dumps(result, ensure_ascii=False) + '\n' for result in lines).encode('utf-8'))
+
+    def sync(self):
+        """Flush to disk and return the durable size of the output"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+    def _write_csv_row(self, values):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(values)
+        self.file.write(buffer.getvalue().encode('utf-8'))
+
+
+def score(args):
+    checkpoint = Checkpoint(args.checkpoint or f"{args.output}.checkpoint", args.input)
+    if args.restart:
+        checkpoint.remove()
+    resumed = checkpoint.load()
+    if resumed:
+        print(f"Resuming after {checkpoint.rows} rows ({checkpoint.output_bytes} output bytes)")
+    elif os.path.exists(args.output) and os.path.getsize(args.output) > 0 and not args.restart:
+        raise ValueError(f"{args.output} exists and has no checkpoint, rerun with --restart to replace it")
+
+    n_jobs = args.workers if args.workers and args.workers > 0 else (os.cpu_count() or 1)
+    times = {'read': 0.0, 'extract': 0.0, 'inference': 0.0, 'write': 0.0}
+    rows_done = checkpoint.rows
+    scored_now = 0
+    start_time = time.perf_counter()
+
+    records = read_records(args.input, args.format, args.text_field, args.id_field,
+                           offset=checkpoint.input_offset, first_row=checkpoint.rows)
+    chunks = chunked(records, args.chunk_size)
+    writer = None
+
+    def open_writer(classes):
+        nonlocal writer
+        writer = ResultWriter(args.output, classes, with_id=args.id_field is not None)
+        writer.open(truncate_to=checkpoint.output_bytes)
+
+    def next_chunk():
+        started = time.perf_counter()
+        chunk = next(chunks, None)
+        times['read'] += time.perf_counter() - started
+        return chunk
+
+    def finish(chunk, result):
+        nonlocal rows_done, scored_now
+        labels, probabilities, extract_time, inference_time = result
+        times['extract'] += extract_time
+        times['inference'] += inference_time
+        started = time.perf_counter()
+        writer.write(chunk, labels, probabilities)
+        rows_done = chunk[-1][0] + 1
+        checkpoint.save(rows_done, chunk[-1][3], writer.sync())
+        times['write'] += time.perf_counter() - started
+        scored_now += len(chunk)
+        _report_progress(rows_done, scored_now, start_time)
+
+    try:
+        if n_jobs == 1:
+            _init_worker(args.model)
+            open_writer(_model_classes())
+            chunk = next_chunk()
+            while chunk is not None:
+                finish(chunk, _score_chunk([text for _, _, text, _ in chunk if text is not None]))
+                chunk = next_chunk()
+        else:
+            # At most two chunks per worker in flight, written back in order
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                     initargs=(args.model,)) as executor:
+                open_writer(executor.submit(_model_classes).result())
+                in_flight = deque()
+                chunk = next_chunk()
+                while chunk is not None or in_flight:
+                    while chunk is not None and len(in_flight) < 2 * n_jobs:
+                        texts = [text for _, _, text, _ in chunk if text is not None]
+                        in_flight.append((chunk, executor.submit(_score_chunk, texts)))
+                        chunk = next_chunk()
+                    done_chunk, future = in_flight.popleft()
+                    finish(done_chunk, future.result())
+    finally:
+        if writer is not None:
+            writer.close()
+
+    checkpoint.remove()
+    elapsed = time.perf_counter() - start_time
+    rate = scored_now / elapsed if elapsed > 0 else float('inf')
+    print(f"Scored {scored_now} messages in {elapsed:.1f}s ({rate:,.0f} messages/s, {n_jobs} workers)")
+    print("Stage time (s): " + ", ".join(f"{stage} {seconds:.2f}" for stage, seconds in times.items()))
+    print("  extract and inference are summed over workers, read and write are in this process")
+    return times
+
+
+def _report_progress(rows_done, scored_now, start_time):
+    """Print scoring progress and throughput"""
+    elapsed = time.perf_counter() - start_time
+    rate = scored_now / elapsed if elapsed > 0 else float('inf')
+    print(f"Scored {rows_done} rows ({rate:,.0f} messages/s)", file=sys.stderr)
+
+
+def main():
+    score(parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# sidecar.py
+"""
+Unix domain socket server for co-located clients
+
+Scores messages with the same extractor, model, caches and hot reload as
+app.py, without HTTP, JSON or routing. Clients keep a connection open and
+send frames; frames may be pipelined (sent before the previous answers
+arrive) and are answered in order.
+
+The frames are described in sidecar_protocol.py: length-prefixed UTF-8
+messages in, a packed (label, spam probability) per message out. A frame
+longer than SIDECAR_MAX_FRAME_BYTES, with more than BATCH_MAX_MESSAGES
+messages or with inconsistent lengths closes the connection.
+
+    python sidecar.py --socket /run/sms-spam.sock --workers 4
+
+--workers forks processes after the model is loaded, like gunicorn with
+preload_app, and they accept from the same socket. Clients use
+sidecar_protocol.SidecarClient.
+
+With SIDECAR_METRICS_PORT set, the Prometheus metrics of all sidecar
+processes (the route label is 'sidecar') are served over HTTP on that port.
+Workers write them to PROMETHEUS_MULTIPROC_DIR, a fresh temporary directory
+unless set.
+"""
+import argparse
+import gc
+import math
+import os
+import signal
+import socketserver
+import tempfile
+import time
+
+SIDECAR_METRICS_PORT = int(os.environ.get('SIDECAR_METRICS_PORT', 0))
+
+# Must be set before the app imports prometheus_client
+if SIDECAR_METRICS_PORT and not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='sms-sidecar-metrics-')
+
+import app as flask_app
+import metrics
+from sidecar_protocol import (
+    LABEL_ERROR, LABEL_HAM, LABEL_SPAM, LENGTH, ProtocolError, decode_request, encode_response
+)
+
+logger = flask_app.logger
+
+SIDECAR_SOCKET = os.environ.get('SIDECAR_SOCKET', '/tmp/sms-spam-sidecar.sock')
+SIDECAR_MAX_FRAME_BYTES = int(os.environ.get('SIDECAR_MAX_FRAME_BYTES', 1024 * 1024))
+
+
+def spam_column():
+    """Column of the spam class in the model's probabilities, None if there is none"""
+    for i, class_label in enumerate(flask_app.serving.model.classes_):
+        if flask_app.normalize_prediction(class_label)[0] == 'spam':
+            return i
+    return None
+
+
+def score(messages):
+    """(label, spam probability) for every message"""
+    valid = [i for i, message in enumerate(messages) if message and message.strip()]
+    results = [(LABEL_ERROR, math.nan)] * len(messages)
+    if not valid:
+        return results
+
+    texts = [messages[i].strip() for i in valid]
+    # A single message may join concurrent ones in the micro-batcher
+    scored = [flask_app.classify(texts[0])] if len(texts) == 1 else flask_app.classify_batch(texts)
+    column = spam_column()
+    for i, (raw_prediction, probabilities, _) in zip(valid, scored):
+        _, code = flask_app.normalize_prediction(raw_prediction)
+        probability = float(probabilities[column]) if probabilities is not None and column is not None else math.nan
+        results[i] = (LABEL_SPAM if code == 1 else LABEL_HAM, probability)
+    return results
+
+
+class FrameHandler(socketserver.StreamRequestHandler):
+    """Answer the frames of one connection in order until the client closes it"""
+
+    def handle(self):
+        while True:
+            header = self.rfile.read(LENGTH.size)
+            if len(header) < LENGTH.size:
+                return
+            length, = LENGTH.unpack(header)
+            if length > SIDECAR_MAX_FRAME_BYTES:
+                logger.warning(f"Sidecar frame of {length} bytes refused, closing connection")
+                return
+            payload = self.rfile.read(length)
+            if len(payload) < length:
+                return
+
+            started = time.perf_counter()
+            try:
+                messages = decode_request(payload, flask_app.BATCH_MAX_MESSAGES)
+            except ProtocolError as e:
+                logger.warning(f"Sidecar protocol error, closing connection: {e}")
+                return
+            try:
+                response = encode_response(score(messages))
+            except Exception as e:
+                logger.error(f"Error in sidecar prediction: {str(e)}")
+                response = encode_response([(LABEL_ERROR, math.nan)] * len(messages))
+            self.wfile.write(response)
+            metrics.record_request('sidecar', 'FRAME', 200, time.perf_counter() - started, length)
+
+
+class SidecarServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        # A socket file left behind by a previous run would fail the bind
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        super().server_bind()
+        os.chmod(self.server_address, int(os.environ.get('SIDECAR_SOCKET_MODE', '660'), 8))
+
+
+def serve(path, workers):
+    if flask_app.serving is None:
+        raise RuntimeError("Model not loaded, see the log above")
+    server = SidecarServer(path, FrameHandler)
+    logger.info(f"Sidecar listening on {path} with {workers} worker process(es)")
+    if SIDECAR_METRICS_PORT:
+        metrics.serve(SIDECAR_METRICS_PORT)
+        logger.info(f"Sidecar metrics on port {SIDECAR_METRICS_PORT}")
+    if workers <= 1:
+        flask_app.init_serving_process()
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(path)
+        return
+
+    # Share the loaded model with the workers copy-on-write
+    gc.freeze()
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            # Ctrl-C reaches the whole group, the parent stops the workers
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            flask_app.init_serving_process()
+            server.serve_forever()
+            os._exit(0)
+        children.append(pid)
+
+    def stop(signum, frame):
+        for child in children:
+            os.kill(child, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        for child in children:
+            os.waitpid(child, 0)
+            metrics.mark_process_dead(child)
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve spam predictions on a Unix domain socket")
+    parser.add_argument('--socket', default=SIDECAR_SOCKET, help="socket path (SIDECAR_SOCKET)")
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('SIDECAR_WORKERS', 1)),
+                        help="processes accepting connections (SIDECAR_WORKERS)")
+    args = parser.parse_args()
+    serve(args.socket, args.workers)
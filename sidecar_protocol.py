@@ -0,0 +1,122 @@
+# sidecar_protocol.py
+"""
+Wire format of the Unix domain socket sidecar (sidecar.py), and a client
+
+Importing this module does not load the model, so clients can use it.
+
+Request frame, all integers unsigned big-endian:
+
+    u32 payload length | u32 message count | count x (u32 length | UTF-8 bytes)
+
+Response frame:
+
+    u32 payload length | u32 message count | count x (u8 label | f32 spam probability)
+
+label is 0 for ham, 1 for spam and 255 for a message that could not be
+scored (empty or not valid UTF-8); the probability is NaN when unavailable.
+Frames may be pipelined and are answered in order.
+"""
+import socket
+import struct
+import threading
+
+LENGTH = struct.Struct('!I')
+RESULT = struct.Struct('!Bf')
+LABEL_HAM = 0
+LABEL_SPAM = 1
+LABEL_ERROR = 255
+
+
+class ProtocolError(Exception):
+    """Malformed frame"""
+
+
+def encode_request(messages):
+    """Request frame for a list of str messages"""
+    parts = [LENGTH.pack(len(messages))]
+    for message in messages:
+        data = message.encode('utf-8')
+        parts.append(LENGTH.pack(len(data)))
+        parts.append(data)
+    payload = b''.join(parts)
+    return LENGTH.pack(len(payload)) + payload
+
+
+def decode_request(payload, max_messages):
+    """Messages of a request payload, None for those that are not valid UTF-8"""
+    if len(payload) < LENGTH.size:
+        raise ProtocolError("Frame without a message count")
+    count, = LENGTH.unpack_from(payload)
+    if count > max_messages:
+        raise ProtocolError(f"{count} messages in one frame, at most {max_messages} allowed")
+
+    messages = []
+    offset = LENGTH.size
+    for _ in range(count):
+        if offset + LENGTH.size > len(payload):
+            raise ProtocolError("Frame ends inside a message length")
+        length, = LENGTH.unpack_from(payload, offset)
+        offset += LENGTH.size
+        if offset + length > len(payload):
+            raise ProtocolError("Frame ends inside a message")
+        try:
+            messages.append(payload[offset:offset + length].decode('utf-8'))
+        except UnicodeDecodeError:
+            messages.append(None)
+        offset += length
+    if offset != len(payload):
+        raise ProtocolError(f"{len(payload) - offset} bytes after the last message")
+    return messages
+
+
+def encode_response(results):
+    """Response frame for a list of (label, spam probability)"""
+    payload = LENGTH.pack(len(results)) + b''.join(RESULT.pack(label, probability) for label, probability in results)
+    return LENGTH.pack(len(payload)) + payload
+
+
+def decode_response(payload):
+    """List of (label, spam probability) of a response payload"""
+    count, = LENGTH.unpack_from(payload)
+    if len(payload) != LENGTH.size + count * RESULT.size:
+        raise ProtocolError(f"Response of {len(payload)} bytes for {count} results")
+    return [RESULT.unpack_from(payload, LENGTH.size + i * RESULT.size) for i in range(count)]
+
+
+class SidecarClient:
+    """Persistent connection to the sidecar"""
+
+    def __init__(self, path):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(path)
+        self.rfile = self.socket.makefile('rb')
+
+    def send(self, messages):
+        self.socket.sendall(encode_request(messages))
+
+    def receive(self):
+        header = self.rfile.read(LENGTH.size)
+        if len(header) < LENGTH.size:
+            raise ConnectionError("Sidecar closed the connection")
+        length, = LENGTH.unpack(header)
+        return decode_response(self.rfile.read(length))
+
+    def classify(self, messages):
+        """(label, spam probability) for every message of one frame"""
+        self.send(messages)
+        return self.receive()
+
+    def pipeline(self, batches):
+        """Send every frame without waiting for answers, return all answers in order"""
+        data = b''.join(encode_request(messages) for messages in batches)
+        # Reading while sending: with both directions' socket buffers full,
+        # sending everything first would block the client and the server
+        sender = threading.Thread(target=self.socket.sendall, args=(data,), daemon=True)
+        sender.start()
+        answers = [self.receive() for _ in batches]
+        sender.join()
+        return answers
+
+    def close(self):
+        self.rfile.close()
+        self.socket.close()
@@ -0,0 +1,197 @@
+# synthetic_corpus.py
+"""
+Deterministic synthetic SMS corpus for benchmarks and load tests
+
+Messages are built from English, Bengali and Assamese templates whose
+slots are filled with URLs (short and regular), phone numbers in Latin and
+Bengali digits, amounts, dates, times, codes and emojis; a share of them
+are long, multi-sentence messages. The same (n, seed) always gives the same
+corpus, on any machine and Python version, so timings of different runs
+measure the code and not the input.
+
+    python synthetic_corpus.py 10000 corpus.jsonl --seed 0
+"""
+import json
+import random
+
+BENGALI_DIGITS = str.maketrans('0123456789', '০১২৩৪৫৬৭৮৯')
+
+SHORT_URLS = ['bit.ly/{code}', 'tinyurl.com/{code}', 'goo.gl/{code}', 't.co/{code}', 'cutt.ly/{code}']
+REGULAR_URLS = ['https://www.{site}.com/{path}', 'http://{site}.in/{path}?id={code}', 'www.{site}.net/{path}']
+SITES = ['example', 'offers-zone', 'mybank-verify', 'shopnow', 'rewards-claim', 'newsdaily']
+PATHS = ['login', 'claim', 'offer/today', 'account/verify', 'win', 'track']
+EMOJIS = ['🎉', '🔥', '💰', '🎁', '😊', '👍', '📞', '⚠️', '✅', '🙏', '❤️', '😂']
+
+ENGLISH_SPAM = [
+    "CONGRATULATIONS! You have WON a {amount} cash prize. Call {phone} to claim now!",
+    "URGENT: Your account will be suspended. Verify at {url} within 24 hours.",
+    "FREE entry into our weekly draw! Text WIN to {short_code} to receive {amount}. T&C apply.",
+    "Your OTP is {otp}. Get 50% cashback on recharge of {amount}, visit {url} {emoji}",
+    "Dear customer, you are selected for a loan of {amount}. Reply YES or call {phone}",
+    "Limited offer!!! Buy 1 get 1 free at {url} till {date} {emoji}{emoji}",
+]
+ENGLISH_HAM = [
+    "Hi, are we still meeting at {time} tomorrow?",
+    "Can you pick up some milk on the way home? Thanks {emoji}",
+    "Running late, will be there by {time}. Sorry!",
+    "Happy birthday! Have a great day {emoji}",
+    "The meeting is moved to {date}, same room.",
+    "ok, call me when you are free. my number is {phone}",
+]
+BENGALI_SPAM = [
+    "অভিনন্দন! আপনি {amount} টাকা জিতেছেন। এখনই কল করুন {phone} নম্বরে",
+    "আপনার অ্যাকাউন্টে {amount} টাকা বোনাস যোগ হয়েছে, এখনই ভিজিট করুন {url}",
+    "জরুরি: আপনার সিম বন্ধ হয়ে যাবে। {date} তারিখের মধ্যে {url} এ যাচাই করুন",
+    "মাত্র {amount} টাকায় ১০ জিবি ইন্টারনেট! ডায়াল করুন {short_code} {emoji}",
+    "আপনার ওটিপি {otp}। কাউকে শেয়ার করবেন না। অফার দেখুন {url}",
+]
+BENGALI_HAM = [
+    "আজ সন্ধ্যায় {time} টায় দেখা হবে।",
+    "মা, আমি বাড়ি পৌঁছে গেছি। চিন্তা করো না {emoji}",
+    "কাল অফিসে মিটিং আছে, {date} তারিখে ছুটি নেব।",
+    "তুমি কি খেয়েছ? ফোন করো {phone}",
+    "শুভ জন্মদিন! ভালো থেকো {emoji}",
+]
+ASSAMESE_SPAM = [
+    "অভিনন্দন! আপুনি {amount} টকা জিকিছে। এতিয়াই {phone} নম্বৰত ফোন কৰক",
+    "আপোনাৰ একাউণ্টত {amount} টকা বোনাছ যোগ হৈছে, এতিয়াই চাওক {url}",
+    "জৰুৰী: আপোনাৰ ছিম বন্ধ হ'ব। {date} তাৰিখৰ ভিতৰত {url} ত পৰীক্ষা কৰক",
+    "মাত্ৰ {amount} টকাত ১০ জিবি ইণ্টাৰনেট! ডায়েল কৰক {short_code} {emoji}",
+]
+ASSAMESE_HAM = [
+    "আজি সন্ধিয়া {time} বজাত লগ পাম।",
+    "মা, মই ঘৰ পালোঁ। চিন্তা নকৰিবা {emoji}",
+    "কালি অফিচত মিটিং আছে, {date} তাৰিখে ছুটী ল'ম।",
+    "তুমি ভাত খালানে? মোক ফোন কৰিবা {phone}",
+    "শুভ জন্মদিন! ভালে থাকিবা {emoji}",
+]
+MIXED = [
+    "Hello বন্ধু, আজকের offer মিস করবেন না! Visit {url} {emoji}",
+    "Dear customer আপোনাৰ bill {amount} টকা due on {date}. Pay at {url}",
+    "ভাই meeting {time} এ, don't be late {emoji}",
+    "Recharge করুন {amount} টাকা and get FREE talktime. Call {phone}",
+]
+
+LANGUAGES = {
+    'en': (ENGLISH_SPAM, ENGLISH_HAM),
+    'bn': (BENGALI_SPAM, BENGALI_HAM),
+    'as': (ASSAMESE_SPAM, ASSAMESE_HAM),
+    'mixed': (MIXED, MIXED),
+}
+# Share of messages per language
+LANGUAGE_WEIGHTS = {'en': 0.4, 'bn': 0.25, 'as': 0.2, 'mixed': 0.15}
+
+
+class CorpusGenerator:
+    """Build messages from templates with a private, seeded random generator"""
+
+    def __init__(self, seed=0, long_share=0.05, bengali_digit_share=0.5):
+        self.rng = random.Random(seed)
+        self.long_share = long_share
+        self.bengali_digit_share = bengali_digit_share
+
+    def _digits(self, text, language):
+        if language != 'en' and self.rng.random() < self.bengali_digit_share:
+            return text.translate(BENGALI_DIGITS)
+        return text
+
+    def _code(self, length=6):
+        return ''.join(self.rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnpqrstuvwxyz23456789')
+                       for _ in range(length))
+
+    def _url(self):
+        if self.rng.random() < 0.5:
+            template = self.rng.choice(SHORT_URLS)
+        else:
+            template = self.rng.choice(REGULAR_URLS)
+        return template.format(code=self._code(), site=self.rng.choice(SITES), path=self.rng.choice(PATHS))
+
+    def _phone(self):
+        number = self.rng.choice('6789') + ''.join(self.rng.choice('0123456789') for _ in range(9))
+        style = self.rng.randrange(3)
+        if style == 0:
+            return number
+        if style == 1:
+            return f"+91 {number}"
+        return f"{number[:5]}-{number[5:]}"
+
+    def _slots(self, language):
+        rng = self.rng
+        return {
+            'amount': self._digits(str(rng.choice([50, 100, 500, 1000, 5000, 10000, 25000])), language),
+            'phone': self._digits(self._phone(), language),
+            'short_code': self._digits(str(rng.randrange(10000, 99999)), language),
+            'otp': self._digits(str(rng.randrange(100000, 999999)), language),
+            'url': self._url(),
+            'date': self._digits(f"{rng.randrange(1, 29):02d}/{rng.randrange(1, 13):02d}/2024", language),
+            'time': self._digits(f"{rng.randrange(1, 13)}:{rng.choice(['00', '15', '30', '45'])}", language),
+            'emoji': rng.choice(EMOJIS),
+        }
+
+    def _sentence(self, language, kind):
+        spam, ham = LANGUAGES[language]
+        template = self.rng.choice(spam if kind == 'spam' else ham)
+        slots = self._slots(language)
+        return template.format(**slots)
+
+    def record(self, index):
+        """One message with its language, intended kind and tags"""
+        rng = self.rng
+        language = rng.choices(list(LANGUAGE_WEIGHTS), weights=list(LANGUAGE_WEIGHTS.values()))[0]
+        kind = 'spam' if rng.random() < 0.4 else 'ham'
+        is_long = rng.random() < self.long_share
+        if is_long:
+            # 10-30 sentences, a few hundred to a few thousand characters
+            text = ' '.join(self._sentence(language, kind) for _ in range(rng.randrange(10, 31)))
+        else:
+            text = self._sentence(language, kind)
+
+        tags = []
+        if is_long:
+            tags.append('long')
+        if any(c in text for c in '০১২৩৪৫৬৭৮৯'):
+            tags.append('bengali_digits')
+        if any(emoji in text for emoji in EMOJIS):
+            tags.append('emoji')
+        if any(marker in text for marker in ('http', 'www.', '.ly/', '.com/', '.co/', '.gl/')):
+            tags.append('url')
+        return {'id': index, 'text': text, 'language': language, 'kind': kind, 'tags': tags}
+
+
+def generate_corpus(n, seed=0, long_share=0.05):
+    """n synthetic records (dicts with id, text, language, kind and tags)"""
+    generator = CorpusGenerator(seed=seed, long_share=long_share)
+    return [generator.record(index) for index in range(n)]
+
+
+def generate_messages(n, seed=0, long_share=0.05):
+    """Only the texts of generate_corpus"""
+    return [record['text'] for record in generate_corpus(n, seed=seed, long_share=long_share)]
+
+
+def write_jsonl(records, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+if __name__ == "__main__":
+    import argparse
+    from collections import Counter
+
+    parser = argparse.ArgumentParser(description="Write a deterministic synthetic SMS corpus as JSONL")
+    parser.add_argument('n', type=int, help="number of messages")
+    parser.add_argument('output', help="JSONL file to write")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--long-share', type=float, default=0.05, help="share of long multi-sentence messages")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.n, seed=args.seed, long_share=args.long_share)
+    assert corpus == generate_corpus(args.n, seed=args.seed, long_share=args.long_share), "Corpus is not deterministic"
+    write_jsonl(corpus, args.output)
+
+    languages = Counter(record['language'] for record in corpus)
+    tags = Counter(tag for record in corpus for tag in record['tags'])
+    print(f"Wrote {len(corpus)} messages to {args.output}")
+    print(f"  languages: {dict(languages)}")
+    print(f"  tags: {dict(tags)}")
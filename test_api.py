@@ -43,8 +43,8 @@ class APITester:
     def test_batch_prediction(self, texts):
         """Test batch prediction"""
         try:
-            data = {'texts': texts}
-            response = requests.post(f'{self.base_url}/predict_batch', json=data)
+            data = {'messages': texts}
+            response = requests.post(f'{self.base_url}/api/predict_batch', json=data)
             
             print(f"\nBatch Prediction Test:")
             print(f"Status: {response.status_code}")
@@ -55,7 +55,7 @@ class APITester:
                 
                 for res in result['results']:
                     if 'error' not in res:
-                        print(f"Text: {res['input_text'][:50]}...")
+                        print(f"Text: {res['message'][:50]}...")
                         print(f"Prediction: {res['prediction']} ({res['confidence']:.2%})")
                     else:
                         print(f"Error for text {res['index']}: {res['error']}")
@@ -0,0 +1,192 @@
+import io
+import json
+
+import pytest
+
+import app as flask_app
+from feature_extraction import SMSFeatureExtractor
+
+
+@pytest.fixture
+def client():
+    # Every test scores its messages, none answered from an earlier test
+    flask_app.prediction_cache.clear()
+    return flask_app.app.test_client()
+
+
+@pytest.fixture
+def timed_extractor(monkeypatch):
+    extractor = SMSFeatureExtractor()
+    extractor.enable_timing()
+    monkeypatch.setattr(flask_app, 'extractor', extractor)
+    return extractor
+
+
+def test_feature_timings_need_timing_enabled(client, monkeypatch):
+    monkeypatch.setattr(flask_app, 'extractor', SMSFeatureExtractor())
+    assert client.get('/api/feature_timings').status_code == 404
+
+
+def test_feature_timings_count_scored_messages(client, timed_extractor):
+    assert client.post('/api/predict', json={'message': "Call 9876543210 now"}).status_code == 200
+    assert client.get('/api/feature_timings').get_json()['messages'] == 1
+
+
+def test_feature_timings_reset_needs_the_token(client, timed_extractor, monkeypatch):
+    timed_extractor.feature_values("Call 9876543210 now")
+
+    monkeypatch.setattr(flask_app, 'FEATURE_TIMING_TOKEN', '')
+    assert client.delete('/api/feature_timings', headers={'X-Timing-Token': ''}).status_code == 404
+
+    monkeypatch.setattr(flask_app, 'FEATURE_TIMING_TOKEN', 'secret')
+    assert client.delete('/api/feature_timings').status_code == 403
+    assert client.delete('/api/feature_timings', headers={'X-Timing-Token': 'wrong'}).status_code == 403
+    assert client.delete('/api/feature_timings', headers={'X-Timing-Token': 'sécret'}).status_code == 403
+    assert timed_extractor.timings.messages == 1
+
+    response = client.delete('/api/feature_timings', headers={'X-Timing-Token': 'secret'})
+    assert response.status_code == 200
+    assert client.get('/api/feature_timings').get_json()['messages'] == 0
+
+
+MESSAGES = [
+    "CONGRATULATIONS! You have WON a 5000 cash prize. Call 9876543210 to claim now!",
+    "Hi, are we still meeting at 5:30 tomorrow?",
+    "আপনার অ্যাকাউন্টে ৫০০ টাকা বোনাস যোগ হয়েছে, এখনই ভিজিট করুন bit.ly/offer",
+    "ok, call me when you are free",
+]
+
+VERDICT_FIELDS = ('prediction', 'prediction_code', 'confidence', 'probabilities', 'short_circuit')
+
+
+def single_verdicts(client, messages):
+    verdicts = []
+    for message in messages:
+        flask_app.prediction_cache.clear()
+        response = client.post('/api/predict', json={'message': message})
+        assert response.status_code == 200
+        body = response.get_json()
+        verdicts.append({field: body.get(field) for field in VERDICT_FIELDS})
+    return verdicts
+
+
+def test_batch_keeps_order_and_reports_item_errors(client):
+    batch = [MESSAGES[0], 42, "   ", MESSAGES[1], None, f"  {MESSAGES[2]}  "]
+    response = client.post('/api/predict_batch', json={'messages': batch})
+    assert response.status_code == 200
+    body = response.get_json()
+
+    results = body['results']
+    assert [result['index'] for result in results] == list(range(len(batch)))
+    assert [result.get('message') for result in results] == [MESSAGES[0], None, None, MESSAGES[1], None, MESSAGES[2]]
+    assert results[1]['error'] == 'Message must be a string' and results[1]['prediction'] is None
+    assert results[2]['error'] == 'Message cannot be empty'
+    assert results[4]['error'] == 'Message must be a string'
+    assert all(results[i]['prediction'] in ('ham', 'spam') for i in (0, 3, 5))
+    assert body['total_processed'] == 3 and body['total_errors'] == 3
+
+
+def test_batch_matches_single_predictions(client):
+    expected = single_verdicts(client, MESSAGES)
+    flask_app.prediction_cache.clear()
+    response = client.post('/api/predict_batch', json={'texts': MESSAGES})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [{field: result.get(field) for field in VERDICT_FIELDS} for result in results] == expected
+
+
+def test_batch_over_the_byte_limit_is_refused(client, monkeypatch):
+    monkeypatch.setattr(flask_app, 'BATCH_MAX_BYTES', 100)
+    response = client.post('/api/predict_batch', json={'messages': MESSAGES})
+    assert response.status_code == 413
+    assert response.get_json()['error'] == 'Request body exceeds 100 bytes'
+
+
+def test_batch_over_the_byte_limit_without_length_is_refused(client, monkeypatch):
+    monkeypatch.setattr(flask_app, 'BATCH_MAX_BYTES', 100)
+    body = ('{"messages": ["' + 'a' * 200 + '"]}').encode('utf-8')
+    # Chunked upload as passed on by gunicorn: no Content-Length to check up front
+    response = client.post('/api/predict_batch', input_stream=io.BytesIO(body),
+                           headers={'Content-Type': 'application/json'},
+                           environ_overrides={'wsgi.input_terminated': True, 'CONTENT_LENGTH': ''})
+    assert response.status_code == 413
+
+
+def test_batch_over_the_message_limit_is_refused(client, monkeypatch):
+    monkeypatch.setattr(flask_app, 'BATCH_MAX_MESSAGES', 3)
+    response = client.post('/api/predict_batch', json={'messages': MESSAGES})
+    assert response.status_code == 413
+    assert response.get_json()['error'] == 'Batch exceeds 3 messages'
+    assert client.post('/api/predict_batch', json={'messages': MESSAGES[:3]}).status_code == 200
+
+
+@pytest.mark.parametrize('body', [
+    json.dumps(MESSAGES[0]),
+    json.dumps({'messages': MESSAGES[0]}),
+    json.dumps({'message': MESSAGES[0]}),
+    json.dumps(MESSAGES),
+    '{"messages": [',
+])
+def test_batch_needs_a_messages_list(client, body):
+    response = client.post('/api/predict_batch', data=body, content_type='application/json')
+    assert response.status_code == 400
+    assert response.get_json()['results'] is None
+
+
+def stream_lines(client, body):
+    response = client.post('/api/predict_stream', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_stream_answers_every_line_in_order(client, monkeypatch):
+    monkeypatch.setattr(flask_app, 'STREAM_BATCH_SIZE', 2)
+    body = ''.join(json.dumps({'id': f'm{i}', 'message': message}) + '\n' for i, message in enumerate(MESSAGES))
+    *results, summary = stream_lines(client, body)
+
+    assert [result['line'] for result in results] == [1, 2, 3, 4]
+    assert [result['id'] for result in results] == ['m0', 'm1', 'm2', 'm3']
+    expected = single_verdicts(client, MESSAGES)
+    assert [{field: result.get(field) for field in VERDICT_FIELDS} for result in results] == expected
+    assert summary == {'total_processed': 4, 'total_errors': 0, 'status': 'success'}
+
+
+def test_stream_reports_bad_lines_and_skips_blank_ones(client, monkeypatch):
+    monkeypatch.setattr(flask_app, 'STREAM_MAX_LINE_BYTES', 200)
+    body = '\n'.join([
+        json.dumps({'message': MESSAGES[0]}),
+        '',
+        '{"message": "unterminated',
+        '   ',
+        json.dumps({'message': 'x' * 300}),
+        json.dumps(['not', 'an', 'object']),
+        json.dumps({'id': 7}),
+        json.dumps({'text': '  '}),
+        json.dumps({'text': MESSAGES[1]})
+    ])
+    *results, summary = stream_lines(client, body)
+
+    # Blank lines get no answer but keep their line numbers
+    assert [result['line'] for result in results] == [1, 3, 5, 6, 7, 8, 9]
+    assert results[0]['prediction'] in ('ham', 'spam')
+    assert results[1] == {'line': 3, 'error': 'Invalid JSON', 'prediction': None}
+    assert results[2] == {'line': 5, 'error': 'Line exceeds 200 bytes', 'prediction': None}
+    assert results[3]['error'] == 'Line must be a JSON object'
+    assert results[4] == {'line': 7, 'id': 7, 'error': 'Missing message', 'prediction': None}
+    assert results[5]['error'] == 'Message cannot be empty'
+    assert results[6]['prediction'] in ('ham', 'spam')
+    assert summary == {'total_processed': 2, 'total_errors': 5, 'status': 'success'}
+
+
+def test_oversized_line_does_not_swallow_the_next_one(client, monkeypatch):
+    monkeypatch.setattr(flask_app, 'STREAM_MAX_LINE_BYTES', 64)
+    body = json.dumps({'message': 'y' * 1000}) + '\n' + json.dumps({'message': MESSAGES[3]}) + '\n'
+    *results, summary = stream_lines(client, body)
+    assert results[0]['error'] == 'Line exceeds 64 bytes'
+    assert results[1]['line'] == 2 and results[1]['prediction'] in ('ham', 'spam')
+    assert summary['total_processed'] == 1 and summary['total_errors'] == 1
+
+
+def test_empty_stream_sends_only_the_summary(client):
+    assert stream_lines(client, '') == [{'total_processed': 0, 'total_errors': 0, 'status': 'success'}]
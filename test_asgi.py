@@ -0,0 +1,39 @@
+import asyncio
+import json
+
+import asgi
+
+
+def call(method, path, body=b''):
+    """Status, headers and body of one request to the ASGI app"""
+    scope = {'type': 'http', 'method': method, 'path': path, 'headers': []}
+    events = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return events.pop(0) if events else {'type': 'http.disconnect'}
+
+    async def send(event):
+        sent.append(event)
+
+    asyncio.run(asgi.app(scope, receive, send))
+    start = sent[0]
+    body = b''.join(event.get('body', b'') for event in sent[1:])
+    return start['status'], dict(start['headers']), body
+
+
+def test_head_sends_the_get_headers_without_body():
+    status, headers, body = call('GET', '/health')
+    assert status == 200 and json.loads(body)['status'] == 'healthy'
+
+    head_status, head_headers, head_body = call('HEAD', '/health')
+    assert head_status == 200
+    assert head_body == b''
+    assert head_headers[b'content-length'] == str(len(body)).encode('ascii')
+    assert head_headers[b'content-type'] == b'application/json'
+
+
+def test_head_of_a_post_route_is_not_allowed():
+    status, headers, body = call('HEAD', '/api/predict')
+    assert status == 405 and body == b''
+    assert headers[b'allow'] == b'POST'
@@ -0,0 +1,117 @@
+import gc
+
+from campaign_index import CampaignIndex, campaign_tokens
+
+CAMPAIGN = ("Dear customer, you are selected for a personal loan with zero interest and instant approval "
+            "today. Reply YES or call 9876543210 to confirm your offer before it expires tonight. "
+            "Visit bit.ly/loan123 for details and terms of the offer")
+
+
+class Model:
+    """Stands in for a model object: only its identity matters to the index"""
+
+
+def distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+def test_numbers_and_url_paths_do_not_change_the_fingerprint():
+    index = CampaignIndex()
+    copy = CAMPAIGN.replace('9876543210', '9123456780').replace('loan123', 'xk9Qz')
+    assert campaign_tokens(copy) == campaign_tokens(CAMPAIGN)
+    assert index.fingerprint(copy) == index.fingerprint(CAMPAIGN)
+
+
+def test_near_duplicate_with_one_token_changed_hits():
+    model = Model()
+    index = CampaignIndex(max_distance=3)
+    index.add(index.fingerprint(CAMPAIGN), model, 'spam', confidence=0.99)
+
+    copy = index.fingerprint(CAMPAIGN.replace("Dear", "Hi"))
+    assert 0 < distance(copy, index.fingerprint(CAMPAIGN)) <= 3
+    assert index.lookup(copy, model) == 'spam'
+    assert index.stats()['hits'] == 1
+
+
+def test_lookup_hits_up_to_max_distance_bits():
+    model = Model()
+    index = CampaignIndex(max_distance=3)
+    fingerprint = index.fingerprint(CAMPAIGN)
+    index.add(fingerprint, model, 'spam', confidence=0.99)
+
+    # Flipped bits spread over different blocks of the fingerprint
+    assert index.lookup(fingerprint ^ (1 | 1 << 20 | 1 << 63), model) == 'spam'
+    assert index.lookup(fingerprint ^ (1 | 1 << 20 | 1 << 40 | 1 << 63), model) is None
+
+
+def test_distinct_message_misses():
+    model = Model()
+    index = CampaignIndex()
+    index.add(index.fingerprint(CAMPAIGN), model, 'spam', confidence=0.99)
+    other = index.fingerprint("Hi, are we still meeting at the station tomorrow morning before the train leaves?")
+    assert distance(other, index.fingerprint(CAMPAIGN)) > index.max_distance
+    assert index.lookup(other, model) is None
+    assert index.stats()['misses'] == 1
+
+
+def test_short_messages_and_unconfident_verdicts_are_not_indexed():
+    model = Model()
+    index = CampaignIndex(min_confidence=0.9)
+    assert index.fingerprint("ok see you") is None
+    index.add(index.fingerprint(CAMPAIGN), model, 'spam', confidence=0.6)
+    assert index.stats()['entries'] == 0
+
+
+def test_least_recently_used_entries_are_evicted_at_the_size_cap():
+    model = Model()
+    index = CampaignIndex(max_entries=3)
+    fingerprints = [index.fingerprint(message) for message in (
+        "Your parcel is waiting at the depot, pick it up before Friday evening",
+        "Happy birthday to you, have a wonderful day with the family",
+        "The meeting moved to the second floor conference room after lunch",
+        "Win a brand new phone by answering three quick questions right now",
+        "Please send me the slides from yesterday when you get a chance"
+    )]
+    for fingerprint in fingerprints[:3]:
+        index.add(fingerprint, model, fingerprint, confidence=1.0)
+    # The first becomes the most recently used
+    assert index.lookup(fingerprints[0], model) == fingerprints[0]
+    for fingerprint in fingerprints[3:]:
+        index.add(fingerprint, model, fingerprint, confidence=1.0)
+
+    assert index.stats()['entries'] == 3 and index.stats()['evictions'] == 2
+    assert index.lookup(fingerprints[1], model) is None
+    assert index.lookup(fingerprints[2], model) is None
+    for fingerprint in (fingerprints[0], *fingerprints[3:]):
+        assert index.lookup(fingerprint, model) == fingerprint
+    # Evicted fingerprints are gone from the block tables too
+    assert sum(len(bucket) for table in index._tables for bucket in table.values()) == 3 * len(index._tables)
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('campaign_index.time.monotonic', lambda: now[0])
+    model = Model()
+    index = CampaignIndex(ttl=60)
+    fingerprint = index.fingerprint(CAMPAIGN)
+    index.add(fingerprint, model, 'spam', confidence=0.99)
+    now[0] += 61
+    assert index.lookup(fingerprint, model) is None
+
+
+def test_entries_are_dropped_on_model_change():
+    old = Model()
+    index = CampaignIndex()
+    fingerprint = index.fingerprint(CAMPAIGN)
+    index.add(fingerprint, old, 'spam', confidence=0.99)
+
+    new = Model()
+    assert index.lookup(fingerprint, new) is None
+    assert index.stats()['entries'] == 0 and index.stats()['invalidations'] == 1
+    assert index._tables == [{} for _ in index._tables]
+
+    index.add(fingerprint, new, 'ham', confidence=0.99)
+    del new
+    gc.collect()
+    assert index.lookup(fingerprint, Model()) is None
+    assert index.stats()['invalidations'] == 2
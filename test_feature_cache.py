@@ -0,0 +1,122 @@
+import os
+
+import numpy as np
+import pytest
+
+import feature_cache
+from feature_cache import FeatureCache, dataset_cache_prefix
+from synthetic_corpus import generate_messages
+
+
+@pytest.fixture(scope='module')
+def texts():
+    return generate_messages(3000, seed=5)
+
+
+@pytest.fixture
+def extracted():
+    return []
+
+
+@pytest.fixture
+def cache(tmp_path, extractor, extracted):
+    def extract(texts):
+        extracted.append(len(texts))
+        return extractor.extract_batch(texts)
+
+    return FeatureCache(str(tmp_path / 'corpus'), extractor.feature_columns, extract)
+
+
+def npy_files(cache):
+    directory = os.path.dirname(cache.prefix)
+    return sorted(name for name in os.listdir(directory) if '.npy' in name)
+
+
+def test_same_texts_are_memory_mapped_without_extraction(cache, extracted, texts, extractor):
+    first, state = cache.features(texts[:2000])
+    assert state == 'miss' and extracted == [2000]
+    again, state = cache.features(texts[:2000])
+    assert state == 'hit' and extracted == [2000]
+    assert isinstance(again, np.memmap) and not again.flags.writeable
+    assert np.array_equal(again, extractor.extract_batch(texts[:2000]))
+
+
+def test_appended_rows_are_the_only_ones_extracted(cache, extracted, texts, extractor):
+    cache.features(texts[:2000])
+    grown, state = cache.features(texts)
+    assert state == 'appended' and extracted == [2000, 1000]
+    assert np.array_equal(grown, extractor.extract_batch(texts))
+    # The replaced array is deleted
+    assert npy_files(cache) == [os.path.basename(cache.array_path)]
+
+
+def test_changed_texts_rebuild(cache, extracted, texts, extractor):
+    cache.features(texts[:2000])
+    changed = texts[:2000]
+    changed[10] = "changed message"
+    features, state = cache.features(changed)
+    assert state == 'miss' and extracted == [2000, 2000]
+    assert np.array_equal(features, extractor.extract_batch(changed))
+
+    _, state = cache.features(texts[:1000])
+    assert state == 'miss'
+
+
+def test_another_extractor_version_rebuilds(cache, extracted, texts, extractor):
+    cache.features(texts[:500])
+    other = FeatureCache(cache.prefix, extractor.feature_columns, cache.extract, extractor_version='test')
+    _, state = other.features(texts[:500])
+    assert state == 'miss' and extracted == [500, 500]
+    assert other.array_path != cache.array_path
+
+
+def test_missing_array_rebuilds(cache, extracted, texts):
+    cache.features(texts[:500])
+    os.remove(cache.array_path)
+    _, state = cache.features(texts[:500])
+    assert state == 'miss' and extracted == [500, 500]
+
+
+@pytest.mark.parametrize('rebuild', ['changed', 'appended'])
+def test_crash_before_the_manifest_keeps_the_old_entry(cache, texts, extractor, monkeypatch, rebuild):
+    old = texts[:1000]
+    cache.features(old)
+    new = texts[1000:2000] if rebuild == 'changed' else texts[:2000]
+
+    replace = os.replace
+
+    def crash_on_manifest(source, destination):
+        if destination == cache.manifest_path:
+            raise KeyboardInterrupt
+        replace(source, destination)
+
+    # The new array is in place, the manifest is not
+    monkeypatch.setattr(feature_cache.os, 'replace', crash_on_manifest)
+    with pytest.raises(KeyboardInterrupt):
+        cache.features(new)
+    monkeypatch.setattr(feature_cache.os, 'replace', replace)
+    assert len(npy_files(cache)) == 2
+
+    # The old manifest still describes the old array
+    features, state = cache.features(old)
+    assert state == 'hit'
+    assert np.array_equal(features, extractor.extract_batch(old))
+    assert len(npy_files(cache)) == 2
+
+    features, state = cache.features(new)
+    assert state == ('miss' if rebuild == 'changed' else 'appended')
+    assert np.array_equal(features, extractor.extract_batch(new))
+    # The arrays of the old entry and of the interrupted write are deleted
+    assert npy_files(cache) == [os.path.basename(cache.array_path)]
+
+
+def test_version_1_array_is_replaced(cache, texts):
+    legacy = f"{cache.prefix}.npy"
+    np.save(legacy, np.zeros((3, 17), dtype=np.float32))
+    _, state = cache.features(texts[:100])
+    assert state == 'miss'
+    assert not os.path.exists(legacy)
+
+
+def test_dataset_cache_prefix():
+    assert dataset_cache_prefix('.feature_cache', 'data/sms_spam.csv') == os.path.join('.feature_cache', 'sms_spam')
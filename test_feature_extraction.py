@@ -0,0 +1,251 @@
+import json
+import os
+import re
+
+import numpy as np
+import pytest
+
+from feature_extraction import (
+    BN_AS_TIME_WORDS, CURRENCY_SYMBOLS, CURRENCY_TERMS, DATE_HINT_RE, DATE_RE, KEYWORDS, FeatureTimings,
+    KeywordMatcher, SMSFeatureExtractor, _trie_pattern
+)
+from synthetic_corpus import generate_messages
+
+# Feature vectors computed by the extractor before its patterns were
+# precompiled and merged. A deliberate change of a feature bumps
+# EXTRACTOR_VERSION and regenerates this file.
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), 'testdata', 'feature_golden.json')
+
+# Date, time and currency forms the synthetic corpus does not produce
+EDGE_CASES = [
+    # Dates, Bengali
+    "১৫ জানুয়ারী, ২০২৪ তারিখে অফার শেষ",
+    "১৫ জানুয়ারি ২০২৪",
+    "২১ ফেব্রূয়ারি ২০২৪ তারিখের মধ্যে রিচার্জ করুন",
+    "৫ মে ২০২৪",
+    "মেসেজটি পড়ুন, জুতা কিনুন",
+    "১০ জুন",
+    "জুলাই মাসে নতুন অফার",
+    "অক্টোবর ১২, ২০২৩ থেকে চালু",
+    "গতকাল ৩ মার্চ ছুটি ছিল",
+    "আজ নভেম্বর, ২০২৪",
+    "২০২৪ সালে নতুন সিম",
+    "৫ বছর ধরে গ্রাহক",
+    "শুক্রবার ৫ এপ্রিল মিটিং",
+    "গত সপ্তাহ থেকে নেটওয়ার্ক নেই",
+    "১২ ডিসেম্বর \"বিশেষ দিবস\" ২০২৪",
+    # Dates, Assamese
+    "১৫ জানুৱাৰী ২০২৪ তাৰিখে",
+    "৫ মাৰ্চৰ আগত পৰিশোধ কৰক",
+    "অফাৰ শেষ হ'ব ৩০ ছেপ্টেম্বৰত",
+    "যোৱা ৫ দিনত কোনো সংযোগ নাই",
+    "উৎসৱমুখৰ ছুটিৰ দিনটো উপভোগ কৰক",
+    "আগত এমাহৰ বাবে বিনামূলীয়া",
+    "ডিচেম্বৰ মাহত নতুন অফাৰ",
+    "২০২৪ বৰ্ষৰ শেষত",
+    "আহিবলগীয়া সোমবাৰ অফিচ বন্ধ",
+    "৩ নৱেম্বৰ, ২০২৩ দিনত",
+    # Dates, English and numeric
+    "Offer valid till 15/08/2024",
+    "Due on 3-Jan-25, pay now",
+    "See you on 21st Sept.",
+    "Meeting on March 3, 2024",
+    "MEETING ON 3 MAY 2024",
+    "Born in 1990 year",
+    "Version 1.2.3 released",
+    "Call 98-765-4321 now",
+    "ſep 5, 2024",
+    "Market summary for today",
+    # Times
+    "Reach by 10:30 am",
+    "at 7 pm sharp",
+    "half past 5",
+    "noon meeting",
+    "৭টা বাজে দেখা হবে",
+    "সকাল ৯ টায় আসবেন",
+    "৫ বজাত লগ পাম",
+    "১০:৩০ এএম এ ফোন কৰিব",
+    "রাত ১১টা",
+    "ভোরে ৫ টায়",
+    "৩ ঘণ্টা ২০ মিনিট",
+    "২০ মিনিট পরে",
+    "এতিয়া ৮ বজি গৈছে",
+    "বিকাল বেলা দেখা হবে",
+    # Currency
+    "৫০০ টাকা বোনাস",
+    "১০০০ টকা জিকিছে",
+    "৫০ পয়সা প্রতি মিনিট",
+    "Get Rs.500 cashback",
+    "Pay INR 200 now",
+    "Win $1000 today",
+    "₹99 recharge",
+    "Only 5 euros left",
+    "ধনৰ সম্পদ",
+    "পাইকাৰী মূল্য",
+    # Mixed and odd input
+    "",
+    "   ",
+    "!!!???",
+    "FREE FREE FREE win win",
+    "https://bit.ly/abc ১৫ জানুয়ারী ২০২৪ 🎉",
+    "\ud800 lone surrogate",
+]
+
+
+@pytest.fixture(scope='module')
+def golden():
+    with open(GOLDEN_PATH) as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope='module')
+def golden_texts():
+    return generate_messages(400, seed=21) + EDGE_CASES
+
+
+def assert_same_as_golden(extract, golden):
+    for entry in golden:
+        features = extract(entry['text'])
+        # Exactly equal, and reported per message
+        assert np.array_equal(features, np.array([entry['features']])), entry['text']
+
+
+def test_golden_covers_the_corpus_and_edge_cases(golden, golden_texts):
+    assert [entry['text'] for entry in golden] == golden_texts
+
+
+def test_features_match_the_golden_vectors(extractor, golden):
+    assert_same_as_golden(extractor.extract_features, golden)
+
+
+def test_timed_features_match_the_golden_vectors(golden):
+    extractor = SMSFeatureExtractor()
+    extractor.enable_timing()
+    assert_same_as_golden(extractor.extract_features, golden)
+
+
+def test_batch_matches_the_golden_vectors(extractor, golden):
+    batch = extractor.extract_batch([entry['text'] for entry in golden])
+    expected = np.array([entry['features'] for entry in golden], dtype=np.float32)
+    assert np.array_equal(batch, expected)
+
+
+def test_date_hint_is_found_in_every_date(golden_texts):
+    dates = [text for text in golden_texts if DATE_RE.search(text)]
+    assert len(dates) > 30
+    for text in dates:
+        assert DATE_HINT_RE.search(text.lower()), text
+
+
+def test_timed_and_untimed_values_are_identical(extractor, golden_texts):
+    timed = SMSFeatureExtractor()
+    timings = timed.enable_timing()
+    for text in golden_texts:
+        assert timed.feature_values(text) == extractor.feature_values(text), text
+    assert timings.messages == len(golden_texts)
+
+
+@pytest.mark.parametrize('length, bucket', [(0, '0-40'), (40, '0-40'), (41, '41-160'), (480, '161-480'), (481, '481+')])
+def test_length_buckets(length, bucket):
+    assert FeatureTimings.length_bucket('a' * length) == bucket
+
+
+def test_timings_are_split_by_length_and_script():
+    extractor = SMSFeatureExtractor()
+    timings = extractor.enable_timing()
+    extractor.feature_values("Call 9876543210 now")
+    extractor.feature_values("আপনার অ্যাকাউন্টে ৫০০ টাকা বোনাস")
+    extractor.feature_values("x" * 200)
+
+    snapshot = timings.snapshot()
+    assert snapshot['messages'] == 3
+    assert set(snapshot['features']) == {
+        'extract_urls', 'extract_phone_numbers', 'extract_special_chars', 'extract_all_caps_words',
+        'extract_mixed_language', 'extract_currency', 'extract_date', 'extract_time', 'extract_id_codes',
+        'extract_emojis', 'has_repeated_words', 'has_consecutive_special_chars', 'detect_subscriber_codes',
+        'calculate_avg_word_length', 'count_chars_without_spaces'
+    }
+    date = snapshot['features']['extract_date']
+    assert set(date) == {'latin/0-40', 'bengali/0-40', 'latin/161-480'}
+    for stats in date.values():
+        assert stats['count'] == 1 and sum(stats['histogram']) == 1
+        assert len(stats['histogram']) == len(FeatureTimings.BUCKET_BOUNDS_US) + 1
+
+
+def test_snapshot_after_reset_is_empty():
+    extractor = SMSFeatureExtractor()
+    timings = extractor.enable_timing()
+    extractor.feature_values("Call 9876543210 now")
+    timings.reset()
+    snapshot = timings.snapshot()
+    assert snapshot['messages'] == 0 and snapshot['features'] == {}
+
+    extractor.disable_timing()
+    extractor.feature_values("Call 9876543210 now")
+    assert timings.snapshot()['messages'] == 0
+
+
+def naive_hits(vocabularies, text):
+    """Spans of every keyword occurrence, found by trying each keyword at each position"""
+    found = {}
+    for feature, keywords in vocabularies.items():
+        spans = sorted({(start, start + len(keyword)) for keyword in keywords
+                        for start in range(len(text)) if text.startswith(keyword, start)})
+        if spans:
+            found[feature] = spans
+    return found
+
+
+def sorted_hits(matcher, text):
+    return {feature: sorted(set(spans)) for feature, spans in matcher.hits(text).items()}
+
+
+def test_trie_pattern_prefers_the_longest_keyword():
+    pattern = re.compile(_trie_pattern(['ab', 'abcd', 'b']))
+    assert pattern.fullmatch('ab') and pattern.fullmatch('abcd') and pattern.fullmatch('b')
+    assert not pattern.fullmatch('abc')
+    assert pattern.match('abcde').group() == 'abcd'
+    assert pattern.match('abce').group() == 'ab'
+
+
+def test_keywords_that_are_prefixes_of_each_other_are_all_reported():
+    matcher = KeywordMatcher({'short': ['ab'], 'long': ['abcd']})
+    assert sorted_hits(matcher, 'xabcdx') == {'short': [(1, 3)], 'long': [(1, 5)]}
+    assert sorted_hits(matcher, 'abc') == {'short': [(0, 2)]}
+
+
+def test_overlapping_keywords_are_all_reported():
+    matcher = KeywordMatcher({'a': ['aba'], 'b': ['bab']})
+    # Each hit resumes the scan one character after its start
+    assert sorted_hits(matcher, 'ababa') == {'a': [(0, 3), (2, 5)], 'b': [(1, 4)]}
+
+
+def test_one_keyword_in_several_vocabularies():
+    matcher = KeywordMatcher({'one': ['টা', 'টাকা'], 'two': ['টা']})
+    assert sorted_hits(matcher, '৫০০ টাকা') == {'one': [(4, 6), (4, 8)], 'two': [(4, 6)]}
+
+
+VOCABULARIES = {'currency': CURRENCY_SYMBOLS + CURRENCY_TERMS, 'time_word': BN_AS_TIME_WORDS}
+
+
+def test_keyword_hits_match_a_naive_scan(golden_texts):
+    for text in golden_texts + ['টাকাটা টকা$€', 'বাজেবাজি', 'পাইপইচা পোইসা']:
+        assert sorted_hits(KEYWORDS, text) == naive_hits(VOCABULARIES, text), text
+        for feature, keywords in VOCABULARIES.items():
+            assert (feature in KEYWORDS.hits(text)) == any(keyword in text for keyword in keywords), text
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("৭টা", 1),
+    ("৭ টা", 1),
+    ("১০  বাজে", 1),
+    ("৫\nমিনিট", 1),
+    ("টা ৭", 0),
+    ("৭x টা", 0),
+    ("7 টা", 0),
+])
+def test_time_word_counts_after_a_bengali_number(extractor, text, expected):
+    # The former [০-৯]{1,2}\s*(?:word) patterns
+    legacy = re.search(r'[০-৯]{1,2}\s*(?:' + '|'.join(BN_AS_TIME_WORDS) + ')', text)
+    assert bool(legacy) == bool(expected)
+    assert extractor.extract_time(text) == expected
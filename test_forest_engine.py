@@ -0,0 +1,147 @@
+import numpy as np
+import pytest
+
+from conftest import fit_forest
+from forest_engine import CompiledForest, DecisionTable, probe_inputs
+
+
+def tie_rows(compiled):
+    """Rows putting one feature exactly on, just below and just above each of its split thresholds"""
+    split = np.isfinite(compiled.threshold)
+    rows = []
+    for feature, threshold in sorted(set(zip(compiled.feature[split], compiled.threshold[split]))):
+        value = np.float32(threshold)
+        for candidate in (value, np.nextafter(value, np.float32(-np.inf)), np.nextafter(value, np.float32(np.inf))):
+            row = np.zeros(compiled.n_features_in_, dtype=np.float32)
+            row[feature] = candidate
+            rows.append(row)
+    return np.array(rows)
+
+
+def assert_same_as_sklearn(scorer, model, X):
+    expected = model.predict_proba(X)
+    proba = scorer.predict_proba(X)
+    assert proba.dtype == expected.dtype
+    # Bit-equal, not approximately equal
+    assert np.array_equal(proba, expected)
+    assert np.array_equal(scorer.predict(X), model.predict(X))
+
+
+@pytest.fixture(scope='module')
+def compiled(trained_model):
+    return CompiledForest.from_sklearn(trained_model)
+
+
+def test_compiled_forest_matches_sklearn_on_the_corpus(compiled, trained_model, corpus_features):
+    assert_same_as_sklearn(compiled, trained_model, corpus_features)
+
+
+def test_compiled_forest_matches_sklearn_on_probe_rows(compiled, trained_model):
+    assert_same_as_sklearn(compiled, trained_model, probe_inputs(compiled, n_samples=5000))
+
+
+def test_compiled_forest_matches_sklearn_on_threshold_ties(compiled, trained_model):
+    X = tie_rows(compiled)
+    assert len(X) > 0
+    assert_same_as_sklearn(compiled, trained_model, X)
+
+
+def test_compiled_forest_matches_sklearn_on_single_rows(compiled, trained_model, corpus_features):
+    for row in corpus_features[:50]:
+        assert_same_as_sklearn(compiled, trained_model, row[np.newaxis])
+
+
+def test_compiled_forest_keeps_integer_labels(extractor, corpus_features, corpus_labels):
+    model = fit_forest(extractor, corpus_features, (corpus_labels == 'spam').astype(int), n_estimators=5)
+    compiled = CompiledForest.from_sklearn(model)
+    assert_same_as_sklearn(compiled, model, corpus_features)
+    assert compiled.predict(corpus_features[:1]).dtype == model.classes_.dtype
+
+
+@pytest.mark.filterwarnings('ignore:overflow encountered:RuntimeWarning')
+@pytest.mark.parametrize('value', [np.nan, np.inf, -np.inf, 1e39])
+def test_compiled_forest_refuses_inputs_sklearn_refuses(compiled, trained_model, corpus_features, value):
+    X = corpus_features[:3].astype(np.float64)
+    X[1, 0] = value
+    with pytest.raises(ValueError):
+        trained_model.predict_proba(X)
+    with pytest.raises(ValueError, match="NaN or infinity"):
+        compiled.predict_proba(X)
+
+
+def test_compiled_forest_refuses_another_number_of_columns(compiled, corpus_features):
+    with pytest.raises(ValueError, match="features"):
+        compiled.predict_proba(corpus_features[:, :-1])
+    with pytest.raises(ValueError, match="2D"):
+        compiled.predict_proba(corpus_features[0])
+
+
+def test_from_sklearn_refuses_other_models(corpus_features, corpus_labels):
+    from sklearn.linear_model import LogisticRegression
+
+    model = LogisticRegression(max_iter=200).fit(corpus_features, corpus_labels)
+    with pytest.raises(ValueError, match="Cannot compile"):
+        CompiledForest.from_sklearn(model)
+
+
+def test_verify_counts_differing_rows(compiled, trained_model, corpus_features):
+    assert compiled.verify(trained_model, corpus_features) == 0
+
+    altered = CompiledForest.from_sklearn(trained_model)
+    altered.leaf_proba = altered.leaf_proba[:, ::-1].copy()
+    assert altered.verify(trained_model, corpus_features) > 0
+
+
+@pytest.fixture
+def table(compiled):
+    return DecisionTable(compiled)
+
+
+def test_decision_table_matches_sklearn_on_the_corpus(table, trained_model, corpus_features):
+    # Once filling the table, once answering from it
+    assert_same_as_sklearn(table, trained_model, corpus_features)
+    assert table.stats()['misses'] > 0
+    hits = table.stats()['hits']
+    assert_same_as_sklearn(table, trained_model, corpus_features)
+    assert table.stats()['hits'] > hits
+
+
+def test_decision_table_matches_sklearn_on_probe_rows(table, trained_model, compiled):
+    X = probe_inputs(compiled, n_samples=5000)
+    assert_same_as_sklearn(table, trained_model, X)
+    assert_same_as_sklearn(table, trained_model, X[::-1])
+
+
+def test_decision_table_matches_sklearn_on_threshold_ties(table, trained_model, compiled):
+    X = tie_rows(compiled)
+    assert_same_as_sklearn(table, trained_model, X)
+    assert_same_as_sklearn(table, trained_model, X)
+
+
+def test_decision_table_bins_ties_with_the_values_below(table, compiled):
+    split = np.isfinite(compiled.threshold)
+    feature = int(compiled.feature[split][0])
+    threshold = np.float32(compiled.threshold[split][0])
+    rows = np.zeros((3, compiled.n_features_in_), dtype=np.float32)
+    rows[:, feature] = [np.nextafter(threshold, np.float32(-np.inf)), threshold, np.nextafter(threshold, np.float32(np.inf))]
+    bins = table.bin(rows)[:, feature]
+    goes_left = rows[:, feature] <= compiled.threshold[split][0]
+    # Rows going the same way at this split share a bin
+    assert (bins[0] == bins[1]) == (goes_left[0] == goes_left[1])
+    assert (bins[1] == bins[2]) == (goes_left[1] == goes_left[2])
+
+
+def test_decision_table_refuses_nan_of_a_known_region(table, corpus_features):
+    table.predict_proba(corpus_features)
+    X = corpus_features[:1].copy()
+    X[0, 0] = np.nan
+    with pytest.raises(ValueError, match="NaN or infinity"):
+        table.predict_proba(X)
+
+
+def test_decision_table_stores_at_most_max_entries(compiled, trained_model, corpus_features):
+    table = DecisionTable(compiled, max_entries=3)
+    assert_same_as_sklearn(table, trained_model, corpus_features)
+    assert table.stats()['entries'] == 3
+    table.clear()
+    assert table.stats()['entries'] == 0
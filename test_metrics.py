@@ -0,0 +1,88 @@
+import pytest
+from prometheus_client.parser import text_string_to_metric_families
+
+import app as flask_app
+import metrics
+from model_reload import ModelVersion
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.delenv('PROMETHEUS_MULTIPROC_DIR', raising=False)
+    flask_app.prediction_cache.clear()
+    return flask_app.app.test_client()
+
+
+def scrape(client):
+    """Samples of /metrics as {(name, sorted labels): value}"""
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(response.get_data(as_text=True))
+        for sample in family.samples
+    }
+
+
+def value(samples, name, **labels):
+    return samples.get((name, tuple(sorted(labels.items()))), 0)
+
+
+def test_scored_request_is_counted(client):
+    before = scrape(client)
+    message = "Hi, are we still meeting at 5:30 tomorrow?"
+    assert client.post('/api/predict', json={'message': message}).status_code == 200
+    after = scrape(client)
+
+    route = {'route': '/api/predict'}
+    assert value(after, 'sms_requests_total', method='POST', status='200', **route) == \
+        value(before, 'sms_requests_total', method='POST', status='200', **route) + 1
+    for name in ('sms_request_duration_seconds_count', 'sms_request_size_bytes_count'):
+        assert value(after, name, **route) == value(before, name, **route) + 1
+    assert value(after, 'sms_request_duration_seconds_bucket', le='+Inf', **route) == \
+        value(after, 'sms_request_duration_seconds_count', **route)
+    for stage in ('parse', 'extraction', 'inference', 'serialization'):
+        assert value(after, 'sms_stage_duration_seconds_count', stage=stage) == \
+            value(before, 'sms_stage_duration_seconds_count', stage=stage) + 1
+    assert value(after, 'sms_message_length_chars_sum') == value(before, 'sms_message_length_chars_sum') + len(message)
+    assert value(after, 'sms_message_length_chars_bucket', le='40.0') == \
+        value(before, 'sms_message_length_chars_bucket', le='40.0')
+    assert value(after, 'sms_message_length_chars_bucket', le='80.0') == \
+        value(before, 'sms_message_length_chars_bucket', le='80.0') + 1
+
+
+def test_error_responses_are_counted_by_type(client):
+    before = scrape(client)
+    assert client.post('/api/predict', json={'text': 'no message field'}).status_code == 400
+    assert client.get('/no/such/route').status_code == 404
+    after = scrape(client)
+
+    assert value(after, 'sms_errors_total', route='/api/predict', type='http_400') == \
+        value(before, 'sms_errors_total', route='/api/predict', type='http_400') + 1
+    assert value(after, 'sms_requests_total', route='unmatched', method='GET', status='404') == \
+        value(before, 'sms_requests_total', route='unmatched', method='GET', status='404') + 1
+
+
+def test_model_version_is_exported_only_by_serving_processes(client, trained_model, monkeypatch):
+    monkeypatch.setattr(flask_app, '_serving_process', False)
+    monkeypatch.setattr(flask_app.model_watcher, 'start', lambda: None)
+    metrics.MODEL_INFO.clear()
+
+    # What a gunicorn master preloading the app reports
+    flask_app.activate_model(flask_app.serving)
+    assert not [key for key in scrape(client) if key[0] == 'sms_model_info']
+
+    flask_app.init_serving_process()
+    version = flask_app.serving.version
+    assert value(scrape(client), 'sms_model_info', version=version) == 1
+
+    # A reloaded model takes over the gauge
+    monkeypatch.setattr(flask_app, 'serving', flask_app.serving)
+    monkeypatch.setattr(flask_app, 'model', flask_app.model)
+    monkeypatch.setattr(flask_app, 'forest', flask_app.forest)
+    flask_app.activate_model(ModelVersion(trained_model, None, 'reloaded', 'reloaded.joblib'))
+    samples = scrape(client)
+    assert value(samples, 'sms_model_info', version='reloaded') == 1
+    assert value(samples, 'sms_model_info', version=version) == 0
+    metrics.MODEL_INFO.clear()
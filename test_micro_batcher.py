@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+from micro_batcher import MicroBatcher
+
+
+def test_concurrent_messages_share_a_batch():
+    calls = []
+
+    def score_batch(messages):
+        calls.append(list(messages))
+        return [message.upper() for message in messages]
+
+    batcher = MicroBatcher(score_batch, max_batch_size=4, max_wait=0.05)
+    results = {}
+    threads = [threading.Thread(target=lambda m=m: results.update({m: batcher.submit(m)})) for m in 'abcd']
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == {'a': 'A', 'b': 'B', 'c': 'C', 'd': 'D'}
+    assert sum(len(batch) for batch in calls) == 4
+    assert batcher.stats()['batch_size']['count'] == len(calls)
+
+
+def test_exception_of_score_batch_reaches_every_caller():
+    def score_batch(messages):
+        raise ValueError("bad batch")
+
+    batcher = MicroBatcher(score_batch, max_wait=0)
+    with pytest.raises(ValueError, match="bad batch"):
+        batcher.submit("a")
+    # The thread keeps serving
+    with pytest.raises(ValueError):
+        batcher.submit("b")
+
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+def test_base_exception_fails_the_batch_and_restarts_the_thread():
+    stop = [True]
+
+    def score_batch(messages):
+        if stop:
+            stop.pop()
+            raise SystemExit("stopped")
+        return messages
+
+    batcher = MicroBatcher(score_batch, max_wait=0)
+    batcher._ensure_worker()
+    first = batcher._worker
+    with pytest.raises(RuntimeError, match="Micro-batching stopped"):
+        batcher.submit("a")
+    first.join(5)
+    assert not first.is_alive()
+    assert batcher.submit("b") == "b"
+
+
+def test_missing_results_do_not_leave_callers_waiting():
+    batcher = MicroBatcher(lambda messages: [], max_wait=0)
+    with pytest.raises(RuntimeError, match="1 messages scored with 0 results"):
+        batcher.submit("a")
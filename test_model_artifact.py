@@ -0,0 +1,88 @@
+import json
+
+import numpy as np
+import pytest
+
+from conftest import fit_forest
+from feature_extraction import EXTRACTOR_VERSION
+from forest_engine import CompiledForest, probe_inputs
+from model_artifact import export_artifact, load_artifact
+
+
+def round_trip(model, extractor, tmp_path, name='artifact'):
+    manifest_path = export_artifact(model, str(tmp_path / name), extractor.feature_columns, EXTRACTOR_VERSION)
+    return manifest_path, load_artifact(manifest_path, extractor.feature_columns, EXTRACTOR_VERSION)
+
+
+def assert_same_predictions(forest, model, X):
+    assert np.array_equal(forest.predict_proba(X), model.predict_proba(X))
+    predictions = forest.predict(X)
+    assert np.array_equal(predictions, model.predict(X))
+    assert predictions.dtype == model.predict(X).dtype
+
+
+def test_object_classes_stay_object(extractor, corpus_features, corpus_labels, tmp_path):
+    # Labels read with pandas, as in train_model.py
+    model = fit_forest(extractor, corpus_features, corpus_labels.astype(object), n_estimators=5)
+    assert model.classes_.dtype == object
+    _, forest = round_trip(model, extractor, tmp_path)
+    assert forest.classes_.dtype == object
+    assert_same_predictions(forest, model, corpus_features)
+
+
+def test_round_trip_reproduces_the_model(trained_model, extractor, corpus_features, tmp_path):
+    _, forest = round_trip(trained_model, extractor, tmp_path)
+    assert isinstance(forest, CompiledForest)
+    assert_same_predictions(forest, trained_model, corpus_features)
+    assert_same_predictions(forest, trained_model, probe_inputs(forest, n_samples=5000))
+    assert list(forest.classes_) == list(trained_model.classes_)
+    assert forest.classes_.dtype == trained_model.classes_.dtype
+    assert list(forest.feature_names_in_) == extractor.feature_columns
+
+
+def test_integer_classes_keep_their_dtype(extractor, corpus_features, corpus_labels, tmp_path):
+    model = fit_forest(extractor, corpus_features, (corpus_labels == 'spam').astype(np.int64), n_estimators=5)
+    manifest_path, forest = round_trip(model, extractor, tmp_path)
+
+    assert forest.classes_.dtype == model.classes_.dtype
+    assert list(forest.classes_) == list(model.classes_) == [0, 1]
+    assert_same_predictions(forest, model, corpus_features)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    assert manifest['classes'] == [0, 1] and np.dtype(manifest['classes_dtype']) == np.int64
+
+
+def test_manifest_without_classes_dtype_loads_string_classes(trained_model, extractor, tmp_path):
+    manifest_path, _ = round_trip(trained_model, extractor, tmp_path)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    del manifest['classes_dtype']
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+
+    forest = load_artifact(manifest_path, extractor.feature_columns, EXTRACTOR_VERSION)
+    assert list(forest.classes_) == ['ham', 'spam'] and forest.classes_.dtype == object
+
+
+def test_corrupt_arrays_are_refused(trained_model, extractor, tmp_path):
+    manifest_path, _ = round_trip(trained_model, extractor, tmp_path)
+    arrays_path = tmp_path / 'artifact.npz'
+    data = bytearray(arrays_path.read_bytes())
+    data[len(data) // 2] ^= 0xFF
+    arrays_path.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match="Checksum"):
+        load_artifact(manifest_path, extractor.feature_columns, EXTRACTOR_VERSION)
+
+
+def test_other_schema_or_extractor_version_is_refused(trained_model, extractor, tmp_path):
+    manifest_path, _ = round_trip(trained_model, extractor, tmp_path)
+    with pytest.raises(ValueError, match="feature schema"):
+        load_artifact(manifest_path, list(reversed(extractor.feature_columns)), EXTRACTOR_VERSION)
+    with pytest.raises(ValueError, match="extractor version"):
+        load_artifact(manifest_path, extractor.feature_columns, 'other')
+
+
+def test_model_fitted_with_other_feature_names_is_not_exported(trained_model, extractor, tmp_path):
+    with pytest.raises(ValueError, match="do not match"):
+        export_artifact(trained_model, str(tmp_path / 'artifact'), list(reversed(extractor.feature_columns)),
+                        EXTRACTOR_VERSION)
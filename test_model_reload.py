@@ -0,0 +1,148 @@
+import os
+import time
+
+import numpy as np
+import pytest
+from joblib import dump
+from sklearn.ensemble import RandomForestClassifier
+
+import app as flask_app
+from conftest import fit_forest
+from model_reload import ModelFileWatcher, ModelVersion, file_version
+
+
+@pytest.fixture
+def active_model(trained_model, monkeypatch):
+    """Serve trained_model for the test, whatever app.py loaded at import"""
+    version = ModelVersion(trained_model, None, 'active', 'active.joblib')
+    monkeypatch.setattr(flask_app, 'serving', version)
+    monkeypatch.setattr(flask_app, 'model', trained_model)
+    monkeypatch.setattr(flask_app, 'forest', None)
+    monkeypatch.setattr(flask_app, 'reload_status', {'state': 'idle'})
+    return version
+
+
+def dumped(model, tmp_path, name='model.joblib'):
+    path = str(tmp_path / name)
+    dump(model, path)
+    return path
+
+
+def wait_for_reload(timeout=30):
+    deadline = time.time() + timeout
+    while flask_app.reload_status['state'] in ('idle', 'loading') and time.time() < deadline:
+        time.sleep(0.01)
+    return flask_app.reload_status
+
+
+def test_model_with_another_feature_count_is_refused(active_model, corpus_features, corpus_labels, tmp_path):
+    model = RandomForestClassifier(n_estimators=3, random_state=0).fit(corpus_features[:, :5], corpus_labels)
+    with pytest.raises(ValueError, match="expects 5 features"):
+        flask_app.load_model_version(dumped(model, tmp_path))
+
+
+def test_model_with_other_feature_names_is_refused(active_model, extractor, corpus_features, corpus_labels, tmp_path):
+    import pandas as pd
+
+    columns = list(reversed(extractor.feature_columns))
+    model = RandomForestClassifier(n_estimators=3, random_state=0).fit(
+        pd.DataFrame(corpus_features, columns=columns), corpus_labels)
+    with pytest.raises(ValueError, match="do not match"):
+        flask_app.load_model_version(dumped(model, tmp_path))
+
+
+def test_model_with_other_classes_is_refused(active_model, extractor, corpus_features, corpus_labels, tmp_path):
+    model = fit_forest(extractor, corpus_features, (corpus_labels == 'spam').astype(int), n_estimators=3)
+    with pytest.raises(ValueError, match="classes"):
+        flask_app.load_model_version(dumped(model, tmp_path))
+
+
+def test_object_without_predict_proba_is_refused(active_model, tmp_path):
+    with pytest.raises(ValueError, match="not a fitted probabilistic classifier"):
+        flask_app.load_model_version(dumped({'model': None}, tmp_path))
+
+
+def test_failed_reload_keeps_the_active_model(active_model, corpus_features, corpus_labels, tmp_path, monkeypatch):
+    model = RandomForestClassifier(n_estimators=3, random_state=0).fit(corpus_features[:, :5], corpus_labels)
+    monkeypatch.setattr(flask_app, 'MODEL_PATH', dumped(model, tmp_path))
+
+    assert flask_app.reload_model()
+    status = wait_for_reload()
+    assert status['state'] == 'failed' and 'features' in status['error']
+    assert flask_app.serving is active_model
+
+
+def test_valid_model_is_swapped_in(active_model, extractor, corpus_features, corpus_labels, tmp_path, monkeypatch):
+    replacement = fit_forest(extractor, corpus_features, corpus_labels, n_estimators=7)
+    path = dumped(replacement, tmp_path)
+    monkeypatch.setattr(flask_app, 'MODEL_PATH', path)
+
+    assert flask_app.reload_model()
+    status = wait_for_reload()
+    assert status['state'] == 'reloaded'
+    assert flask_app.serving.version == file_version(path) == status['version']
+    assert flask_app.model.n_estimators == 7
+    # Scored by the new model from now on, bit-equal to sklearn
+    proba = flask_app.serving.scorer.predict_proba(corpus_features)
+    assert np.array_equal(proba, replacement.predict_proba(corpus_features))
+
+
+def test_watcher_reports_a_replaced_file(tmp_path):
+    path = tmp_path / 'model.joblib'
+    path.write_bytes(b'first')
+    changes = []
+    watcher = ModelFileWatcher(str(path), 0.01, lambda: changes.append(1))
+
+    # Replaced after the model was loaded but before the watcher started
+    replacement = tmp_path / 'model.joblib.tmp'
+    replacement.write_bytes(b'second version')
+    os.replace(replacement, path)
+    watcher.start()
+
+    deadline = time.time() + 5
+    while not changes and time.time() < deadline:
+        time.sleep(0.01)
+    assert changes == [1]
+    time.sleep(0.05)
+    assert changes == [1]
+
+
+def test_watcher_does_not_run_until_started_nor_in_forked_children(tmp_path):
+    path = tmp_path / 'model.joblib'
+    path.write_bytes(b'model')
+    watcher = ModelFileWatcher(str(path), 0.01, lambda: None)
+    assert not watcher.running
+
+    watcher.start()
+    assert watcher.running
+    # What a forked child sees: no thread, and none started for it
+    watcher._after_fork()
+    assert not watcher.running
+
+    disabled = ModelFileWatcher(str(path), 0, lambda: None)
+    disabled.start()
+    assert not disabled.running
+
+
+@pytest.mark.parametrize('headers, status', [
+    ({}, 403),
+    ({'X-Reload-Token': 'wrong'}, 403),
+    ({'X-Reload-Token': 'secre'}, 403),
+    ({'X-Reload-Token': 'sécret'}, 403),
+    ({'X-Reload-Token': 'secret'}, 202),
+])
+def test_reload_endpoint_checks_the_token(active_model, trained_model, tmp_path, monkeypatch, headers, status):
+    monkeypatch.setattr(flask_app, 'MODEL_RELOAD_TOKEN', 'secret')
+    monkeypatch.setattr(flask_app, 'MODEL_PATH', dumped(trained_model, tmp_path))
+    response = flask_app.app.test_client().post('/api/reload_model', headers=headers)
+    assert response.status_code == status
+    if status == 202:
+        assert wait_for_reload()['state'] == 'reloaded'
+    else:
+        assert flask_app.reload_status == {'state': 'idle'}
+
+
+def test_reload_endpoint_is_off_without_a_token(monkeypatch):
+    monkeypatch.setattr(flask_app, 'MODEL_RELOAD_TOKEN', '')
+    response = flask_app.app.test_client().post('/api/reload_model', headers={'X-Reload-Token': ''})
+    assert response.status_code == 404
@@ -0,0 +1,96 @@
+import gc
+
+from prediction_cache import PredictionCache
+
+
+class Model:
+    """Stands in for a model object: only its identity matters to the cache"""
+
+
+def test_hit_after_put():
+    model = Model()
+    cache = PredictionCache(max_entries=10)
+    assert cache.get("hello", model) is None
+    cache.put("hello", model, {'prediction': 'ham'})
+    assert cache.get("hello", model) == {'prediction': 'ham'}
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_least_recently_used_entry_is_evicted_at_capacity():
+    model = Model()
+    cache = PredictionCache(max_entries=2)
+    cache.put("a", model, 1)
+    cache.put("b", model, 2)
+    # "a" becomes the most recently used
+    assert cache.get("a", model) == 1
+    cache.put("c", model, 3)
+
+    assert cache.get("b", model) is None
+    assert cache.get("a", model) == 1 and cache.get("c", model) == 3
+    assert cache.stats()['entries'] == 2 and cache.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('prediction_cache.time.monotonic', lambda: now[0])
+    model = Model()
+    cache = PredictionCache(ttl=60)
+    cache.put("a", model, 1)
+    now[0] += 59
+    assert cache.get("a", model) == 1
+    now[0] += 2
+    assert cache.get("a", model) is None
+    assert cache.stats()['expirations'] == 1 and cache.stats()['entries'] == 0
+
+
+def test_zero_ttl_keeps_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('prediction_cache.time.monotonic', lambda: now[0])
+    model = Model()
+    cache = PredictionCache(ttl=0)
+    cache.put("a", model, 1)
+    now[0] += 10 ** 9
+    assert cache.get("a", model) == 1
+
+
+def test_another_model_clears_the_cache():
+    old, new = Model(), Model()
+    cache = PredictionCache()
+    cache.put("a", old, 1)
+    assert cache.get("a", new) is None
+    assert cache.stats()['invalidations'] == 1
+    # Back to the old model: its entries are gone for good
+    assert cache.get("a", old) is None
+
+
+def test_replaced_model_is_not_kept_alive():
+    model = Model()
+    cache = PredictionCache()
+    cache.put("a", model, 1)
+    reference = cache._model_ref
+    del model
+    gc.collect()
+    assert reference() is None
+
+    # A new model, even at the address of the old one, does not see its entries
+    assert cache.get("a", Model()) is None
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_lone_surrogates_have_their_own_keys():
+    model = Model()
+    cache = PredictionCache()
+    cache.put("\ud800", model, 'high')
+    cache.put("\udc00", model, 'low')
+    cache.put("?", model, 'plain')
+    assert cache.get("\ud800", model) == 'high'
+    assert cache.get("\udc00", model) == 'low'
+    assert len({PredictionCache.key(message) for message in ("\ud800", "\udc00", "?", "𐀀")}) == 4
+
+
+def test_disabled_cache_stores_nothing():
+    model = Model()
+    cache = PredictionCache(max_entries=0)
+    cache.put("a", model, 1)
+    assert cache.get("a", model) is None
+    assert cache.stats()['entries'] == 0 and cache.stats()['misses'] == 0
@@ -0,0 +1,175 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+
+import pytest
+
+from request_log import JsonFormatter, RequestLog, parse_sample_rates
+
+
+def read_lines(log, stream):
+    log.close()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def make_log(**options):
+    stream = io.StringIO()
+    return RequestLog(stream=stream, **{'default_rate': 1.0, 'hash_key': 'test-key', **options}), stream
+
+
+def test_parse_sample_rates():
+    assert parse_sample_rates('/api/predict=0.01, /health=0,') == {'/api/predict': 0.01, '/health': 0.0}
+    with pytest.raises(ValueError, match="Invalid sample rate"):
+        parse_sample_rates('/api/predict=2')
+    with pytest.raises(ValueError, match="Invalid sample rate"):
+        parse_sample_rates('0.5')
+
+
+def test_default_rate_samples_one_percent():
+    log = RequestLog(hash_key='test-key', stream=io.StringIO())
+    assert log.sample_rate('/api/predict') == 0.01
+
+
+def test_routes_are_sampled_at_their_rates():
+    log, stream = make_log(sample_rates={'/health': 0.0, '/api/predict': 0.5})
+    for _ in range(2000):
+        log.log('/api/predict')
+    assert not log.log('/health')
+    assert log.log('/predict_simple')
+
+    lines = read_lines(log, stream)
+    stats = log.stats()
+    assert stats['logged'] == len(lines)
+    assert stats['logged'] + stats['sampled_out'] == 2002
+    predict = [line for line in lines if line['route'] == '/api/predict']
+    assert 800 < len(predict) < 1200
+    assert all(line['sample_rate'] == 0.5 for line in predict)
+
+
+def test_message_is_hashed_with_the_key():
+    log, stream = make_log()
+    log.log('/api/predict', message="Your code is 123456", prediction='ham')
+    [line] = read_lines(log, stream)
+
+    assert "123456" not in json.dumps(line)
+    assert line['message_length'] == 19
+    assert line['prediction'] == 'ham'
+    unkeyed = hashlib.blake2b(b"Your code is 123456", digest_size=8).hexdigest()
+    keyed = hashlib.blake2b(b"Your code is 123456", digest_size=8, key=b'test-key').hexdigest()
+    assert line['message_hash'] == keyed != unkeyed
+
+    # A lone surrogate, as sent in a JSON body like "\ud800"
+    log, stream = make_log()
+    log.log('/api/predict', message="code \ud800")
+    [line] = read_lines(log, stream)
+    assert line['message_length'] == 6
+    assert line['message_hash'] == hashlib.blake2b("code \ud800".encode('utf-8', 'surrogatepass'),
+                                                   digest_size=8, key=b'test-key').hexdigest()
+
+
+def test_message_is_truncated_or_omitted():
+    log, stream = make_log(message_mode='truncate', message_chars=4)
+    log.log('/api/predict', message="Your code is 123456")
+    assert read_lines(log, stream)[0]['message'] == "Your"
+
+    log, stream = make_log(message_mode='truncate', message_chars=4)
+    log.log('/api/predict', message="ab\ud800cd")
+    assert read_lines(log, stream)[0]['message'] == "ab?c"
+
+    log, stream = make_log(message_mode='omit')
+    log.log('/api/predict', message="Your code is 123456")
+    [line] = read_lines(log, stream)
+    assert 'message' not in line and 'message_hash' not in line
+    assert line['message_length'] == 19
+
+
+def test_without_a_key_hashes_use_a_random_key(caplog):
+    with caplog.at_level(logging.WARNING, logger='request_log'):
+        first = JsonFormatter(hash_key='')
+    assert "not match across restarts" in caplog.text
+    second = JsonFormatter(hash_key=None)
+    assert first.random_key and second.random_key
+    assert first.hash_key != second.hash_key
+
+    record = logging.LogRecord('request_log', logging.INFO, '', 0, 'request', None, None)
+    record.fields = {'message': "Your code is 123456"}
+    hashes = {json.loads(formatter.format(record))['message_hash'] for formatter in (first, second)}
+    assert len(hashes) == 2
+    assert hashlib.blake2b(b"Your code is 123456", digest_size=8).hexdigest() not in hashes
+
+
+def test_configured_key_is_stable_and_bounded():
+    assert not JsonFormatter(hash_key='k').random_key
+    assert JsonFormatter(hash_key='k').hash_key == JsonFormatter(hash_key='k').hash_key
+    with pytest.raises(ValueError, match="at most 64"):
+        JsonFormatter(hash_key='k' * 65)
+    with pytest.raises(ValueError, match="Unknown message mode"):
+        JsonFormatter(message_mode='raw', hash_key='k')
+
+
+def test_counters_are_exact_under_concurrent_requests():
+    log, stream = make_log(sample_rates={'/health': 0.0}, queue_size=100000)
+
+    def requests():
+        for _ in range(2000):
+            log.log('/api/predict')
+            log.log('/health')
+
+    threads = [threading.Thread(target=requests) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = log.stats()
+    assert stats['logged'] == 16000
+    assert stats['sampled_out'] == 16000
+    assert len(read_lines(log, stream)) == 16000
+
+
+def test_full_queue_drops_records():
+    log, stream = make_log(queue_size=2)
+    # No listener draining the queue
+    log._start = lambda: None
+    for _ in range(5):
+        log.log('/api/predict')
+
+    assert log.stats()['dropped'] == 3
+    assert log.stats()['logged'] == 5
+
+
+def test_listener_starts_with_the_first_logged_request():
+    log, stream = make_log(sample_rates={'/health': 0.0})
+    log.log('/health')
+    assert log._listener is None
+    log.log('/api/predict')
+    assert log._listener is not None
+    assert len(read_lines(log, stream)) == 1
+    assert log._listener is None
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs fork")
+def test_forked_child_starts_its_own_listener():
+    log, stream = make_log()
+    log.log('/api/predict')
+    key = log.formatter.hash_key
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            fresh = log._listener is None and log.stats()['logged'] == 0
+            logged = log.log('/api/predict')
+            running = log._listener is not None and log._listener._thread.is_alive()
+            same_key = log.formatter.hash_key == key
+            os.write(write, json.dumps([fresh, logged, running, same_key]).encode())
+        finally:
+            os._exit(0)
+    os.close(write)
+    with os.fdopen(read) as f:
+        result = json.loads(f.read())
+    os.waitpid(pid, 0)
+    assert result == [True, True, True, True]
+    assert log.stats()['logged'] == 1
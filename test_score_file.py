@@ -0,0 +1,137 @@
+import argparse
+import csv
+import json
+
+import pytest
+from joblib import dump
+
+import score_file
+from feature_extraction import EXTRACTOR_VERSION
+from model_artifact import export_artifact
+
+
+@pytest.fixture(scope='module')
+def model_path(trained_model, tmp_path_factory):
+    path = tmp_path_factory.mktemp('model') / 'model.joblib'
+    dump(trained_model, path)
+    return str(path)
+
+
+@pytest.fixture
+def archive(tmp_path, corpus):
+    """JSONL archive of 300 messages with a blank line and a record without text"""
+    path = tmp_path / 'archive.jsonl'
+    lines = [json.dumps({'id': record['id'], 'text': record['text']}, ensure_ascii=False) for record in corpus[:300]]
+    lines.insert(10, '')
+    lines.insert(20, json.dumps({'id': 'no-text'}))
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return str(path)
+
+
+def arguments(input_path, output, model, **overrides):
+    values = dict(input=input_path, output=output, format='auto', text_field='text', id_field='id',
+                  model=model, workers=1, chunk_size=50, checkpoint=None, restart=False)
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_scores_every_record_and_skips_blank_lines(archive, tmp_path, model_path):
+    output = str(tmp_path / 'scored.jsonl')
+    score_file.score(arguments(archive, output, model_path))
+
+    results = read_jsonl(output)
+    assert len(results) == 301
+    assert [result['row'] for result in results] == list(range(301))
+    missing = [result for result in results if 'error' in result]
+    assert [result['id'] for result in missing] == ['no-text']
+    assert {result['prediction'] for result in results if 'error' not in result} <= {'ham', 'spam'}
+
+
+def test_resume_seeks_past_the_scored_rows(archive, tmp_path, model_path, monkeypatch):
+    expected = str(tmp_path / 'expected.jsonl')
+    score_file.score(arguments(archive, expected, model_path))
+
+    output = str(tmp_path / 'scored.jsonl')
+    original = score_file._score_chunk
+    calls = []
+
+    def interrupted(texts):
+        calls.append(len(texts))
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        return original(texts)
+
+    monkeypatch.setattr(score_file, '_score_chunk', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        score_file.score(arguments(archive, output, model_path))
+    monkeypatch.setattr(score_file, '_score_chunk', original)
+
+    with open(f"{output}.checkpoint") as f:
+        state = json.load(f)
+    assert state['rows'] == 100
+
+    # Only the lines after the checkpoint's offset are parsed again
+    parse = score_file._parse_json_line
+    parsed = []
+    monkeypatch.setattr(score_file, '_parse_json_line', lambda line: parsed.append(line) or parse(line))
+    score_file.score(arguments(archive, output, model_path))
+
+    assert len(parsed) == 201
+    assert read_jsonl(output) == read_jsonl(expected)
+
+
+def test_csv_resume_matches_a_full_run(tmp_path, corpus, model_path, monkeypatch):
+    archive = tmp_path / 'archive.csv'
+    with open(archive, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'text'])
+        for record in corpus[:120]:
+            # Quoted newlines: one record spans several lines
+            writer.writerow([record['id'], record['text'].replace(' ', '\n', 1)])
+
+    expected = str(tmp_path / 'expected.csv')
+    score_file.score(arguments(str(archive), expected, model_path, chunk_size=25))
+
+    output = str(tmp_path / 'scored.csv')
+    original = score_file._score_chunk
+    calls = []
+
+    def interrupted(texts):
+        calls.append(len(texts))
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        return original(texts)
+
+    monkeypatch.setattr(score_file, '_score_chunk', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        score_file.score(arguments(str(archive), output, model_path, chunk_size=25))
+    monkeypatch.setattr(score_file, '_score_chunk', original)
+    score_file.score(arguments(str(archive), output, model_path, chunk_size=25))
+
+    with open(output, encoding='utf-8') as f, open(expected, encoding='utf-8') as g:
+        assert f.read() == g.read()
+
+
+def test_existing_output_without_checkpoint_needs_restart(archive, tmp_path, model_path):
+    output = tmp_path / 'scored.jsonl'
+    output.write_text('{"row": 0}\n')
+    with pytest.raises(ValueError, match="--restart"):
+        score_file.score(arguments(archive, str(output), model_path))
+    assert output.read_text() == '{"row": 0}\n'
+
+    score_file.score(arguments(archive, str(output), model_path, restart=True))
+    assert len(read_jsonl(output)) == 301
+
+
+def test_scores_with_a_model_artifact(archive, tmp_path, model_path, trained_model, extractor):
+    manifest = export_artifact(trained_model, str(tmp_path / 'artifact'), extractor.feature_columns, EXTRACTOR_VERSION)
+    from_artifact = str(tmp_path / 'artifact.jsonl')
+    from_joblib = str(tmp_path / 'joblib.jsonl')
+    score_file.score(arguments(archive, from_artifact, manifest))
+    score_file.score(arguments(archive, from_joblib, model_path))
+    assert read_jsonl(from_artifact) == read_jsonl(from_joblib)
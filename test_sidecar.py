@@ -0,0 +1,167 @@
+import math
+import socket
+import threading
+
+import pytest
+
+import app as flask_app
+import sidecar
+from sidecar_protocol import (
+    LABEL_ERROR, LABEL_HAM, LABEL_SPAM, LENGTH, ProtocolError, SidecarClient, decode_request, decode_response,
+    encode_request, encode_response
+)
+
+MESSAGES = [
+    "CONGRATULATIONS! You have WON a 5000 cash prize. Call 9876543210 to claim now!",
+    "Hi, are we still meeting at 5:30 tomorrow?",
+    "আপনার অ্যাকাউন্টে ৫০০ টাকা বোনাস যোগ হয়েছে, এখনই ভিজিট করুন bit.ly/offer",
+]
+
+
+def payload_of(frame):
+    length, = LENGTH.unpack_from(frame)
+    assert length == len(frame) - LENGTH.size
+    return frame[LENGTH.size:]
+
+
+def request_payload(*messages):
+    """Request payload from raw message bytes"""
+    return LENGTH.pack(len(messages)) + b''.join(LENGTH.pack(len(data)) + data for data in messages)
+
+
+def test_request_round_trip():
+    messages = MESSAGES + ["", "😊 \u0000 end"]
+    assert decode_request(payload_of(encode_request(messages)), max_messages=10) == messages
+    assert decode_request(payload_of(encode_request([])), max_messages=10) == []
+
+
+def test_response_round_trip():
+    results = [(LABEL_SPAM, 0.75), (LABEL_HAM, 0.125), (LABEL_ERROR, math.nan)]
+    decoded = decode_response(payload_of(encode_response(results)))
+    assert decoded[:2] == results[:2]
+    assert decoded[2][0] == LABEL_ERROR and math.isnan(decoded[2][1])
+
+
+def test_invalid_utf8_message_decodes_to_none():
+    payload = request_payload(b'ok', b'\xff\xfe', 'টাকা'.encode('utf-8')[:-1])
+    assert decode_request(payload, max_messages=10) == ['ok', None, None]
+
+
+@pytest.mark.parametrize('cut', [0, 2, 4, 6, 9, 12])
+def test_truncated_frame_is_refused(cut):
+    payload = payload_of(encode_request(["hello", "world"]))
+    with pytest.raises(ProtocolError):
+        decode_request(payload[:cut], max_messages=10)
+
+
+def test_message_length_past_the_frame_is_refused():
+    payload = LENGTH.pack(1) + LENGTH.pack(2 ** 32 - 1) + b'short'
+    with pytest.raises(ProtocolError, match="ends inside a message"):
+        decode_request(payload, max_messages=10)
+
+
+def test_bytes_after_the_last_message_are_refused():
+    with pytest.raises(ProtocolError, match="3 bytes after"):
+        decode_request(payload_of(encode_request(["a"])) + b'xyz', max_messages=10)
+
+
+def test_too_many_messages_are_refused():
+    with pytest.raises(ProtocolError, match="at most 2"):
+        decode_request(payload_of(encode_request(["a", "b", "c"])), max_messages=2)
+
+
+def test_response_of_the_wrong_size_is_refused():
+    with pytest.raises(ProtocolError):
+        decode_response(payload_of(encode_response([(LABEL_HAM, 0.5)]))[:-1])
+
+
+def expected_results(messages):
+    column = sidecar.spam_column()
+    results = []
+    for raw_prediction, probabilities, _ in flask_app.classify_batch(messages):
+        label = LABEL_SPAM if flask_app.normalize_prediction(raw_prediction)[1] == 1 else LABEL_HAM
+        results.append((label, pytest.approx(float(probabilities[column]), abs=1e-6)))
+    return results
+
+
+@pytest.fixture
+def connection():
+    """Client end of a socketpair whose other end is served by FrameHandler"""
+    client, server = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(30)
+
+    def serve():
+        try:
+            sidecar.FrameHandler(server, '', None)
+        finally:
+            # What the socket server does once the handler returns
+            server.close()
+
+    handler = threading.Thread(target=serve, daemon=True)
+    handler.start()
+    yield client
+    client.close()
+    handler.join(5)
+
+
+def read_frame(rfile):
+    header = rfile.read(LENGTH.size)
+    if len(header) < LENGTH.size:
+        return None
+    length, = LENGTH.unpack(header)
+    return decode_response(rfile.read(length))
+
+
+def test_pipelined_frames_are_answered_in_order(connection):
+    batches = [MESSAGES, [MESSAGES[1]], ["  ", MESSAGES[2], ""], []]
+    connection.sendall(b''.join(encode_request(batch) for batch in batches))
+    rfile = connection.makefile('rb')
+
+    answers = [read_frame(rfile) for _ in batches]
+    assert answers[0] == expected_results(MESSAGES)
+    assert answers[1] == expected_results([MESSAGES[1]])
+    assert [label for label, _ in answers[2]] == [LABEL_ERROR, expected_results([MESSAGES[2]])[0][0], LABEL_ERROR]
+    assert math.isnan(answers[2][0][1]) and math.isnan(answers[2][2][1])
+    assert answers[3] == []
+
+
+def test_invalid_utf8_message_is_answered_with_an_error_label(connection):
+    payload = request_payload(MESSAGES[1].encode('utf-8'), b'\xff')
+    connection.sendall(LENGTH.pack(len(payload)) + payload)
+    answer = read_frame(connection.makefile('rb'))
+    assert answer[0] == expected_results([MESSAGES[1]])[0]
+    assert answer[1][0] == LABEL_ERROR
+
+
+def test_oversized_frame_closes_the_connection(connection, monkeypatch):
+    monkeypatch.setattr(sidecar, 'SIDECAR_MAX_FRAME_BYTES', 64)
+    connection.sendall(encode_request(["x" * 100]) + encode_request(["ok"]))
+    # No answer, not even to the frame after it
+    assert read_frame(connection.makefile('rb')) is None
+
+
+def test_malformed_frame_closes_the_connection(connection):
+    payload = LENGTH.pack(2) + LENGTH.pack(1) + b'a'
+    connection.sendall(LENGTH.pack(len(payload)) + payload + encode_request(["ok"]))
+    assert read_frame(connection.makefile('rb')) is None
+
+
+def test_client_pipeline_through_the_server(tmp_path):
+    path = str(tmp_path / 'sidecar.sock')
+    server = sidecar.SidecarServer(path, sidecar.FrameHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        client = SidecarClient(path)
+        client.socket.settimeout(30)
+        try:
+            assert client.classify(MESSAGES) == expected_results(MESSAGES)
+            # Enough frames to fill the socket buffers in both directions
+            answers = client.pipeline([MESSAGES] * 2000)
+            assert answers == [expected_results(MESSAGES)] * 2000
+        finally:
+            client.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(5)
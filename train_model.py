@@ -140,40 +140,86 @@
 
 
 # train_model.py
+import argparse
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from joblib import dump
-from feature_extraction import SMSFeatureExtractor
+from feature_extraction import EXTRACTOR_VERSION, SMSFeatureExtractor
+from feature_cache import FeatureCache, dataset_cache_prefix
+from model_artifact import export_artifact, load_artifact
 
-# Load labeled dataset
-df = pd.read_csv('Merged_dataset.csv')  # should contain 'text' and 'label'
 
-# Initialize feature extractor
-extractor = SMSFeatureExtractor()
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the SMS spam model")
+    parser.add_argument('--data', default='Merged_dataset.csv',
+                        help="labeled CSV with a 'text' and a 'label' (or 'type') column")
+    parser.add_argument('--workers', type=int, default=-1,
+                        help="processes used for feature extraction (-1 uses every core)")
+    parser.add_argument('--chunk-size', type=int, default=2000,
+                        help="messages per feature extraction task")
+    parser.add_argument('--artifact', default='spam_model',
+                        help="prefix of the pickle-free .npz/.json artifact ('' to skip it)")
+    parser.add_argument('--feature-cache', default='.feature_cache',
+                        help="directory caching the extracted features across runs ('' to disable)")
+    return parser.parse_args()
 
-# Feature extraction
-features = []
-for text in df['text']:
-    features.append(extractor.extract_features(text).flatten())  # flatten 2D to 1D
 
-# Create DataFrame with proper column names
-X = pd.DataFrame(features, columns=extractor.feature_columns)
-
-# Use 'label' column if it exists, otherwise use 'type'
-y = df['label'] if 'label' in df.columns else df['type']
-
-# Train model
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42
-)
-clf = RandomForestClassifier()
-clf.fit(X_train, y_train)
+def main():
+    args = parse_args()
+    
+    # Load labeled dataset
+    df = pd.read_csv(args.data)  # should contain 'text' and 'label'
+    
+    # Initialize feature extractor
+    extractor = SMSFeatureExtractor()
+    
+    # Feature extraction straight into one (n, 17) float32 matrix, spread
+    # over all cores
+    def extract(texts):
+        return extractor.extract_batch_parallel(
+            texts, n_jobs=args.workers, chunk_size=args.chunk_size, verbose=True
+        )
+    
+    # Unchanged datasets are memory-mapped from the cache, appended rows are
+    # the only ones extracted
+    if args.feature_cache:
+        cache = FeatureCache(dataset_cache_prefix(args.feature_cache, args.data), extractor.feature_columns, extract)
+        features, state = cache.features(df['text'])
+        print(f"Feature cache {state}: {cache.array_path} ({len(features)} rows)")
+    else:
+        features = extract(df['text'])
+    
+    # Create DataFrame with proper column names
+    X = pd.DataFrame(features, columns=extractor.feature_columns, copy=False)
+    
+    # Use 'label' column if it exists, otherwise use 'type'
+    y = df['label'] if 'label' in df.columns else df['type']
+    
+    # Train model
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42
+    )
+    clf = RandomForestClassifier()
+    clf.fit(X_train, y_train)
+    
+    # Save model
+    dump(clf, 'spam_model.joblib')
+    print("Model trained and saved as spam_model.joblib")
+    
+    # Pickle-free copy for serving, checked against the model on the test set
+    if args.artifact:
+        manifest_path = export_artifact(clf, args.artifact, extractor.feature_columns, EXTRACTOR_VERSION)
+        artifact = load_artifact(manifest_path, extractor.feature_columns, EXTRACTOR_VERSION)
+        mismatches = artifact.verify(clf, X_test.to_numpy())
+        if mismatches:
+            raise RuntimeError(f"Artifact differs from the model on {mismatches} test rows")
+        print(f"Artifact exported to {manifest_path} (set MODEL_PATH to serve it)")
+    
+    # Print accuracy for verification
+    print(f"Training accuracy: {clf.score(X_train, y_train):.2f}")
+    print(f"Test accuracy: {clf.score(X_test, y_test):.2f}")
 
-# Save model
-dump(clf, 'spam_model.joblib')
-print("Model trained and saved as spam_model.joblib")
 
-# Print accuracy for verification
-print(f"Training accuracy: {clf.score(X_train, y_train):.2f}")
-print(f"Test accuracy: {clf.score(X_test, y_test):.2f}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()